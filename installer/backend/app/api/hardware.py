@@ -0,0 +1,52 @@
+"""
+API routes for cluster hardware inventory
+"""
+
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+import logging
+
+from ..core.hardware import inventory_hosts, probe_inventory, hardware_delta, INVENTORY_PATH
+from ..services.hardware_cache import hardware_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["hardware"])
+
+
+@router.get("/hardware/inventory")
+async def get_hardware_inventory(refresh: bool = False, concurrency: int = 16):
+    """
+    Hardware of every inventory host
+
+    All hosts are probed concurrently. A host's cached result is returned
+    as long as its boot id has not changed since it was probed; pass
+    refresh=true to probe every host again.
+    """
+    if not INVENTORY_PATH.exists():
+        raise HTTPException(status_code=404, detail=f"Inventory not found at {INVENTORY_PATH}")
+
+    try:
+        hosts = inventory_hosts()
+    except Exception as e:
+        logger.error(f"Failed to read inventory: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to read inventory: {e}")
+
+    return await probe_inventory(hosts, refresh=refresh, concurrency=concurrency)
+
+
+@router.get("/hardware/inventory/delta")
+async def get_hardware_delta():
+    """Hosts that are new or whose hardware changed at their last probe"""
+    changed = hardware_delta()
+    return {
+        "hosts": changed,
+        "count": len(changed)
+    }
+
+
+@router.delete("/hardware/inventory/cache")
+async def clear_hardware_cache(host: Optional[str] = None):
+    """Forget cached hardware for one host, or all hosts"""
+    hardware_cache.clear(host)
+    return {"success": True}
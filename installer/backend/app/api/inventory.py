@@ -0,0 +1,85 @@
+"""
+API routes for the Ansible inventory
+"""
+
+from fastapi import APIRouter, HTTPException
+import logging
+
+from ..core.inventory import (
+    compile_inventory, validate_inventory, render_inventory, content_hash,
+    write_inventory, INVENTORY_PATH
+)
+from ..models.server import ClusterConfig
+from ..services.inventory_index import inventory_index
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["inventory"])
+
+
+@router.post("/inventory/compile")
+async def compile_cluster_inventory(config: ClusterConfig, write: bool = False):
+    """
+    Compile the inventory of a cluster configuration
+
+    Returns the inventory and any validation errors. With write=true a valid
+    inventory is also installed as inventory.yaml, unless the file already
+    has the same content.
+    """
+    inventory = compile_inventory(config)
+    errors = validate_inventory(inventory)
+    text = render_inventory(inventory)
+    result = {
+        "valid": not errors,
+        "errors": errors,
+        "inventory": text,
+        "hash": content_hash(text),
+        "written": False
+    }
+    if write:
+        if errors:
+            raise HTTPException(status_code=422, detail={"message": "Inventory is invalid", "errors": errors})
+        try:
+            result["written"], _ = write_inventory(text)
+            inventory_index.invalidate()
+            result["path"] = str(INVENTORY_PATH)
+        except OSError as e:
+            logger.error(f"Failed to write inventory: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    return result
+
+
+def _require_inventory():
+    if not inventory_index.inventory_path.exists():
+        raise HTTPException(status_code=404, detail=f"Inventory not found at {inventory_index.inventory_path}")
+
+
+@router.get("/inventory/groups")
+async def list_inventory_groups():
+    """Every group of the inventory"""
+    _require_inventory()
+    return {"groups": inventory_index.groups()}
+
+
+@router.get("/inventory/hosts")
+async def list_inventory_hosts(group: str = "all"):
+    """The hosts of a group, including those of its child groups"""
+    _require_inventory()
+    try:
+        return {"group": group, "hosts": inventory_index.hosts(group)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown group: {group}")
+
+
+@router.get("/inventory/hosts/{host}/vars")
+async def get_inventory_host_vars(host: str):
+    """The effective variables of a host, following Ansible's inventory precedence"""
+    _require_inventory()
+    try:
+        return {
+            "host": host,
+            "groups": inventory_index.host_group_names(host),
+            "vars": inventory_index.host_vars(host)
+        }
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown host: {host}")
@@ -13,6 +13,8 @@ import tempfile
 import shutil
 from pathlib import Path
 
+from ..core.inventory import parse_inventory, write_inventory, InventoryError
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["playbook-stream"])
@@ -108,17 +110,20 @@ async def stream_playbook_execution(websocket: WebSocket, playbook_name: str):
         
         # Update inventory file if dynamic inventory provided
         if dynamic_inventory:
-            # The installer saves to the main inventory.yaml
-            # Just ensure it has proper formatting
+            # The installer saves to the main inventory.yaml, leaving it
+            # untouched when the content is unchanged
             try:
-                # Ensure dynamic inventory ends with newline
-                if not dynamic_inventory.endswith('\n'):
-                    dynamic_inventory += '\n'
-                    
-                with open(inventory_path, 'w') as f:
-                    f.write(dynamic_inventory)
-                print(f"Updated inventory at {inventory_path}")
-                    
+                parse_inventory(dynamic_inventory)
+                written, _ = write_inventory(dynamic_inventory, inventory_path)
+                if not written:
+                    logger.info(f"Inventory at {inventory_path} is unchanged")
+            except InventoryError as e:
+                os.unlink(temp_vars_path)
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"Invalid inventory: {e}"
+                })
+                return
             except Exception as e:
                 print(f"Error saving inventory: {e}")
                 raise
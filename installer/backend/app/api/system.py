@@ -2,16 +2,24 @@
 API routes for system requirements and checks
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pathlib import Path
 import asyncio
 import logging
 import os
 import json
-import ipaddress
-import re
 from typing import Dict, Any
 
+from ..services.deployment_state import deployment_state_store
+from ..services.http_client import HttpClient, get_http_client
+from ..services.installation_state import installation_state
+from ..services.k8s_informer import k8s_informer
+from ..services.requirements_checker import requirements_checker
+from ..services.verification_cache import verification_cache
+from ..services.state_watcher import state_watcher
+from ..services.local_addresses import local_address_service
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["system"])
@@ -21,61 +29,27 @@ router = APIRouter(prefix="/api", tags=["system"])
 async def get_local_network():
     """Detect the local network CIDR based on the primary network interface"""
     try:
-        # Get primary network interface info
-        result = await asyncio.create_subprocess_exec(
-            'ip', 'route', 'get', '8.8.8.8',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
+        default_route = local_address_service.default_route()
         
-        if result.returncode != 0:
+        if not default_route or not default_route.get("interface") or not default_route.get("source"):
             logger.error("Failed to get default route")
             return {"network_cidr": "192.168.1.0/24", "detected": False}
         
-        # Parse output to get the interface and source IP
-        output = stdout.decode()
-        interface_match = re.search(r'dev (\S+)', output)
-        src_ip_match = re.search(r'src (\d+\.\d+\.\d+\.\d+)', output)
-        
-        if not interface_match or not src_ip_match:
-            logger.error("Could not parse route output")
-            return {"network_cidr": "192.168.1.0/24", "detected": False}
-        
-        interface = interface_match.group(1)
-        src_ip = src_ip_match.group(1)
-        
-        # Get network info for this interface
-        result = await asyncio.create_subprocess_exec(
-            'ip', 'addr', 'show', interface,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
-        
-        if result.returncode != 0:
-            logger.error(f"Failed to get interface {interface} info")
-            return {"network_cidr": "192.168.1.0/24", "detected": False}
+        interface = default_route["interface"]
+        src_ip = default_route["source"]
         
         # Find the network CIDR for our source IP
-        output = stdout.decode()
-        for line in output.split('\n'):
-            if 'inet ' in line and src_ip in line:
-                # Extract CIDR notation
-                cidr_match = re.search(r'inet (\d+\.\d+\.\d+\.\d+/\d+)', line)
-                if cidr_match:
-                    ip_cidr = cidr_match.group(1)
-                    # Convert to network CIDR
-                    network = ipaddress.IPv4Network(ip_cidr, strict=False)
-                    network_cidr = str(network)
-                    
-                    logger.info(f"Detected network CIDR: {network_cidr} on interface {interface}")
-                    return {
-                        "network_cidr": network_cidr,
-                        "interface": interface,
-                        "ip_address": src_ip,
-                        "detected": True
-                    }
+        for address in local_address_service.addresses():
+            if address.interface == interface and address.address == src_ip:
+                network_cidr = address.network_cidr
+                
+                logger.info(f"Detected network CIDR: {network_cidr} on interface {interface}")
+                return {
+                    "network_cidr": network_cidr,
+                    "interface": interface,
+                    "ip_address": src_ip,
+                    "detected": True
+                }
         
         # Fallback
         logger.warning("Could not detect network CIDR, using default")
@@ -87,488 +61,83 @@ async def get_local_network():
 
 
 @router.get("/check-installation-state")
-async def check_installation_state():
-    """Check what parts of thinkube are already installed"""
-    state = {
-        "environment_setup": False,
-        "ansible_installed": False,
-        "thinkube_repo_cloned": False,
-        "ssh_keys_configured": False,
-        "lxd_installed": False,
-        "microk8s_installed": False,
-        "kubernetes_running": False,
-        "services_deployed": [],
-        "installation_complete": False
-    }
-    
+async def check_installation_state(refresh: bool = False):
+    """
+    Check what parts of thinkube are already installed
+
+    The state is cached briefly and recomputed early when one of the files
+    or tools it depends on changes; pass refresh=true to bypass the cache.
+    """
     try:
-        # Check if thinkube repo is cloned
-        thinkube_path = Path.home() / "thinkube"
-        if thinkube_path.exists() and (thinkube_path / "ansible").exists():
-            state["thinkube_repo_cloned"] = True
-        
-        # Check if ansible is installed in user virtual environment (as per install script)
-        user_venv = Path.home() / ".venv"
-        if user_venv.exists():
-            ansible_bin = user_venv / "bin" / "ansible-playbook"
-            if ansible_bin.exists():
-                state["ansible_installed"] = True
-        else:
-            # Fallback: check if ansible is installed system-wide
-            result = await asyncio.create_subprocess_exec(
-                'which', 'ansible-playbook',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
-            if result.returncode == 0:
-                state["ansible_installed"] = True
-        
-        # Check if SSH keys are configured
-        ssh_key_path = Path.home() / ".ssh" / "id_rsa.pub"
-        if ssh_key_path.exists():
-            state["ssh_keys_configured"] = True
-        
-        # Check environment setup
-        env_file = Path.home() / ".env"
-        inventory_file = thinkube_path / "inventory" / "inventory.yaml"
-        if env_file.exists() and inventory_file.exists():
-            state["environment_setup"] = True
-        
-        # Check if LXD is installed and configured
-        result = await asyncio.create_subprocess_exec(
-            'which', 'lxc',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        await result.communicate()
-        if result.returncode == 0:
-            # Check if LXD is actually configured
-            result = await asyncio.create_subprocess_exec(
-                'lxc', 'list',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
-            if result.returncode == 0:
-                state["lxd_installed"] = True
-        
-        # Check if MicroK8s is installed
-        result = await asyncio.create_subprocess_exec(
-            'which', 'microk8s',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        await result.communicate()
-        if result.returncode == 0:
-            state["microk8s_installed"] = True
-            
-            # Check if Kubernetes is running
-            result = await asyncio.create_subprocess_exec(
-                'microk8s', 'status', '--wait-ready', '--timeout', '5',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
-            if result.returncode == 0:
-                state["kubernetes_running"] = True
-                
-                # Check deployed services
-                result = await asyncio.create_subprocess_exec(
-                    'microk8s', 'kubectl', 'get', 'namespaces', '-o', 'json',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, _ = await result.communicate()
-                if result.returncode == 0:
-                    import json
-                    namespaces_data = json.loads(stdout.decode())
-                    namespaces = [ns['metadata']['name'] for ns in namespaces_data['items']]
-                    
-                    # Check for thinkube services
-                    thinkube_services = ['keycloak', 'harbor', 'postgresql', 'argocd', 'argo-workflows']
-                    for service in thinkube_services:
-                        if service in namespaces:
-                            state["services_deployed"].append(service)
-        
-        # Determine if installation is complete
-        state["installation_complete"] = (
-            state["environment_setup"] and
-            state["ansible_installed"] and
-            state["thinkube_repo_cloned"] and
-            state["ssh_keys_configured"] and
-            state["lxd_installed"] and
-            state["kubernetes_running"] and
-            len(state["services_deployed"]) >= 3  # At least 3 core services
-        )
-        
+        return await installation_state.get(refresh=refresh)
     except Exception as e:
         logger.error(f"Error checking installation state: {e}")
-    
-    return state
+        return {
+            "environment_setup": False,
+            "ansible_installed": False,
+            "thinkube_repo_cloned": False,
+            "ssh_keys_configured": False,
+            "lxd_installed": False,
+            "microk8s_installed": False,
+            "kubernetes_running": False,
+            "services_deployed": [],
+            "installation_complete": False
+        }
+
+
+@router.get("/installation-state/files")
+async def get_installation_files():
+    """
+    The file-based parts of the installation state, from the live watcher
+
+    Changes are also pushed to the status WebSocket under
+    "installation_files", so clients do not need to poll this.
+    """
+    return {"watching": state_watcher.running, **state_watcher.summary()}
+
+
+@router.get("/cluster/services")
+async def get_cluster_services():
+    """Which thinkube services are deployed and ready, from the informer cache"""
+    return {
+        "connected": k8s_informer.connected,
+        "synced": k8s_informer.synced,
+        "error": k8s_informer.last_error,
+        "services": k8s_informer.service_status()
+    }
 
 
 @router.get("/check-requirements")
-async def check_requirements():
-    """Check system requirements based on REQUIREMENTS.md"""
-    requirements = []
-    
-    # HARD REQUIREMENTS (must pass)
-    
-    # 1. Check Ubuntu version (must be 24.04.x)
-    try:
-        # First try reading /etc/os-release directly (more reliable)
-        with open('/etc/os-release', 'r') as f:
-            os_release = f.read()
-            
-        # Parse the file
-        os_info = {}
-        for line in os_release.strip().split('\n'):
-            if '=' in line:
-                key, value = line.split('=', 1)
-                os_info[key] = value.strip('"')
-        
-        dist_id = os_info.get('ID', '').lower()
-        version_id = os_info.get('VERSION_ID', '')
-        version_full = os_info.get('VERSION', '')
-        
-        if dist_id == 'ubuntu' and version_id.startswith('24.04'):
-            requirements.append({
-                "name": "Ubuntu 24.04.x LTS",
-                "category": "system",
-                "required": True,
-                "status": "pass",
-                "details": f"{version_full} detected"
-            })
-        else:
-            # Fallback to distro module
-            import distro
-            dist_info = distro.info()
-            dist_name = dist_info.get('id', '')
-            dist_version = dist_info.get('version', '')
-            
-            if dist_name == 'ubuntu' and dist_version.startswith('24.04'):
-                requirements.append({
-                    "name": "Ubuntu 24.04.x LTS",
-                    "category": "system",
-                    "required": True,
-                    "status": "pass",
-                    "details": f"Ubuntu {dist_version} LTS detected"
-                })
-            else:
-                requirements.append({
-                    "name": "Ubuntu 24.04.x LTS",
-                    "category": "system", 
-                    "required": True,
-                    "status": "fail",
-                    "details": f"Found {dist_id or dist_name} {version_id or dist_version}. This installer requires Ubuntu 24.04.x"
-                })
-    except Exception as e:
-        requirements.append({
-            "name": "Ubuntu 24.04.x LTS",
-            "category": "system",
-            "required": True,
-            "status": "fail",
-            "details": f"Could not detect OS version: {str(e)}"
-        })
-    
-    # 2. Check user is not root and has sudo
-    try:
-        is_root = os.geteuid() == 0
-        if is_root:
-            requirements.append({
-                "name": "Non-root user with sudo",
-                "category": "system",
-                "required": True,
-                "status": "fail",
-                "details": "Running as root. Please run as normal user with sudo access"
-            })
-        else:
-            # Check sudo access
-            result = await asyncio.create_subprocess_exec(
-                'sudo', '-n', 'true',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
-            
-            current_user = os.environ.get('USER', 'unknown')
-            requirements.append({
-                "name": "Non-root user with sudo",
-                "category": "system",
-                "required": True,
-                "status": "pass",
-                "details": f"User '{current_user}' has sudo access"
-            })
-    except:
-        requirements.append({
-            "name": "Non-root user with sudo",
-            "category": "system",
-            "required": True,
-            "status": "fail",
-            "details": "Could not verify user and sudo access"
-        })
-    
-    # 3. Check OpenSSH server is installed (required for Ansible to connect to localhost)
-    try:
-        # Check if openssh-server package is installed
-        result = await asyncio.create_subprocess_exec(
-            'dpkg', '-l', 'openssh-server',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await result.communicate()
-        
-        if result.returncode == 0 and b'ii  openssh-server' in stdout:
-            # Check if SSH service is running
-            service_result = await asyncio.create_subprocess_exec(
-                'systemctl', 'is-active', 'ssh',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            service_stdout, _ = await service_result.communicate()
-            service_status = service_stdout.decode().strip()
-            
-            if service_status == 'active':
-                requirements.append({
-                    "name": "OpenSSH Server",
-                    "category": "system",
-                    "required": True,
-                    "status": "pass",
-                    "details": "OpenSSH server is installed and running"
-                })
-            else:
-                requirements.append({
-                    "name": "OpenSSH Server",
-                    "category": "system",
-                    "required": True,
-                    "status": "fail",
-                    "details": f"OpenSSH server is installed but not running (status: {service_status})"
-                })
-        else:
-            requirements.append({
-                "name": "OpenSSH Server",
-                "category": "system",
-                "required": True,
-                "status": "fail",
-                "details": "OpenSSH server is not installed. Run: sudo apt install openssh-server"
-            })
-    except Exception as e:
-        requirements.append({
-            "name": "OpenSSH Server",
-            "category": "system",
-            "required": True,
-            "status": "fail",
-            "details": f"Could not check OpenSSH server: {str(e)}"
-        })
-    
-    # 4. Check network connectivity
-    try:
-        # Try to reach Ubuntu package servers
-        import socket
-        socket.create_connection(("archive.ubuntu.com", 443), timeout=3)
-        requirements.append({
-            "name": "Network connectivity",
-            "category": "system",
-            "required": True,
-            "status": "pass",
-            "details": "Internet access confirmed"
-        })
-    except:
-        requirements.append({
-            "name": "Network connectivity",
-            "category": "system",
-            "required": True,
-            "status": "fail",
-            "details": "Cannot reach Ubuntu package servers"
-        })
-    
-    # 5. Check disk space (10GB minimum for control node)
-    try:
-        import shutil
-        free_gb = shutil.disk_usage(os.path.expanduser("~")).free / (1024**3)
-        
-        if free_gb >= 10:
-            requirements.append({
-                "name": "Disk space",
-                "category": "system",
-                "required": True,
-                "status": "pass",
-                "details": f"{free_gb:.1f}GB free in home directory"
-            })
-        else:
-            requirements.append({
-                "name": "Disk space",
-                "category": "system",
-                "required": True,
-                "status": "fail",
-                "details": f"Only {free_gb:.1f}GB free. Need at least 10GB"
-            })
-    except:
-        requirements.append({
-            "name": "Disk space",
-            "category": "system",
-            "required": True,
-            "status": "fail",
-            "details": "Could not check disk space"
-        })
-    
-    # SOFT REQUIREMENTS (will be installed if missing)
-    
-    # 1. Git
-    try:
-        result = await asyncio.create_subprocess_exec(
-            'which', 'git',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
-        if stdout:
-            # Check git version
-            version_result = await asyncio.create_subprocess_exec(
-                'git', '--version',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            version_stdout, _ = await version_result.communicate()
-            version = version_stdout.decode().strip() if version_result.returncode == 0 else "unknown"
-            
-            requirements.append({
-                "name": "Git",
-                "category": "tools",
-                "required": False,
-                "status": "pass",
-                "details": f"Git is installed ({version})"
-            })
-        else:
-            requirements.append({
-                "name": "Git",
-                "category": "tools",
-                "required": False,
-                "status": "missing",
-                "details": "Will be installed during setup",
-                "action": "install"
-            })
-    except:
-        requirements.append({
-            "name": "Git",
-            "category": "tools",
-            "required": False,
-            "status": "missing",
-            "details": "Will be installed during setup",
-            "action": "install"
-        })
-    
-    # 2. OpenSSH Client
-    try:
-        result = await asyncio.create_subprocess_exec(
-            'which', 'ssh',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
-        if stdout:
-            requirements.append({
-                "name": "OpenSSH Client",
-                "category": "tools",
-                "required": False,
-                "status": "pass",
-                "details": "SSH client is installed"
-            })
-        else:
-            requirements.append({
-                "name": "OpenSSH Client",
-                "category": "tools",
-                "required": False,
-                "status": "missing",
-                "details": "Will be installed",
-                "action": "install"
-            })
-    except:
-        requirements.append({
-            "name": "OpenSSH Client",
-            "category": "tools",
-            "required": False,
-            "status": "missing",
-            "details": "Will be installed",
-            "action": "install"
-        })
-    
-    # 3. Python Virtual Environment (user-level as per install script)
-    user_venv = Path.home() / ".venv"
-    if user_venv.exists() and (user_venv / "bin" / "python").exists():
-        requirements.append({
-            "name": "Python Virtual Environment",
-            "category": "tools",
-            "required": False,
-            "status": "pass",
-            "details": f"Virtual environment exists at {user_venv}"
-        })
-    else:
-        requirements.append({
-            "name": "Python Virtual Environment",
-            "category": "tools",
-            "required": False,
-            "status": "missing",
-            "details": "Will be created in ~/.venv",
-            "action": "install"
-        })
-    
-    # 4. Ansible (must be in user virtual environment as per install script)
-    venv_ansible_installed = False
-    
-    # Only check in user virtual environment - this is required
-    if user_venv.exists():
-        ansible_bin = user_venv / "bin" / "ansible-playbook"
-        if ansible_bin.exists():
-            try:
-                # Check ansible version in venv
-                version_result = await asyncio.create_subprocess_exec(
-                    str(ansible_bin), '--version',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                version_stdout, _ = await version_result.communicate()
-                if version_result.returncode == 0:
-                    version_line = version_stdout.decode().split('\n')[0]
-                    venv_ansible_installed = True
-                    ansible_details = f"Ansible installed in user venv ({version_line})"
-            except:
-                pass
-    
-    if venv_ansible_installed:
-        requirements.append({
-            "name": "Ansible (in venv)",
-            "category": "tools",
-            "required": False,
-            "status": "pass",
-            "details": ansible_details
-        })
-    else:
-        # Check if system ansible exists (for informational purposes)
-        system_ansible_note = ""
-        try:
-            result = await asyncio.create_subprocess_exec(
-                'which', 'ansible-playbook',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await result.communicate()
-            if stdout:
-                system_ansible_note = " (system-wide Ansible detected, but thinkube needs user venv)"
-        except:
-            pass
-        
-        requirements.append({
-            "name": "Ansible (in venv)",
-            "category": "tools", 
-            "required": False,
-            "status": "missing",
-            "details": f"Will be installed in user virtual environment{system_ansible_note}",
-            "action": "install"
-        })
+async def check_requirements(refresh: bool = False):
+    """
+    Check system requirements based on REQUIREMENTS.md
+
+    Independent checks run concurrently. The last complete result is
+    returned on re-visits for a few minutes if every required check passed;
+    pass refresh=true to re-check anyway.
+    """
+    return await requirements_checker.check(refresh=refresh)
+
+
+@router.get("/check-requirements/stream")
+async def check_requirements_stream():
+    """
+    Run the requirement checks, streaming each result as it finishes
+
+    Newline-delimited JSON: one {"type": "result", ...} line per check,
+    then a {"type": "done", ...} line with the summary.
+    """
+    async def stream():
+        async for entry in requirements_checker.stream():
+            yield json.dumps({"type": "result", **entry}) + "\n"
+        summary = requirements_checker.last_summary or {}
+        yield json.dumps({
+            "type": "done",
+            "all_required_passed": summary.get("all_required_passed", False),
+            "checked_at": summary.get("checked_at")
+        }) + "\n"
     
-    return {"requirements": requirements}
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 @router.post("/verify-sudo")
@@ -844,7 +413,7 @@ async def run_setup_script(sudo_password: str):
 
 
 @router.post("/verify-zerotier")
-async def verify_zerotier(request: Dict[str, Any]):
+async def verify_zerotier(request: Dict[str, Any], http: HttpClient = Depends(get_http_client)):
     """Verify ZeroTier API token and network access"""
     try:
         api_token = request.get('api_token', '')
@@ -857,31 +426,29 @@ async def verify_zerotier(request: Dict[str, Any]):
         if len(network_id) != 16 or not all(c in '0123456789abcdef' for c in network_id.lower()):
             return {"valid": False, "message": "Network ID must be 16 hexadecimal characters"}
         
-        # Test API token by getting network info
-        import aiohttp
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                'Authorization': f'Bearer {api_token}'
-            }
-            
-            # Try to get network details
-            url = f'https://api.zerotier.com/api/v1/network/{network_id}'
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    network_name = data.get('config', {}).get('name', 'Unnamed Network')
-                    return {
-                        "valid": True, 
-                        "message": f"Successfully verified access to network: {network_name}",
-                        "network_name": network_name
-                    }
-                elif response.status == 401:
-                    return {"valid": False, "message": "Invalid API token"}
-                elif response.status == 404:
-                    return {"valid": False, "message": "Network not found or no access"}
-                else:
-                    return {"valid": False, "message": f"API error: {response.status}"}
-                    
+        async def check():
+            # Test API token by getting network details
+            response = await http.get(
+                f'https://api.zerotier.com/api/v1/network/{network_id}',
+                headers={'Authorization': f'Bearer {api_token}'}
+            )
+            if response.status_code == 200:
+                data = response.json()
+                network_name = data.get('config', {}).get('name', 'Unnamed Network')
+                return {
+                    "valid": True, 
+                    "message": f"Successfully verified access to network: {network_name}",
+                    "network_name": network_name
+                }
+            elif response.status_code == 401:
+                return {"valid": False, "message": "Invalid API token"}
+            elif response.status_code == 404:
+                return {"valid": False, "message": "Network not found or no access"}
+            else:
+                return {"valid": False, "message": f"API error: {response.status_code}"}
+
+        return await verification_cache.verify("zerotier", api_token, network_id.lower(), check)
+
     except Exception as e:
         logger.error(f"Failed to verify ZeroTier credentials: {e}")
         return {"valid": False, "message": f"Verification error: {str(e)}"}
@@ -914,23 +481,13 @@ async def check_inventory():
 
 @router.get("/system/deployment-state")
 async def get_deployment_state():
-    """Get the deployment state from persistent storage"""
-    state_dir = Path.home() / ".thinkube-installer"
-    state_file = state_dir / "deployment-state.json"
-    
+    """Get the deployment state, served from the in-memory copy of the store"""
     try:
-        if state_file.exists():
-            with open(state_file, 'r') as f:
-                state = json.load(f)
-            return {
-                "exists": True,
-                "state": state
-            }
-        else:
-            return {
-                "exists": False,
-                "state": None
-            }
+        state = deployment_state_store.get()
+        return {
+            "exists": state is not None,
+            "state": state
+        }
     except Exception as e:
         logger.error(f"Error loading deployment state: {e}")
         return {
@@ -942,21 +499,18 @@ async def get_deployment_state():
 
 @router.post("/system/deployment-state")
 async def save_deployment_state(request: Dict[str, Any]):
-    """Save the deployment state to persistent storage"""
-    state_dir = Path.home() / ".thinkube-installer"
-    state_file = state_dir / "deployment-state.json"
-    
+    """
+    Save the deployment state to persistent storage
+
+    Only the fields that changed since the last save are journaled, and the
+    response is sent once they are on disk.
+    """
     try:
-        # Create directory if it doesn't exist
-        state_dir.mkdir(exist_ok=True)
-        
-        # Save the state
-        with open(state_file, 'w') as f:
-            json.dump(request.get("state", {}), f, indent=2)
-        
+        changes = await deployment_state_store.save(request.get("state", {}))
         return {
             "success": True,
-            "path": str(state_file)
+            "path": str(deployment_state_store.snapshot_file),
+            "changes": changes
         }
     except Exception as e:
         logger.error(f"Error saving deployment state: {e}")
@@ -965,13 +519,9 @@ async def save_deployment_state(request: Dict[str, Any]):
 
 @router.delete("/system/deployment-state")
 async def clear_deployment_state():
-    """Clear the deployment state file"""
-    state_dir = Path.home() / ".thinkube-installer"
-    state_file = state_dir / "deployment-state.json"
-    
+    """Clear the deployment state"""
     try:
-        if state_file.exists():
-            state_file.unlink()
+        if await deployment_state_store.clear():
             return {
                 "success": True,
                 "message": "Deployment state cleared"
@@ -4,104 +4,89 @@ Server discovery and analysis logic
 
 import asyncio
 import logging
-from typing import List, Dict, Any
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional, Set
 from ..utils.network import (
     ping_sweep, check_ssh_banner, get_hostname_info, 
-    get_hostname_via_ssh, get_local_ip_addresses
+    get_hostname_via_ssh, get_local_ip_addresses, network_hosts,
+    get_interfaces_for_network, ipv6_neighbor_discovery, read_arp_table
 )
+from ..utils.resolver import resolve_hostnames
+from ..services.discovery_cache import discovery_cache
+from ..services.mdns_browser import mdns_browser
+from ..services.ssh_pool import ssh_pool, SSHConnectionError
 
 logger = logging.getLogger(__name__)
 
 
-async def discover_ubuntu_servers(network_cidr: str) -> Dict[str, Any]:
-    """Main discovery function that combines multiple methods"""
-    start_time = asyncio.get_event_loop().time()
+async def analyze_host(
+    ip: str,
+    resolve_hostname: bool = True,
+    budget: Optional[asyncio.Semaphore] = None
+) -> Dict[str, Any]:
+    """
+    Probe a single active host for SSH, hostname and OS information
+
+    With resolve_hostname=False the name-service lookup is skipped so the
+    caller can resolve many hosts in one batch with resolve_hostnames().
+    The optional budget semaphore is held while the host is being probed.
+    """
+    if budget is not None:
+        async with budget:
+            return await analyze_host(ip, resolve_hostname)
     
-    logger.info(f"Starting network discovery for {network_cidr}")
+    # Check SSH
+    ssh_info = await check_ssh_banner(ip)
     
-    # Step 1: Find active IPs
-    logger.info("Finding active IPs...")
-    active_ips = await ping_sweep(network_cidr)
-    logger.info(f"Found {len(active_ips)} active IPs")
+    # Get hostname if SSH is available
+    hostname = None
+    if ssh_info['ssh_available']:
+        hostname = await get_hostname_via_ssh(ip)
+        if not hostname and resolve_hostname:
+            hostname = await get_hostname_info(ip)
     
-    if not active_ips:
-        return {
-            "servers": [],
-            "total_scanned": 0,
-            "scan_time": asyncio.get_event_loop().time() - start_time
-        }
+    # Determine confidence level and OS info
+    confidence = "unknown"
+    os_info = None
     
-    # Step 2: Check SSH on all active IPs
-    logger.info("Checking SSH availability...")
-    servers = []
+    fingerprint = ssh_info.get('fingerprint') or {}
     
-    async def analyze_host(ip):
-        # Check SSH
-        ssh_info = await check_ssh_banner(ip)
-        
-        # Get hostname if SSH is available
-        hostname = None
-        if ssh_info['ssh_available']:
-            hostname = await get_hostname_via_ssh(ip)
-            if not hostname:
-                hostname = await get_hostname_info(ip)
+    if ssh_info['is_ubuntu']:
+        confidence = "confirmed"
+        os_info = fingerprint.get('label') or "Ubuntu (version unknown)"
+    elif ssh_info['is_likely_ubuntu']:
+        confidence = "possible"
+        os_info = "Likely Ubuntu (needs verification)"
+    elif ssh_info['ssh_available']:
+        banner = ssh_info['banner'] or ""
         
-        # Determine confidence level and OS info
-        confidence = "unknown"
-        os_info = None
+        # A recognised non-Ubuntu distribution, or a non-OpenSSH server, is unlikely
+        non_ubuntu_indicators = ['CentOS', 'RHEL', 'Alpine', 'raspberrypi', 'Cisco', 'Mikrotik', 'pfSense']
+        has_non_ubuntu_indicator = (
+            fingerprint.get('distro') not in (None, 'Ubuntu') or
+            any(indicator.lower() in banner.lower() for indicator in non_ubuntu_indicators)
+        )
         
-        if ssh_info['is_ubuntu']:
-            confidence = "confirmed"
-            banner = ssh_info['banner']
-            if 'Ubuntu' in banner:
-                # Try to extract version info from banner
-                if 'Ubuntu-' in banner:
-                    # Example: SSH-2.0-OpenSSH_9.6p1 Ubuntu-3ubuntu13.5
-                    # Extract the Ubuntu package version to guess OS version
-                    try:
-                        ubuntu_part = banner.split('Ubuntu-')[1]
-                        if ubuntu_part.startswith('3ubuntu'):
-                            os_info = "Ubuntu 24.04 LTS"
-                        elif ubuntu_part.startswith('2ubuntu'):
-                            os_info = "Ubuntu 22.04 LTS"
-                        elif ubuntu_part.startswith('1ubuntu'):
-                            os_info = "Ubuntu 20.04 LTS"
-                        else:
-                            os_info = "Ubuntu (recent version)"
-                    except:
-                        os_info = "Ubuntu (version unknown)"
-                else:
-                    os_info = "Ubuntu (version unknown)"
-        elif ssh_info['is_likely_ubuntu']:
+        if not has_non_ubuntu_indicator and 'OpenSSH' in banner:
             confidence = "possible"
-            os_info = "Likely Ubuntu (needs verification)"
-        elif ssh_info['ssh_available']:
-            # Only mark as "possible" for very specific cases
-            banner = ssh_info['banner'] or ""
-            
-            # Check for strong Ubuntu indicators
-            non_ubuntu_indicators = ['Debian', 'CentOS', 'RHEL', 'Alpine', 'raspberrypi', 'Cisco', 'Mikrotik', 'pfSense']
-            has_non_ubuntu_indicator = any(indicator.lower() in banner.lower() for indicator in non_ubuntu_indicators)
-            
-            if not has_non_ubuntu_indicator and 'OpenSSH' in banner:
-                confidence = "possible"
-                os_info = "Linux SSH server (needs verification)"
-            else:
-                confidence = "unlikely"
-        
-        return {
-            "ip": ip,
-            "hostname": hostname,
-            "os_info": os_info,
-            "ssh_available": ssh_info['ssh_available'],
-            "confidence": confidence,
-            "banner": ssh_info['banner']
-        }
-    
-    # Analyze all hosts concurrently
-    tasks = [analyze_host(ip) for ip in active_ips]
-    servers = await asyncio.gather(*tasks)
+            os_info = "Linux SSH server (needs verification)"
+        else:
+            confidence = "unlikely"
+            os_info = fingerprint.get('label')
     
+    return {
+        "ip": ip,
+        "hostname": hostname,
+        "os_info": os_info,
+        "ssh_available": ssh_info['ssh_available'],
+        "confidence": confidence,
+        "banner": ssh_info['banner'],
+        "fingerprint_confidence": fingerprint.get('confidence', 0.0)
+    }
+
+
+def build_discovery_result(servers: List[Dict[str, Any]], total_scanned: int, scan_time: float) -> Dict[str, Any]:
+    """Filter analyzed hosts down to Ubuntu candidates and build the API response"""
     # Filter to only return servers with Ubuntu indicators or strong Linux candidates
     ubuntu_servers = [
         server for server in servers 
@@ -112,17 +97,327 @@ async def discover_ubuntu_servers(network_cidr: str) -> Dict[str, Any]:
     confidence_order = {'confirmed': 0, 'possible': 1}
     ubuntu_servers.sort(key=lambda x: confidence_order.get(x['confidence'], 2))
     
+    return {
+        "servers": ubuntu_servers,
+        "total_scanned": total_scanned,
+        "scan_time": scan_time
+    }
+
+
+async def merge_ipv6_neighbours(
+    servers: List[Dict[str, Any]],
+    neighbours: List[Dict[str, Any]],
+    budget: Optional[asyncio.Semaphore] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fold IPv6 neighbours into the IPv4 discovery results
+
+    Neighbours whose MAC address matches an IPv4 host are attached to it as
+    ipv6_addresses. IPv6-only hosts are run through the SSH banner stage on
+    their best address (global before link-local) and returned as new
+    records.
+    """
+    arp_table = read_arp_table()
+    by_mac = {arp_table[server["ip"]]: server for server in servers if server["ip"] in arp_table}
+    
+    addresses_by_mac: Dict[str, List[str]] = {}
+    for neighbour in sorted(neighbours, key=lambda n: n["scope"] != "global"):
+        addresses = addresses_by_mac.setdefault(neighbour["mac"], [])
+        if neighbour["address"] not in addresses:
+            addresses.append(neighbour["address"])
+    
+    ipv6_only = []
+    for mac, addresses in addresses_by_mac.items():
+        server = by_mac.get(mac)
+        if server is not None:
+            server["mac"] = mac
+            server["ipv6_addresses"] = addresses
+        else:
+            ipv6_only.append((mac, addresses))
+    
+    new_servers = await asyncio.gather(*[
+        analyze_host(addresses[0], resolve_hostname=False, budget=budget) for _, addresses in ipv6_only
+    ])
+    for (mac, addresses), server in zip(ipv6_only, new_servers):
+        server["mac"] = mac
+        server["ipv6_addresses"] = addresses
+    
+    return [server for server in new_servers if server["ssh_available"]]
+
+
+async def discover_ubuntu_servers(
+    network_cidr: str,
+    incremental: bool = False,
+    include_ipv6: bool = True,
+    budget: Optional[asyncio.Semaphore] = None
+) -> Dict[str, Any]:
+    """
+    Main discovery function that combines multiple methods
+
+    With incremental=True only the hosts that were alive in the cached scan
+    plus a rotating slice of the other addresses are probed; the rest of the
+    result comes from the discovery cache. With include_ipv6=True the IPv6
+    neighbours on the network's interfaces are discovered alongside the
+    IPv4 sweep and merged into the results. A budget semaphore limits the
+    number of concurrent probes across scans that share it.
+    """
+    start_time = asyncio.get_event_loop().time()
+    
+    logger.info(f"Starting {'incremental' if incremental else 'full'} network discovery for {network_cidr}")
+    
+    # Step 1: Find active IPs
+    probed_ips = None
+    if incremental:
+        all_ips = network_hosts(network_cidr)
+        probed_ips = discovery_cache.incremental_targets(network_cidr, all_ips)
+        logger.info(f"Incremental scan probing {len(probed_ips)} of {len(all_ips)} addresses")
+    
+    async def find_ipv6_neighbours():
+        if not include_ipv6:
+            return []
+        interfaces = await get_interfaces_for_network(network_cidr)
+        return await ipv6_neighbor_discovery(interfaces) if interfaces else []
+    
+    logger.info("Finding active IPs...")
+    active_ips, neighbours = await asyncio.gather(
+        ping_sweep(network_cidr, hosts=probed_ips, budget=budget),
+        find_ipv6_neighbours()
+    )
+    logger.info(f"Found {len(active_ips)} active IPs and {len(neighbours)} IPv6 neighbours")
+    
+    # Hosts announced over mDNS are included even if they drop pings
+    announced = mdns_browser.hosts_in_network(network_cidr)
+    active_ips.extend(ip for ip in announced if ip not in active_ips)
+    if announced:
+        logger.info(f"Merged {len(announced)} mDNS-announced addresses")
+    
+    # Step 2: Check SSH on all active IPs concurrently
+    logger.info("Checking SSH availability...")
+    servers = await asyncio.gather(*[
+        analyze_host(ip, resolve_hostname=False, budget=budget) for ip in active_ips
+    ])
+    
+    if neighbours:
+        servers.extend(await merge_ipv6_neighbours(servers, neighbours, budget=budget))
+    
+    # Step 3: Resolve missing hostnames in one batch
+    for server in servers:
+        if not server["hostname"] and server["ip"] in announced:
+            server["hostname"] = announced[server["ip"]]["hostname"]
+    unnamed = [server["ip"] for server in servers if server["ssh_available"] and not server["hostname"]]
+    if unnamed:
+        hostnames = await resolve_hostnames(unnamed)
+        for server in servers:
+            if server["ip"] in hostnames:
+                server["hostname"] = hostnames[server["ip"]]
+    
+    discovery_cache.record_scan(
+        network_cidr,
+        (probed_ips if probed_ips is not None else network_hosts(network_cidr)) + list(announced),
+        servers
+    )
+    if incremental:
+        servers = discovery_cache.get_hosts(network_cidr)
+    
     scan_time = asyncio.get_event_loop().time() - start_time
+    result = build_discovery_result(servers, len(servers), scan_time)
+    
+    logger.info(f"Discovery completed in {scan_time:.2f}s. Found {len(result['servers'])} Ubuntu candidates.")
+    
+    return result
+
+
+def merge_multi_network_servers(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Deduplicate hosts seen on several networks
+
+    Records that share a MAC address or an IP address are the same machine
+    and are merged into one record that lists every address and network it
+    was seen on. Hostnames are weaker evidence, since fresh installs all
+    default to "ubuntu": a hostname only joins records that carry no MAC
+    into the one machine with that hostname whose MAC is known, or joins
+    records that have no MAC at all. Records whose MACs differ are never
+    merged, and a hostname shared by several machines with different MACs
+    merges nothing. The first network listed supplies the primary "ip".
+    """
+    records = []
+    for result in results:
+        for server in result["servers"]:
+            records.append((result["network_cidr"], server))
+    
+    # Union-find over records joined by a shared MAC or IP address
+    parent = list(range(len(records)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
     
-    logger.info(f"Discovery completed in {scan_time:.2f}s. Found {len(ubuntu_servers)} Ubuntu candidates.")
+    owners: Dict[str, int] = {}
+    for i, (_, server) in enumerate(records):
+        keys = [f"ip:{server['ip']}"]
+        if server.get("mac"):
+            keys.append(f"mac:{server['mac'].lower()}")
+        for key in keys:
+            if key in owners:
+                parent[find(i)] = find(owners[key])
+            else:
+                owners[key] = i
+    
+    # Then join by hostname where that cannot merge two different machines
+    macs: Dict[int, set] = {}
+    by_hostname: Dict[str, List[int]] = {}
+    for i, (_, server) in enumerate(records):
+        root = find(i)
+        macs.setdefault(root, set())
+        if server.get("mac"):
+            macs[root].add(server["mac"].lower())
+        if server.get("hostname"):
+            by_hostname.setdefault(server["hostname"].lower(), []).append(i)
+    for members in by_hostname.values():
+        roots = list(dict.fromkeys(find(i) for i in members))
+        with_mac = [r for r in roots if macs[r]]
+        if len(with_mac) > 1:
+            continue  # Several machines share this hostname
+        target = with_mac[0] if with_mac else roots[0]
+        for root in roots:
+            if root != target:
+                parent[root] = target
+    
+    confidence_order = {'confirmed': 0, 'possible': 1}
+    merged: Dict[int, Dict[str, Any]] = {}
+    for i, (network_cidr, server) in enumerate(records):
+        root = find(i)
+        if root not in merged:
+            merged[root] = dict(server, addresses=[], networks=[])
+        host = merged[root]
+        if server["ip"] not in host["addresses"]:
+            host["addresses"].append(server["ip"])
+        for address in server.get("ipv6_addresses", []):
+            if address not in host["addresses"]:
+                host["addresses"].append(address)
+        if network_cidr not in host["networks"]:
+            host["networks"].append(network_cidr)
+        if not host.get("hostname") and server.get("hostname"):
+            host["hostname"] = server["hostname"]
+        if confidence_order.get(server["confidence"], 2) < confidence_order.get(host["confidence"], 2):
+            for field in ("confidence", "os_info", "banner", "fingerprint_confidence"):
+                if field in server:
+                    host[field] = server[field]
+    
+    servers = list(merged.values())
+    servers.sort(key=lambda x: confidence_order.get(x['confidence'], 2))
+    return servers
+
+
+async def discover_multi_network(
+    network_cidrs: List[str],
+    max_concurrency: int = 128,
+    include_ipv6: bool = True
+) -> Dict[str, Any]:
+    """Scan several networks concurrently under one probe budget and merge the hosts"""
+    start_time = asyncio.get_event_loop().time()
+    max_concurrency = max(1, max_concurrency)
+    budget = asyncio.Semaphore(max_concurrency)
+    
+    logger.info(f"Starting multi-network discovery for {network_cidrs} (max {max_concurrency} concurrent probes)")
+    
+    async def scan(network_cidr: str) -> Dict[str, Any]:
+        try:
+            result = await discover_ubuntu_servers(network_cidr, include_ipv6=include_ipv6, budget=budget)
+        except Exception as e:
+            logger.error(f"Discovery of {network_cidr} failed: {e}")
+            result = build_discovery_result([], 0, 0)
+            result["error"] = str(e)
+        result["network_cidr"] = network_cidr
+        return result
+    
+    results = await asyncio.gather(*[scan(cidr) for cidr in network_cidrs])
+    servers = merge_multi_network_servers(results)
+    scan_time = asyncio.get_event_loop().time() - start_time
+    
+    logger.info(f"Multi-network discovery completed in {scan_time:.2f}s. Found {len(servers)} distinct hosts.")
     
     return {
-        "servers": ubuntu_servers,
-        "total_scanned": len(active_ips),
+        "servers": servers,
+        "networks": [
+            {
+                "network_cidr": result["network_cidr"],
+                "total_scanned": result["total_scanned"],
+                "found": len(result["servers"]),
+                "error": result.get("error")
+            }
+            for result in results
+        ],
+        "total_scanned": sum(result["total_scanned"] for result in results),
         "scan_time": scan_time
     }
 
 
+def get_cached_discovery(network_cidr: str) -> Optional[Dict[str, Any]]:
+    """Return the last known discovery result for a network without probing"""
+    network = discovery_cache.get_network(network_cidr)
+    if network is None:
+        return None
+    
+    hosts = discovery_cache.get_hosts(network_cidr)
+    result = build_discovery_result(hosts, len(hosts), 0)
+    result["cached"] = True
+    result["cache_age"] = time.time() - network.get("last_scan", 0)
+    result["refreshing"] = network_cidr in _refresh_tasks
+    return result
+
+
+def get_passive_discovery(network_cidr: str) -> Optional[Dict[str, Any]]:
+    """
+    Build a discovery result from mDNS announcements alone
+
+    Returns None when no host of the network has announced itself.
+    """
+    announced = mdns_browser.hosts_in_network(network_cidr)
+    if not announced:
+        return None
+    
+    servers = []
+    for ip, host in announced.items():
+        announces_ssh = host["ssh_port"] is not None
+        servers.append({
+            "ip": ip,
+            "hostname": host["hostname"],
+            "os_info": "Linux SSH server announced via mDNS (needs verification)" if announces_ssh
+                       else "Linux workstation announced via mDNS (needs verification)",
+            "ssh_available": announces_ssh,
+            "confidence": "possible",
+            "banner": None
+        })
+    
+    result = build_discovery_result(servers, len(servers), 0)
+    result["passive"] = True
+    return result
+
+
+# Background refreshes in flight, one per network
+_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
+def refresh_discovery_in_background(network_cidr: str) -> bool:
+    """Start an incremental rescan unless one is already running for this network"""
+    if network_cidr in _refresh_tasks:
+        return False
+    
+    async def refresh():
+        try:
+            await discover_ubuntu_servers(network_cidr, incremental=True)
+        except Exception as e:
+            logger.error(f"Background discovery refresh for {network_cidr} failed: {e}")
+        finally:
+            _refresh_tasks.pop(network_cidr, None)
+    
+    _refresh_tasks[network_cidr] = asyncio.create_task(refresh())
+    return True
+
+
 async def verify_local_server() -> Dict[str, Any]:
     """Verify local server without SSH"""
     try:
@@ -174,85 +469,61 @@ async def verify_local_server() -> Dict[str, Any]:
         }
 
 
-async def verify_ssh_connectivity(ip_address: str, username: str = "thinkube", password: str = None) -> Dict[str, Any]:
-    """Verify SSH connectivity to a server"""
-    # Check if this is the local machine using multiple methods
-    local_ips = await get_local_ip_addresses()
-    logger.info(f"Checking if {ip_address} is in local IPs: {local_ips}")
-    
-    is_local = ip_address in local_ips
+def is_local_address(ip_address: str, local_ips: Set[str]) -> bool:
+    """Check whether an address belongs to this machine"""
+    if ip_address in local_ips:
+        return True
     
     # Alternative method: try to bind to the IP address locally
-    if not is_local:
-        try:
-            import socket
-            test_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            test_socket.bind((ip_address, 0))  # Bind to any available port
-            test_socket.close()
-            is_local = True
-            logger.info(f"IP {ip_address} confirmed as local via socket binding")
-        except Exception as e:
-            logger.info(f"IP {ip_address} socket binding failed: {e}")
+    try:
+        import socket
+        family = socket.AF_INET6 if ':' in ip_address else socket.AF_INET
+        test_socket = socket.socket(family, socket.SOCK_STREAM)
+        test_socket.bind((ip_address, 0))  # Bind to any available port
+        test_socket.close()
+        logger.info(f"IP {ip_address} confirmed as local via socket binding")
+        return True
+    except Exception as e:
+        logger.info(f"IP {ip_address} socket binding failed: {e}")
+        return False
+
+
+async def verify_ssh_connectivity(
+    ip_address: str,
+    username: str = "thinkube",
+    password: str = None,
+    local_ips: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """
+    Verify SSH connectivity to a server
+
+    Callers verifying many servers pass local_ips so the local address set
+    is looked up once rather than per server.
+    """
+    # Check if this is the local machine using multiple methods
+    if local_ips is None:
+        local_ips = await get_local_ip_addresses()
+    logger.info(f"Checking if {ip_address} is in local IPs: {local_ips}")
     
-    if is_local:
+    if is_local_address(ip_address, local_ips):
         logger.info(f"Detected local server {ip_address}, using direct verification")
         return await verify_local_server()
     else:
         logger.info(f"IP {ip_address} is not local, proceeding with SSH verification")
     
     try:
-        # Try SSH connection - use password if provided, otherwise try key-based
-        if password:
-            # Use sshpass for password authentication
-            result = await asyncio.create_subprocess_exec(
-                'sshpass', '-p', password,
-                'ssh', '-o', 'ConnectTimeout=5',
-                '-o', 'StrictHostKeyChecking=no',
-                '-o', 'UserKnownHostsFile=/dev/null',
-                f'{username}@{ip_address}', 'echo "SSH OK"; lsb_release -d 2>/dev/null || cat /etc/os-release | grep PRETTY_NAME',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-        else:
-            # Fall back to key-based auth
-            result = await asyncio.create_subprocess_exec(
-                'ssh', '-o', 'ConnectTimeout=5',
-                '-o', 'StrictHostKeyChecking=no',
-                '-o', 'UserKnownHostsFile=/dev/null',
-                '-o', 'BatchMode=yes',  # Don't prompt for password
-                f'{username}@{ip_address}', 'echo "SSH OK"; lsb_release -d 2>/dev/null || cat /etc/os-release | grep PRETTY_NAME',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-        stdout, stderr = await result.communicate()
+        # Both commands run as channels of one pooled connection; key-based
+        # auth is tried first and the password, if provided, after it
+        os_result, hostname_result = await ssh_pool.run_many(
+            ip_address, username,
+            ['echo "SSH OK"; lsb_release -d 2>/dev/null || cat /etc/os-release | grep PRETTY_NAME', 'hostname'],
+            password=password,
+            timeout=10
+        )
         
-        if result.returncode == 0:
-            output = stdout.decode().strip()
-            lines = output.split('\n')
-            
-            # Get hostname
-            if password:
-                hostname_result = await asyncio.create_subprocess_exec(
-                    'sshpass', '-p', password,
-                    'ssh', '-o', 'ConnectTimeout=5',
-                    '-o', 'StrictHostKeyChecking=no',
-                    '-o', 'UserKnownHostsFile=/dev/null',
-                    f'{username}@{ip_address}', 'hostname',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-            else:
-                hostname_result = await asyncio.create_subprocess_exec(
-                    'ssh', '-o', 'ConnectTimeout=5',
-                    '-o', 'StrictHostKeyChecking=no',
-                    '-o', 'UserKnownHostsFile=/dev/null',
-                    '-o', 'BatchMode=yes',
-                    f'{username}@{ip_address}', 'hostname',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-            hostname_stdout, _ = await hostname_result.communicate()
-            hostname = hostname_stdout.decode().strip() if hostname_result.returncode == 0 else None
+        if os_result.ok:
+            lines = os_result.stdout.strip().split('\n')
+            hostname = hostname_result.stdout.strip() if hostname_result.ok else None
             
             # Extract OS info
             os_info = None
@@ -269,7 +540,7 @@ async def verify_ssh_connectivity(ip_address: str, username: str = "thinkube", p
                 "hostname": hostname
             }
         else:
-            error_msg = stderr.decode().strip()
+            error_msg = os_result.stderr.strip()
             return {
                 "connected": False,
                 "success": False,  # Frontend compatibility
@@ -277,6 +548,14 @@ async def verify_ssh_connectivity(ip_address: str, username: str = "thinkube", p
                 "os_info": None,
                 "hostname": None
             }
+    except SSHConnectionError as e:
+        return {
+            "connected": False,
+            "success": False,  # Frontend compatibility
+            "message": f"SSH connection failed: {str(e)}",
+            "os_info": None,
+            "hostname": None
+        }
     except Exception as e:
         return {
             "connected": False,
@@ -284,4 +563,32 @@ async def verify_ssh_connectivity(ip_address: str, username: str = "thinkube", p
             "message": f"SSH verification error: {str(e)}",
             "os_info": None,
             "hostname": None
-        }
\ No newline at end of file
+        }
+
+
+async def verify_ssh_bulk(
+    servers: List[Dict[str, Any]],
+    concurrency: int = 10
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Verify many servers concurrently, yielding each result as it completes
+
+    Every entry of servers needs an "ip_address" and may carry its own
+    "username" and "password". At most `concurrency` verifications run at
+    once, and the local address set is computed once for the whole batch.
+    """
+    local_ips = await get_local_ip_addresses()
+    limit = asyncio.Semaphore(max(1, concurrency))
+    
+    async def verify(server: Dict[str, Any]) -> Dict[str, Any]:
+        async with limit:
+            result = await verify_ssh_connectivity(
+                server["ip_address"],
+                server["username"],
+                server.get("password"),
+                local_ips=local_ips
+            )
+        return {"server": server["ip_address"], **result}
+    
+    for next_result in asyncio.as_completed([verify(server) for server in servers]):
+        yield await next_result
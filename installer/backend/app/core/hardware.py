@@ -0,0 +1,303 @@
+"""
+Hardware detection logic
+
+Runs the self-contained probe in app/probes/hardware_probe.py on a host and
+turns its JSON report into a HardwareInfo. The probe is copied to the host
+once, cached under ~/.cache/thinkube keyed by its content hash, and every
+later detection is a single remote command. The installer's own host is read
+in-process by the same code, without spawning any command.
+
+Usage:
+    python -m app.core.hardware check [--fixtures DIR]
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from ..models.server import HardwareInfo, GPUPassthroughInfo
+from .inventory import INVENTORY_PATH
+from ..probes import hardware_probe
+from ..probes.hardware_probe import SCHEMA_VERSION
+from ..services.hardware_cache import hardware_cache
+from ..services.inventory_index import inventory_index, InventoryIndex
+from ..services.ssh_pool import ssh_pool
+from ..utils.network import get_local_ip_addresses
+from ..utils.pci_ids import lookup_device_name
+from ..utils.pci_topology import FIXTURES_DIR, PCITopology
+
+logger = logging.getLogger(__name__)
+
+PROBE_SCRIPT = Path(__file__).resolve().parent.parent / "probes" / "hardware_probe.py"
+PROBE_SOURCE = PROBE_SCRIPT.read_text()
+PROBE_DIGEST = hashlib.sha256(PROBE_SOURCE.encode()).hexdigest()[:16]
+REMOTE_PROBE_PATH = f"$HOME/.cache/thinkube/hardware-probe-{PROBE_DIGEST}.py"
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+
+# Exit status of the run command when the probe has not been pushed yet
+PROBE_MISSING = 90
+
+
+class HardwareProbeError(Exception):
+    """Raised when the hardware probe cannot be run or its report is unusable"""
+
+
+async def read_local_hardware(root: str = "/") -> Dict[str, Any]:
+    """
+    Collect the hardware report of the installer host in-process
+
+    root can point at a captured copy of /proc and /sys instead of the
+    live system.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, hardware_probe.collect, root)
+
+
+async def run_hardware_probe(ip_address: str, username: str = "thinkube", is_local: bool = False) -> Dict[str, Any]:
+    """Run the hardware probe on a host and return its parsed JSON report"""
+    if is_local:
+        return await read_local_hardware()
+
+    run_cmd = f'f="{REMOTE_PROBE_PATH}"; [ -f "$f" ] || exit {PROBE_MISSING}; exec python3 "$f"'
+    result = await ssh_pool.run(ip_address, username, run_cmd)
+    if result.exit_status == PROBE_MISSING:
+        logger.info(f"Pushing hardware probe {PROBE_DIGEST} to {ip_address}")
+        push_cmd = (
+            f'f="{REMOTE_PROBE_PATH}"; mkdir -p "$(dirname "$f")" && '
+            f'cat > "$f.tmp" && mv "$f.tmp" "$f" && exec python3 "$f"'
+        )
+        result = await ssh_pool.run(ip_address, username, push_cmd, input=PROBE_SOURCE)
+    if not result.ok:
+        raise HardwareProbeError(result.stderr.strip() or f"Probe exited with {result.exit_status}")
+
+    try:
+        report = json.loads(result.stdout)
+    except json.JSONDecodeError as e:
+        raise HardwareProbeError(f"Probe returned invalid JSON: {e}")
+    if report.get("schema_version") != SCHEMA_VERSION:
+        raise HardwareProbeError(f"Unsupported probe schema version: {report.get('schema_version')}")
+    return report
+
+
+def _model_name(name: Optional[str], fallback: str) -> str:
+    # "GA102 [GeForce RTX 3090]" -> "GeForce RTX 3090"
+    if name and '[' in name and ']' in name:
+        return name[name.find('[') + 1:name.find(']')].strip()
+    return name or fallback
+
+
+def _describe_gpus(visible: List[str], vfio: List[str]) -> Optional[str]:
+    visible_count = len(visible)
+    vfio_count = len(vfio)
+    if visible_count and vfio_count:
+        if visible_count == 1 and vfio_count == 1:
+            return f"{visible[0]} + 1 VFIO-bound"
+        return f"{visible_count} visible + {vfio_count} VFIO-bound NVIDIA GPUs"
+    if visible_count:
+        if visible_count == 1:
+            return visible[0]
+        if len(set(visible)) == 1:
+            return f"{visible_count}x {visible[0]}"
+        return f"{visible_count} NVIDIA GPUs: {', '.join(visible)}"
+    if vfio_count:
+        if vfio_count == 1:
+            return f"{vfio[0]} (VFIO-bound)"
+        return f"{vfio_count} NVIDIA GPUs (all VFIO-bound)"
+    return None
+
+
+def parse_hardware_report(report: Dict[str, Any]) -> HardwareInfo:
+    """Build a HardwareInfo from a hardware probe report"""
+    cpu = report.get("cpu") or {}
+
+    info = HardwareInfo(
+        cpu_cores=cpu.get("cores") or 0,
+        cpu_model=cpu.get("model") or "Unknown",
+        memory_gb=round((report.get("memory_bytes") or 0) / (1024**3), 1),
+        disk_gb=round((report.get("disk_bytes") or 0) / (1024**3), 1),
+        architecture=report.get("architecture") or "unknown"
+    )
+
+    topology = PCITopology.from_report(report)
+    gpus = topology.nvidia_gpus
+    if not gpus:
+        logger.info("No NVIDIA GPUs detected")
+        return info
+
+    # Prefer the installer's pci.ids over the name the host resolved, if any
+    names = {d.address: lookup_device_name(d.vendor, d.device) or d.name for d in gpus}
+    visible = [_model_name(names[d.address], "NVIDIA GPU") for d in gpus if not d.vfio_bound]
+    vfio = [_model_name(names[d.address], "NVIDIA GPU (VFIO-bound)") for d in gpus if d.vfio_bound]
+    info.gpu_detected = True
+    info.gpu_count = len(gpus)
+    info.gpu_model = _describe_gpus(visible, vfio)
+
+    iommu = report.get("iommu") or {}
+    info.iommu_enabled = topology.iommu_enabled
+    if not iommu.get("present"):
+        logger.warning("IOMMU support not available - GPU passthrough not possible")
+    elif not iommu.get("group_count"):
+        logger.warning("No IOMMU groups found - check BIOS settings for VT-d/AMD-Vi")
+
+    passthrough = topology.passthrough_report()
+    models = {d.short_address: _model_name(names[d.address], "NVIDIA GPU") for d in gpus}
+    info.gpu_passthrough_info = [
+        GPUPassthroughInfo(**entry, model=models[entry["pci_address"]])
+        for entry in passthrough["gpus"]
+    ]
+    info.gpu_passthrough_eligible_count = passthrough["eligible_count"]
+    info.iommu_group_count = passthrough["iommu_group_count"]
+    info.vfio_bound_devices = passthrough["vfio_bound"]
+    logger.info(
+        f"GPU passthrough summary: {len(info.gpu_passthrough_info)} GPUs listed, "
+        f"{info.gpu_passthrough_eligible_count} eligible for passthrough"
+    )
+    return info
+
+
+async def detect_hardware(ip_address: str, username: str = "thinkube", is_local: bool = False) -> HardwareInfo:
+    """Detect the hardware of a host with a single probe execution"""
+    report = await run_hardware_probe(ip_address, username, is_local=is_local)
+    return parse_hardware_report(report)
+
+
+def inventory_hosts(inventory_path: Path = INVENTORY_PATH) -> List[Dict[str, Any]]:
+    """List the inventory hosts that have an address to probe"""
+    index = inventory_index if inventory_path == inventory_index.inventory_path else InventoryIndex(inventory_path)
+    hosts = []
+    for name in index.hosts():
+        host_vars = index.host_vars(name)
+        if not host_vars.get("ansible_host"):
+            continue
+        hosts.append({
+            "host": name,
+            "address": host_vars["ansible_host"],
+            "username": host_vars.get("ansible_user", host_vars.get("system_username", "thinkube")),
+            "local": host_vars.get("ansible_connection") == "local"
+        })
+    return hosts
+
+
+async def read_boot_id(ip_address: str, username: str = "thinkube", is_local: bool = False) -> Optional[str]:
+    """Read the kernel boot id of a host, which changes on every reboot"""
+    if is_local:
+        try:
+            return Path(BOOT_ID_PATH).read_text().strip()
+        except OSError:
+            return None
+    result = await ssh_pool.run(ip_address, username, f"cat {BOOT_ID_PATH}", timeout=10)
+    return result.stdout.strip() if result.ok else None
+
+
+async def probe_inventory_host(
+    host: Dict[str, Any],
+    refresh: bool = False,
+    local_ips: Optional[set] = None
+) -> Dict[str, Any]:
+    """
+    Return the hardware of one inventory host
+
+    The cached result is reused while the host's boot id is unchanged; with
+    refresh the host is always probed again.
+    """
+    address = host["address"]
+    is_local = host.get("local") or address in (local_ips or set())
+    try:
+        if not refresh:
+            boot_id = await read_boot_id(address, host["username"], is_local=is_local)
+            cached = hardware_cache.get(host["host"], boot_id) if boot_id else None
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        report = await run_hardware_probe(address, host["username"], is_local=is_local)
+        hardware = parse_hardware_report(report).model_dump()
+        entry = hardware_cache.record(host["host"], address, report.get("boot_id"), hardware)
+        return {**entry, "cached": False}
+    except Exception as e:
+        logger.warning(f"Hardware probe of {host['host']} ({address}) failed: {e}")
+        cached = hardware_cache.get(host["host"])
+        return {
+            "host": host["host"],
+            "address": address,
+            "error": str(e),
+            "cached": cached is not None,
+            "hardware": cached["hardware"] if cached else None
+        }
+
+
+async def probe_inventory(
+    hosts: List[Dict[str, Any]],
+    refresh: bool = False,
+    concurrency: int = 16
+) -> Dict[str, Any]:
+    """Probe every inventory host concurrently, reusing cached results"""
+    start_time = time.time()
+    local_ips = await get_local_ip_addresses()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def probe(host: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await probe_inventory_host(host, refresh=refresh, local_ips=local_ips)
+
+    results = await asyncio.gather(*[probe(host) for host in hosts])
+    hardware_cache.save()
+    return {
+        "hosts": list(results),
+        "total": len(results),
+        "probed": sum(1 for r in results if not r.get("cached") and not r.get("error")),
+        "failed": sum(1 for r in results if r.get("error")),
+        "probe_time": round(time.time() - start_time, 2)
+    }
+
+
+def hardware_delta() -> List[Dict[str, Any]]:
+    """Hosts whose hardware changed at their last probe, or were probed for the first time"""
+    return [
+        {
+            "host": entry["host"],
+            "address": entry["address"],
+            "probed_at": entry["probed_at"],
+            "first_probe": entry.get("first_probe", False),
+            "changes": entry.get("changes", [])
+        }
+        for entry in hardware_cache.entries()
+        if entry.get("changes") or entry.get("first_probe")
+    ]
+
+
+def _check(fixtures: Path) -> bool:
+    """Parse the report of every fixture tree and compare it with expected.json"""
+    passed = True
+    boards = sorted(p for p in fixtures.iterdir() if (p / "expected.json").is_file())
+    for board in boards:
+        expected = json.loads((board / "expected.json").read_text()).get("hardware") or {}
+        info = parse_hardware_report(hardware_probe.collect(str(board))).model_dump()
+        mismatches = [key for key in expected if info.get(key) != expected[key]]
+        if mismatches or not expected:
+            passed = False
+            print(f"FAIL {board.name}: " + ("; ".join(
+                f"{key} is {info.get(key)!r}, expected {expected[key]!r}" for key in mismatches
+            ) or "no hardware expectations"))
+        else:
+            print(f"ok   {board.name}: {info['cpu_cores']} cores, {info['memory_gb']} GB memory, "
+                  f"{info['disk_gb']} GB disk")
+    print(f"{len(boards)} fixtures checked")
+    return passed and bool(boards)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Hardware detection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check = subparsers.add_parser("check", help="Check the parsed hardware of every probe fixture")
+    check.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+
+    args = parser.parse_args()
+    sys.exit(0 if _check(args.fixtures) else 1)
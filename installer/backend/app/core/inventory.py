@@ -0,0 +1,344 @@
+"""
+Ansible inventory compiler
+
+Builds the inventory that drives every playbook from a ClusterConfig, in the
+shape of inventory/reference-inventory.yaml with the group names the
+playbooks use. The result is validated before it is written, and it is only
+written when its content differs from the inventory on disk, so anything
+keyed on the inventory file (its mtime, its hash, the inventory index) stays
+valid across runs that do not change it.
+"""
+
+import copy
+import hashlib
+import ipaddress
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from ..models.server import ClusterConfig, ContainerType, NodeRole, ServerRole
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_PATH = Path.home() / "thinkube" / "inventory" / "inventory.yaml"
+
+INVENTORY_HEADER = "---\n# Generated by thinkube installer from the cluster configuration\n"
+
+PYTHON_INTERPRETER = "/home/thinkube/.venv/bin/python3"
+
+# Host groups every generated inventory has
+GROUP_SKELETON = {
+    "arch": {"children": {"x86_64": {"hosts": {}}, "arm64": {"hosts": {}}}},
+    "baremetal": {
+        "hosts": {},
+        "children": {"headless": {"hosts": {}}, "desktops": {"hosts": {}}, "dgx": {"hosts": {}}},
+    },
+    "lxd_cluster": {"children": {"lxd_primary": {"hosts": {}}, "lxd_secondary": {"hosts": {}}}},
+    "zerotier_nodes": {"hosts": {}},
+    "lxd_containers": {
+        "hosts": {},
+        "vars": {"lxd_image": "ubuntu:24.04", "ansible_python_interpreter": PYTHON_INTERPRETER},
+        "children": {
+            "dns_containers": {"hosts": {}},
+            "microk8s_containers": {"children": {"controllers": {"hosts": {}}, "workers": {"hosts": {}}}},
+        },
+    },
+    "microk8s": {"children": {"microk8s_control_plane": {"hosts": {}}, "microk8s_workers": {"hosts": {}}}},
+    "gpu_passthrough_vms": {"hosts": {}},
+    "dns_servers": {"hosts": {}},
+    "management": {"hosts": {}},
+    "container_configs": {"vars": {}},
+    "baremetal_gpus": {"vars": {}},
+}
+
+# Groups whose hosts are LXD containers or VMs rather than servers
+CONTAINER_GROUPS = {"lxd_containers", "dns_containers", "microk8s_containers", "controllers", "workers"}
+
+# Groups of the containers that join the Kubernetes cluster
+MICROK8S_CONTAINER_GROUPS = {"microk8s_containers", "controllers", "workers"}
+MICROK8S_GROUPS = {"microk8s_control_plane", "microk8s_workers"}
+
+
+class InventoryError(Exception):
+    """Raised when an inventory cannot be compiled, parsed or validated"""
+
+    def __init__(self, message: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _group(children: Dict[str, Any], *path: str) -> Dict[str, Any]:
+    """The group at a path of group names below all.children"""
+    group = children[path[0]]
+    for name in path[1:]:
+        group = group["children"][name]
+    return group
+
+
+def _subnet_prefix(cidr: str) -> str:
+    return ".".join(cidr.split('/')[0].split('.')[:3]) + "."
+
+
+def _gpu_slot(pci_address: str) -> str:
+    return pci_address if pci_address.count(':') >= 2 else f"0000:{pci_address}"
+
+
+def compile_inventory(config: ClusterConfig) -> Dict[str, Any]:
+    """Build the inventory document for a cluster configuration"""
+    network = config.network
+    zerotier_prefix = _subnet_prefix(network.zerotier_cidr)
+    all_vars = {
+        "domain_name": config.domain_name,
+        "admin_username": "tkadmin",
+        "system_username": config.system_username,
+        "auth_realm_username": "thinkube",
+        "ansible_python_interpreter": "/usr/bin/python3",
+        "ansible_become_pass": "{{ lookup('env', 'ANSIBLE_BECOME_PASSWORD') }}",
+        "home": "{{ lookup('env', 'HOME') }}",
+        "network_cidr": network.cidr,
+        "network_gateway": network.gateway,
+        "internal_gateway": network.lxd_ipv4_address.split('/')[0],
+        "zerotier_network_id": config.zerotier_network_id,
+        # Secrets stay in ~/.env
+        "zerotier_api_token": "{{ lookup('env', 'ZEROTIER_API_TOKEN') }}",
+        "zerotier_cidr": network.zerotier_cidr,
+        "zerotier_subnet_prefix": zerotier_prefix,
+        "dns_servers": list(network.dns_servers),
+        "dns_search_domains": [],
+        "lxd_network_name": "lxdbr0",
+        "lxd_network_ipv4_address": network.lxd_ipv4_address,
+        "lxd_network_ipv6_address": "none",
+        "primary_ingress_ip_octet": network.primary_ingress_octet,
+        "secondary_ingress_ip_octet": network.secondary_ingress_octet,
+        "primary_ingress_ip": config.primary_ingress_ip or f"{zerotier_prefix}{network.primary_ingress_octet}",
+        "secondary_ingress_ip": f"{zerotier_prefix}{network.secondary_ingress_octet}",
+    }
+    children = copy.deepcopy(GROUP_SKELETON)
+
+    def add(path: Tuple[str, ...], host: str, host_vars: Optional[Dict[str, Any]] = None):
+        _group(children, *path)["hosts"][host] = host_vars or {}
+
+    container_hosts = [
+        server.hostname for server in config.servers
+        if server.role in (ServerRole.CONTAINER_HOST, ServerRole.HYBRID) and server.containers
+    ]
+    lxd_primary = config.lxd_primary or (container_hosts[0] if container_hosts else None)
+
+    for server in config.servers:
+        host = server.hostname
+        gpu_slots = [_gpu_slot(c.pci_slot) for c in server.containers if c.gpu_passthrough and c.pci_slot]
+        host_vars = {
+            "ansible_host": server.ip_address,
+            "lan_ip": server.ip_address,
+            "arch": server.hardware.architecture,
+            "zerotier_enabled": server.zerotier_ip is not None,
+            "configure_gpu_passthrough": bool(gpu_slots),
+        }
+        if server.zerotier_ip:
+            host_vars["zerotier_ip"] = server.zerotier_ip
+        if server.is_local:
+            host_vars["ansible_connection"] = "local"
+        if gpu_slots:
+            host_vars["assigned_pci_slots"] = gpu_slots
+        desktop = server.desktop if server.desktop is not None else server.is_local
+        host_vars["server_type"] = "desktop" if desktop else "headless"
+        if server.hardware.gpu_detected:
+            host_vars["gpu_type"] = "nvidia"
+            if server.hardware.gpu_model:
+                host_vars["gpu_model"] = server.hardware.gpu_model
+
+        add(("baremetal",), host, host_vars)
+        add(("baremetal", "desktops" if desktop else "headless"), host)
+        add(("arch", server.hardware.architecture), host)
+        if server.zerotier_ip:
+            add(("zerotier_nodes",), host)
+        if server.is_local:
+            add(("management",), host)
+        if server.role in (ServerRole.HYBRID, ServerRole.DIRECT):
+            if server.k8s_role == NodeRole.CONTROL_PLANE:
+                add(("microk8s", "microk8s_control_plane"), host)
+            elif server.k8s_role == NodeRole.WORKER:
+                add(("microk8s", "microk8s_workers"), host)
+            if server.hardware.gpu_detected and server.hardware.gpu_model and not gpu_slots:
+                _group(children, "baremetal_gpus")["vars"][host] = {
+                    "gpu_type": server.hardware.gpu_model,
+                    "gpu_device": "/dev/nvidia0",
+                }
+
+        if server.containers and lxd_primary:
+            add(("lxd_cluster", "lxd_primary" if host == lxd_primary else "lxd_secondary"), host)
+
+        container_configs = []
+        for container in server.containers:
+            container_vars = {
+                "parent_host": host,
+                "memory": container.memory,
+                "cpu_cores": container.cpu_cores,
+                "disk_size": container.disk_size,
+                "arch": container.architecture,
+                "zerotier_enabled": container.zerotier_ip is not None,
+                "gpu_passthrough": container.gpu_passthrough,
+            }
+            for field in ("lan_ip", "internal_ip", "zerotier_ip", "gpu_type"):
+                if getattr(container, field):
+                    container_vars[field] = getattr(container, field)
+            if container.gpu_passthrough and container.pci_slot:
+                container_vars["pci_slot"] = _gpu_slot(container.pci_slot)
+
+            k8s_role = container.k8s_role or {
+                ContainerType.K8S_CONTROL: NodeRole.CONTROL_PLANE,
+                ContainerType.K8S_WORKER: NodeRole.WORKER,
+            }.get(container.type)
+            if container.type == ContainerType.DNS:
+                add(("lxd_containers", "dns_containers"), container.name, container_vars)
+                add(("dns_servers",), container.name)
+            elif k8s_role == NodeRole.CONTROL_PLANE:
+                add(("lxd_containers", "microk8s_containers", "controllers"), container.name, container_vars)
+                add(("microk8s", "microk8s_control_plane"), container.name)
+            elif k8s_role == NodeRole.WORKER:
+                add(("lxd_containers", "microk8s_containers", "workers"), container.name, container_vars)
+                add(("microk8s", "microk8s_workers"), container.name)
+            else:
+                # Custom containers without a Kubernetes role stay out of the cluster
+                add(("lxd_containers",), container.name, container_vars)
+            add(("arch", container.architecture), container.name)
+            if container.zerotier_ip:
+                add(("zerotier_nodes",), container.name)
+            if container.gpu_passthrough:
+                add(("gpu_passthrough_vms",), container.name)
+
+            container_config = {"name": container.name, "gpu_passthrough": container.gpu_passthrough}
+            if container.gpu_type:
+                container_config["gpu_type"] = container.gpu_type
+            if container.gpu_passthrough and container.pci_slot:
+                container_config["pci_slot"] = container.pci_slot
+            container_configs.append(container_config)
+        if container_configs:
+            _group(children, "container_configs")["vars"][host] = container_configs
+
+    return {"all": {"vars": all_vars, "children": children}}
+
+
+def _host_vars(inventory: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """Merged variables of every host and the groups each host is listed in"""
+    host_vars: Dict[str, Dict[str, Any]] = {}
+    memberships: Dict[str, List[str]] = {}
+
+    def walk(name: str, group: Dict[str, Any]):
+        for host, values in ((group or {}).get("hosts") or {}).items():
+            host_vars.setdefault(host, {}).update(values or {})
+            memberships.setdefault(host, []).append(name)
+        for child_name, child in ((group or {}).get("children") or {}).items():
+            walk(child_name, child)
+
+    walk("all", inventory.get("all") or {})
+    return host_vars, memberships
+
+
+def validate_inventory(inventory: Dict[str, Any]) -> List[str]:
+    """Return the problems that would make playbooks fail, empty when valid"""
+    errors: List[str] = []
+    if not isinstance(inventory, dict) or not isinstance(inventory.get("all"), dict):
+        return ["Inventory has no 'all' group"]
+    all_vars = inventory["all"].get("vars") or {}
+    for required in ("domain_name", "system_username", "network_cidr", "zerotier_cidr"):
+        if not all_vars.get(required):
+            errors.append(f"Missing all.vars.{required}")
+
+    host_vars, memberships = _host_vars(inventory)
+    baremetal = {h for h, groups in memberships.items() if "baremetal" in groups}
+    containers = {h for h, groups in memberships.items() if CONTAINER_GROUPS & set(groups)}
+
+    for host, values in host_vars.items():
+        if host in containers:
+            if values.get("parent_host") not in baremetal:
+                errors.append(f"Container {host} has unknown parent_host {values.get('parent_host')!r}")
+        elif not values.get("ansible_host") and values.get("ansible_connection") != "local":
+            errors.append(f"Host {host} has no ansible_host")
+
+    for host, groups in sorted(memberships.items()):
+        if MICROK8S_CONTAINER_GROUPS & set(groups) and not MICROK8S_GROUPS & set(groups):
+            errors.append(f"Container {host} is in microk8s_containers but in no microk8s group")
+
+    control_planes = [h for h, groups in memberships.items() if "microk8s_control_plane" in groups]
+    if len(control_planes) != 1:
+        errors.append(f"Exactly one control plane required, found {len(control_planes)}")
+    if not any("microk8s_workers" in groups for groups in memberships.values()):
+        errors.append("At least one worker node required")
+    local_hosts = [h for h, v in host_vars.items() if v.get("ansible_connection") == "local"]
+    if len(local_hosts) > 1:
+        errors.append(f"More than one host uses the local connection: {', '.join(sorted(local_hosts))}")
+
+    networks = {}
+    for field, cidr_var in (("lan_ip", "network_cidr"), ("zerotier_ip", "zerotier_cidr")):
+        try:
+            networks[field] = ipaddress.ip_network(all_vars.get(cidr_var), strict=False)
+        except (TypeError, ValueError):
+            networks[field] = None
+    seen: Dict[Tuple[str, str], str] = {}
+    for host, values in sorted(host_vars.items()):
+        for field in ("lan_ip", "internal_ip", "zerotier_ip"):
+            address = values.get(field)
+            if not address:
+                continue
+            try:
+                ip = ipaddress.ip_address(address)
+            except ValueError:
+                errors.append(f"Host {host} has invalid {field} {address!r}")
+                continue
+            if networks.get(field) is not None and ip not in networks[field]:
+                errors.append(f"Host {host} {field} {address} is outside {networks[field]}")
+            owner = seen.setdefault((field, address), host)
+            if owner != host:
+                errors.append(f"Hosts {owner} and {host} share {field} {address}")
+    return errors
+
+
+def render_inventory(inventory: Dict[str, Any]) -> str:
+    return INVENTORY_HEADER + yaml.safe_dump(inventory, sort_keys=False, default_flow_style=False)
+
+
+def parse_inventory(text: str) -> Dict[str, Any]:
+    """Parse inventory text, raising InventoryError when it is not an inventory"""
+    try:
+        inventory = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise InventoryError(f"Inventory is not valid YAML: {e}")
+    if not isinstance(inventory, dict) or not isinstance(inventory.get("all"), dict):
+        raise InventoryError("Inventory has no 'all' group")
+    return inventory
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def write_inventory(text: str, inventory_path: Path = INVENTORY_PATH) -> Tuple[bool, str]:
+    """
+    Write inventory text unless the file already has exactly this content
+
+    The file is replaced atomically. Returns whether it was written and the
+    content hash.
+    """
+    if not text.endswith('\n'):
+        text += '\n'
+    digest = content_hash(text)
+    try:
+        if content_hash(inventory_path.read_text()) == digest:
+            return False, digest
+    except OSError:
+        pass
+
+    inventory_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = inventory_path.with_name(inventory_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, inventory_path)
+    logger.info(f"Updated inventory at {inventory_path}")
+    return True, digest
+
@@ -25,6 +25,16 @@ class NodeRole(str, Enum):
     WORKER = "worker"
 
 
+class GPUPassthroughInfo(BaseModel):
+    pci_address: str  # e.g., "01:00.0"
+    iommu_group: Optional[str] = None
+    passthrough_eligible: bool = False
+    status: str  # isolated, shared or no_group
+    model: Optional[str] = None
+    driver: Optional[str] = None
+    blocking_devices: List[str] = []  # Group members that prevent passthrough
+
+
 class HardwareInfo(BaseModel):
     cpu_cores: int
     cpu_model: str
@@ -34,6 +44,11 @@ class HardwareInfo(BaseModel):
     gpu_model: Optional[str] = None
     gpu_count: int = 0
     architecture: str  # x86_64 or arm64
+    gpu_passthrough_info: Optional[List[GPUPassthroughInfo]] = None
+    iommu_enabled: Optional[bool] = None
+    gpu_passthrough_eligible_count: Optional[int] = None
+    iommu_group_count: Optional[int] = None
+    vfio_bound_devices: Optional[List[str]] = None
 
 
 class Container(BaseModel):
@@ -46,6 +61,11 @@ class Container(BaseModel):
     gpu_passthrough: bool = False
     gpu_type: Optional[str] = None
     k8s_role: Optional[NodeRole] = None
+    lan_ip: Optional[str] = None
+    internal_ip: Optional[str] = None  # Address on the LXD bridge
+    zerotier_ip: Optional[str] = None
+    pci_slot: Optional[str] = None  # GPU passed through, e.g., "01:00.0"
+    architecture: str = "x86_64"
 
 
 class ServerInfo(BaseModel):
@@ -56,6 +76,20 @@ class ServerInfo(BaseModel):
     containers: List[Container] = []
     ssh_available: bool = False
     ssh_username: str = "thinkube"
+    k8s_role: Optional[NodeRole] = None  # For hybrid and direct servers
+    zerotier_ip: Optional[str] = None
+    is_local: bool = False  # The server the installer runs on
+    desktop: Optional[bool] = None  # Defaults to is_local
+
+
+class InventoryNetwork(BaseModel):
+    cidr: str = "192.168.1.0/24"
+    gateway: str = "192.168.1.1"
+    zerotier_cidr: str = "192.168.191.0/24"
+    lxd_ipv4_address: str = "192.168.100.1/24"
+    primary_ingress_octet: int = 200
+    secondary_ingress_octet: int = 201
+    dns_servers: List[str] = ["8.8.8.8", "8.8.4.4"]
 
 
 class ClusterConfig(BaseModel):
@@ -66,6 +100,9 @@ class ClusterConfig(BaseModel):
     zerotier_network_id: str
     zerotier_api_token: str
     servers: List[ServerInfo] = []
+    system_username: str = "thinkube"
+    network: InventoryNetwork = InventoryNetwork()
+    lxd_primary: Optional[str] = None  # Defaults to the first container host
 
 
 class NetworkDiscoveryRequest(BaseModel):
@@ -0,0 +1 @@
+# Standalone scripts executed on target hosts
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Thinkube hardware probe
+
+Self-contained, standard-library-only script that is copied to a host and
+run there with python3. It collects every hardware fact the installer needs
+from /proc and /sys in one execution and prints a single JSON document, so
+detecting a host costs one round trip instead of a command per fact. The
+installer imports it to read its own host in-process.
+
+Every reader takes a root directory, so the probe can also be pointed at a
+captured copy of /proc and /sys, such as the fixtures next to this file
+(run from app/probes):
+
+    python3 hardware_probe.py --root fixtures/dual-gpu
+    python3 hardware_probe.py --root fixtures/dual-gpu --bench 1000
+
+Bump SCHEMA_VERSION whenever the shape of the document changes.
+"""
+
+import json
+import os
+import platform
+import socket
+import sys
+import time
+
+SCHEMA_VERSION = 1
+
+PCI_IDS_PATHS = (
+    "/usr/share/misc/pci.ids",
+    "/usr/share/hwdata/pci.ids",
+    "/usr/share/pci.ids",
+)
+
+
+def host_path(root, path):
+    """Map an absolute path on the probed system into the root directory"""
+    return os.path.join(root, path.lstrip("/"))
+
+
+def read_text(path, default=None):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def link_name(path):
+    """Return the last component of a symlink target, or None"""
+    try:
+        return os.path.basename(os.readlink(path))
+    except OSError:
+        return None
+
+
+def probe_cpu(root="/"):
+    model = None
+    processors = 0
+    cpuinfo = read_text(host_path(root, "/proc/cpuinfo"), "")
+    for line in cpuinfo.splitlines():
+        key, _, value = line.partition(":")
+        key = key.strip()
+        if key == "processor":
+            processors += 1
+        # x86 reports "model name", most ARM kernels "Model" or only "CPU part"
+        elif model is None and key in ("model name", "Model", "Hardware") and value.strip():
+            model = value.strip()
+
+    cores = processors
+    if root == "/":
+        # Like nproc, count only the CPUs this process may run on
+        try:
+            cores = len(os.sched_getaffinity(0))
+        except (AttributeError, OSError):
+            cores = os.cpu_count() or processors
+    return {"cores": cores, "model": model}
+
+
+def probe_memory(root="/"):
+    for line in read_text(host_path(root, "/proc/meminfo"), "").splitlines():
+        if line.startswith("MemTotal:"):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+def probe_disk(root="/"):
+    # The size of a captured tree is not the size of its disk; fixtures may record it
+    if root != "/":
+        recorded = read_text(host_path(root, "disk_bytes"))
+        if recorded and recorded.isdigit():
+            return int(recorded)
+    try:
+        stat = os.statvfs(root)
+    except OSError:
+        return 0
+    return stat.f_blocks * stat.f_frsize
+
+
+def probe_pci_devices(root="/"):
+    devices = []
+    base = host_path(root, "/sys/bus/pci/devices")
+    try:
+        addresses = sorted(os.listdir(base))
+    except OSError:
+        return devices
+    for address in addresses:
+        path = os.path.join(base, address)
+        devices.append({
+            "address": address,
+            "class": (read_text(os.path.join(path, "class")) or "0x000000")[2:],
+            "vendor": (read_text(os.path.join(path, "vendor")) or "0x0000")[2:],
+            "device": (read_text(os.path.join(path, "device")) or "0x0000")[2:],
+            "driver": link_name(os.path.join(path, "driver")),
+            "iommu_group": link_name(os.path.join(path, "iommu_group")),
+        })
+    return devices
+
+
+def probe_iommu(root="/"):
+    try:
+        groups = os.listdir(host_path(root, "/sys/kernel/iommu_groups"))
+    except OSError:
+        return {"present": False, "group_count": 0}
+    return {"present": True, "group_count": len(groups)}
+
+
+def resolve_names(devices, root="/"):
+    """
+    Name display controllers from the host's pci.ids, scanning only as far
+    as needed; other devices are left unnamed to keep the document small
+    """
+    wanted = {}
+    for device in devices:
+        if device["class"].startswith("03"):
+            wanted.setdefault(device["vendor"], set()).add(device["device"])
+    if not wanted:
+        return
+
+    names = {}
+    for path in PCI_IDS_PATHS:
+        try:
+            f = open(host_path(root, path), "r", encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        with f:
+            vendor = None
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                if line.startswith("C "):
+                    break  # Device classes follow the vendor list
+                if not line.startswith("\t"):
+                    vendor = line[:4]
+                    continue
+                if vendor in wanted and not line.startswith("\t\t"):
+                    device_id = line[1:5]
+                    if device_id in wanted[vendor]:
+                        names[(vendor, device_id)] = line[5:].strip()
+        break
+
+    for device in devices:
+        name = names.get((device["vendor"], device["device"]))
+        if name:
+            device["name"] = name
+
+
+def collect(root="/"):
+    """Collect the hardware report of the system mounted at root"""
+    devices = probe_pci_devices(root)
+    resolve_names(devices, root)
+    live = root == "/"
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "hostname": read_text(host_path(root, "/proc/sys/kernel/hostname")) or (socket.gethostname() if live else None),
+        "boot_id": read_text(host_path(root, "/proc/sys/kernel/random/boot_id")),
+        # The machine type is not exposed under /proc; fixtures may record it
+        "architecture": (platform.machine() if live else read_text(host_path(root, "machine"))) or "unknown",
+        "kernel": read_text(host_path(root, "/proc/sys/kernel/osrelease")) or (platform.release() if live else None),
+        "cpu": probe_cpu(root),
+        "memory_bytes": probe_memory(root),
+        "disk_bytes": probe_disk(root),
+        "iommu": probe_iommu(root),
+        "pci_devices": devices,
+    }
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the hardware report of this host as JSON")
+    parser.add_argument("--root", default="/", help="Read /proc and /sys below this directory")
+    parser.add_argument("--bench", type=int, metavar="N", help="Time N collections instead of printing the report")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        start = time.perf_counter()
+        for _ in range(args.bench):
+            collect(args.root)
+        elapsed = time.perf_counter() - start
+        print("Collected %d reports in %.3fs (%.2f ms/report)" % (args.bench, elapsed, elapsed * 1000 / args.bench))
+    else:
+        print(json.dumps(collect(args.root), separators=(",", ":")))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,212 @@
+"""
+Content-addressed store of saved cluster configurations
+
+Every configuration saved from the Node Configuration view is stored once,
+under the SHA-256 of its canonical JSON, in installer_configs/objects. A
+small index lists the saves (time, hash and summary) newest last, so listing,
+lookups and diffs are answered from the index without scanning the
+directory. Saving a configuration identical to the latest one adds nothing,
+and saves beyond the retention count are dropped together with the blobs no
+remaining save refers to.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigNotFoundError(KeyError):
+    """Raised when a reference does not name exactly one stored configuration"""
+
+
+def canonical_json(config: Any) -> bytes:
+    return json.dumps(config, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def config_hash(config: Any) -> str:
+    return hashlib.sha256(canonical_json(config)).hexdigest()
+
+
+def _flatten(value: Any, path: str, out: Dict[str, Any]):
+    if isinstance(value, dict) and value:
+        for key, item in value.items():
+            _flatten(item, f"{path}/{key}", out)
+    elif isinstance(value, list) and value:
+        for index, item in enumerate(value):
+            _flatten(item, f"{path}/{index}", out)
+    else:
+        out[path or "/"] = value
+
+
+def diff_configs(old: Any, new: Any) -> List[Dict[str, Any]]:
+    """The leaf values that differ between two configurations, by path"""
+    old_leaves, new_leaves = {}, {}
+    _flatten(old, "", old_leaves)
+    _flatten(new, "", new_leaves)
+    changes = []
+    for path in sorted(set(old_leaves) | set(new_leaves)):
+        if path not in new_leaves:
+            changes.append({"path": path, "change": "removed", "old": old_leaves[path]})
+        elif path not in old_leaves:
+            changes.append({"path": path, "change": "added", "new": new_leaves[path]})
+        elif old_leaves[path] != new_leaves[path]:
+            changes.append({
+                "path": path, "change": "changed",
+                "old": old_leaves[path], "new": new_leaves[path]
+            })
+    return changes
+
+
+class ClusterConfigStore:
+    """Deduplicating, indexed store of cluster configurations"""
+
+    def __init__(self, config_dir: Optional[Path] = None, retention: int = 20):
+        self.config_dir = config_dir or Path.home() / "thinkube" / "inventory" / "installer_configs"
+        self.objects_dir = self.config_dir / "objects"
+        self.index_file = self.config_dir / "index.json"
+        self.retention = retention
+        self._entries: Optional[List[Dict[str, Any]]] = None
+
+    def _load(self) -> List[Dict[str, Any]]:
+        """Load the index on first use"""
+        if self._entries is None:
+            self._entries = []
+            if self.index_file.exists():
+                try:
+                    with open(self.index_file, 'r') as f:
+                        self._entries = json.load(f).get("entries", [])
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable config index {self.index_file}: {e}")
+            elif self.config_dir.is_dir():
+                self._import_legacy()
+        return self._entries
+
+    def _import_legacy(self):
+        """
+        Adopt the cluster_config_<timestamp>.json files of older installers
+
+        Each imported file is removed once the index is saved, so the files
+        are not imported again if the index is lost. Unreadable files are
+        left in place.
+        """
+        imported = []
+        for legacy_file in sorted(self.config_dir.glob("cluster_config_*.json")):
+            try:
+                with open(legacy_file, 'r') as f:
+                    config = json.load(f)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable legacy config {legacy_file}: {e}")
+                continue
+            self._add(config, {}, saved_at=legacy_file.stat().st_mtime)
+            imported.append(legacy_file)
+        if self._entries:
+            logger.info(f"Imported {len(self._entries)} legacy cluster configurations")
+            self._collect_garbage()
+            self._save_index()
+        for legacy_file in imported:
+            legacy_file.unlink(missing_ok=True)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects_dir / f"{digest}.json"
+
+    def _write_atomic(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(path.name + '.tmp')
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+
+    def _save_index(self):
+        self._write_atomic(
+            self.index_file,
+            json.dumps({"version": 1, "entries": self._entries}, indent=2).encode()
+        )
+
+    def _add(self, config: Dict[str, Any], summary: Dict[str, Any], saved_at: float) -> Tuple[Dict[str, Any], bool]:
+        entries = self._load()
+        digest = config_hash(config)
+        if entries and entries[-1]["hash"] == digest:
+            return entries[-1], False
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            self._write_atomic(blob, canonical_json(config))
+        entry = {"hash": digest, "saved_at": saved_at, "summary": summary}
+        entries.append(entry)
+        return entry, True
+
+    def _collect_garbage(self):
+        entries = self._load()
+        if len(entries) <= self.retention:
+            return
+        dropped = entries[:len(entries) - self.retention]
+        del entries[:len(dropped)]
+        kept = {entry["hash"] for entry in entries}
+        for digest in {entry["hash"] for entry in dropped} - kept:
+            self.blob_path(digest).unlink(missing_ok=True)
+        logger.debug(f"Dropped {len(dropped)} cluster configurations beyond retention")
+
+    def save(self, config: Dict[str, Any], summary: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store a configuration
+
+        Returns the index entry and whether it is new; saving the same
+        configuration as the latest save returns the existing entry.
+        """
+        entry, created = self._add(config, summary, saved_at=time.time())
+        if created:
+            self._collect_garbage()
+            self._save_index()
+        return entry, created
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """The saves in the index, newest first"""
+        return list(reversed(self._load()))
+
+    def resolve(self, ref: str) -> Dict[str, Any]:
+        """
+        Find the index entry for a reference
+
+        A reference is "latest", a full hash or a unique hash prefix of at
+        least six characters.
+        """
+        entries = self._load()
+        if ref == "latest":
+            if not entries:
+                raise ConfigNotFoundError("No configuration has been saved")
+            return entries[-1]
+        if len(ref) < 6:
+            raise ConfigNotFoundError(f"Reference {ref!r} is too short")
+        matches = {entry["hash"]: entry for entry in entries if entry["hash"].startswith(ref)}
+        if len(matches) != 1:
+            raise ConfigNotFoundError(
+                f"Reference {ref!r} matches {len(matches)} configurations"
+            )
+        # The newest save of that content
+        return next(entry for entry in reversed(entries) if entry["hash"] in matches)
+
+    def get(self, ref: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return the index entry and the configuration for a reference"""
+        entry = self.resolve(ref)
+        with open(self.blob_path(entry["hash"]), 'r') as f:
+            return entry, json.load(f)
+
+    def diff(self, base: str, target: str) -> Dict[str, Any]:
+        """Changes from the base configuration to the target configuration"""
+        base_entry, base_config = self.get(base)
+        target_entry, target_config = self.get(target)
+        return {
+            "base": base_entry,
+            "target": target_entry,
+            "changes": diff_configs(base_config, target_config)
+        }
+
+
+# Singleton instance
+cluster_config_store = ClusterConfigStore()
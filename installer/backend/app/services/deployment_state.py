@@ -0,0 +1,251 @@
+"""
+Journaled store of the deployment state
+
+The Deploy view saves its progress often, usually changing only a few
+fields. Instead of rewriting the whole state file every time, each save is
+turned into a small list of patch operations appended to a journal. Saves
+that arrive together share one fsync, and once the journal grows it is
+compacted into a snapshot that is written atomically. Reads are served from
+memory.
+
+On disk the state is deployment-state.json (the plain state, as before) plus
+deployment-state.journal with one JSON line per save. Replaying a journal is
+idempotent, so a crash between writing a snapshot and truncating the journal
+does no harm, and a torn last line from a crash mid-append is dropped.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(key: str) -> str:
+    return key.replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def diff_state(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    Patch operations that turn old into new
+
+    Objects are compared key by key; any other value that differs is
+    replaced as a whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff_state(old[key], value, child))
+        return ops
+    if old != new or type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+def apply_patch(state: Any, ops: List[Dict[str, Any]]) -> Any:
+    """
+    Apply patch operations produced by diff_state
+
+    Missing parents are created and removing a missing key is a no-op, which
+    keeps replaying a journal over a newer snapshot safe.
+    """
+    for op in ops:
+        if op["path"] == "":
+            state = copy.deepcopy(op["value"]) if op["op"] != "remove" else {}
+            continue
+        tokens = [_unescape(t) for t in op["path"].split('/')[1:]]
+        if not isinstance(state, dict):
+            state = {}
+        parent = state
+        for token in tokens[:-1]:
+            if not isinstance(parent.get(token), dict):
+                parent[token] = {}
+            parent = parent[token]
+        if op["op"] == "remove":
+            parent.pop(tokens[-1], None)
+        else:
+            parent[tokens[-1]] = copy.deepcopy(op["value"])
+    return state
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DeploymentStateStore:
+    """In-memory deployment state backed by a snapshot and a patch journal"""
+
+    def __init__(
+        self,
+        state_dir: Optional[Path] = None,
+        compact_after: int = 200,
+        sync_window: float = 0.01
+    ):
+        self.state_dir = state_dir or Path.home() / ".thinkube-installer"
+        self.snapshot_file = self.state_dir / "deployment-state.json"
+        self.journal_file = self.state_dir / "deployment-state.journal"
+        self.compact_after = compact_after
+        self.sync_window = sync_window
+        self._state: Optional[Dict[str, Any]] = None
+        self._loaded = False
+        self._journal_fd: Optional[int] = None
+        self._journal_entries = 0
+        self._lock = asyncio.Lock()
+        self._sync: Optional[asyncio.Task] = None
+        self._appended = 0  # Sequence number of the last append
+        self._synced = 0  # Appends up to this one are known to be on disk
+
+    def _load(self):
+        """Read the snapshot and replay the journal on first use"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.snapshot_file.exists():
+            try:
+                with open(self.snapshot_file, 'r') as f:
+                    self._state = json.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable deployment state snapshot: {e}")
+        if not self.journal_file.exists():
+            return
+
+        good_length = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning("Dropping torn entry at the end of the deployment state journal")
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                self._state = apply_patch(self._state if self._state is not None else {}, entry["ops"])
+                self._journal_entries += 1
+                good_length += len(line)
+        if good_length != self.journal_file.stat().st_size:
+            os.truncate(self.journal_file, good_length)
+
+    def _open_journal(self) -> int:
+        if self._journal_fd is None:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            self._journal_fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        return self._journal_fd
+
+    def _append(self, entry: Dict[str, Any]) -> int:
+        os.write(self._open_journal(), (json.dumps(entry, separators=(',', ':')) + '\n').encode())
+        self._journal_entries += 1
+        self._appended += 1
+        return self._appended
+
+    async def _flush(self, seq: int):
+        """Wait until the append with this sequence number is on disk"""
+        # Saves that arrive within the window share one fsync. An fsync that
+        # was already running when this append was written may not cover it,
+        # so keep going until one that started afterwards has finished.
+        while self._synced < seq:
+            if self._sync is None or self._sync.done():
+                self._sync = asyncio.ensure_future(self._fsync_later())
+            await asyncio.shield(self._sync)
+
+    async def _fsync_later(self):
+        await asyncio.sleep(self.sync_window)
+        fd = self._journal_fd
+        covered = self._appended
+        if fd is not None:
+            await asyncio.get_running_loop().run_in_executor(None, os.fsync, fd)
+        self._synced = max(self._synced, covered)
+
+    def _truncate_journal(self):
+        if self._journal_fd is not None:
+            os.ftruncate(self._journal_fd, 0)
+            os.fsync(self._journal_fd)
+        elif self.journal_file.exists():
+            os.truncate(self.journal_file, 0)
+        self._journal_entries = 0
+        # Everything appended so far is in the snapshot, or deliberately gone
+        self._synced = max(self._synced, self._appended)
+
+    def _write_snapshot(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        if self._state is None:
+            # Drop the journal first so a crash cannot resurrect part of the state
+            self._truncate_journal()
+            self.snapshot_file.unlink(missing_ok=True)
+            _fsync_dir(self.state_dir)
+            return
+        tmp_file = self.snapshot_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self._state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        _fsync_dir(self.state_dir)
+        # Only now is the journal redundant
+        self._truncate_journal()
+
+    async def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        async with self._lock:
+            self._load()
+            await asyncio.get_running_loop().run_in_executor(None, self._write_snapshot)
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """The current state, or None when nothing has been saved"""
+        self._load()
+        return copy.deepcopy(self._state)
+
+    async def save(self, state: Dict[str, Any]) -> int:
+        """Store a new state and return the number of changed fields"""
+        async with self._lock:
+            self._load()
+            ops = diff_state(self._state, state) if self._state is not None else [
+                {"op": "replace", "path": "", "value": state}
+            ]
+            if not ops:
+                return 0
+            seq = self._append({"ops": ops})
+            self._state = apply_patch(self._state, ops)
+        await self._flush(seq)
+        if self._journal_entries >= self.compact_after:
+            await self.compact()
+        return len(ops)
+
+    async def clear(self) -> bool:
+        """Forget the state; returns whether there was one"""
+        async with self._lock:
+            self._load()
+            existed = self._state is not None
+            self._state = None
+            await asyncio.get_running_loop().run_in_executor(None, self._write_snapshot)
+        return existed
+
+    async def close(self):
+        """Compact and release the journal"""
+        if self._loaded and self._journal_entries:
+            await self.compact()
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+
+
+# Singleton instance
+deployment_state_store = DeploymentStateStore()
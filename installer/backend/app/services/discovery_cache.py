@@ -0,0 +1,131 @@
+"""
+Persistent cache of network discovery results
+
+Stores the last known state of every host seen by a discovery scan, keyed by
+network CIDR and IP address, so the discovery page can show results
+immediately and later scans only need to re-probe part of the network.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DiscoveryCache:
+    """File-backed cache of discovered hosts per network"""
+
+    def __init__(
+        self,
+        cache_file: Optional[Path] = None,
+        rotation_size: int = 64,
+        max_age: int = 7 * 24 * 3600
+    ):
+        self.cache_file = cache_file or Path.home() / ".thinkube-installer" / "discovery-cache.json"
+        self.rotation_size = rotation_size  # Not-yet-alive hosts re-probed per incremental scan
+        self.max_age = max_age  # Drop hosts not seen for this many seconds
+        self._networks: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the cache file on first use"""
+        if self._networks is None:
+            self._networks = {}
+            if self.cache_file.exists():
+                try:
+                    with open(self.cache_file, 'r') as f:
+                        self._networks = json.load(f).get("networks", {})
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable discovery cache {self.cache_file}: {e}")
+        return self._networks
+
+    def save(self):
+        """Write the cache atomically so a crash never leaves a torn file"""
+        networks = self._load()
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({"version": 1, "networks": networks}, f)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Failed to save discovery cache: {e}")
+
+    def get_network(self, network_cidr: str) -> Optional[Dict[str, Any]]:
+        """Return the cached scan state for a network, or None if never scanned"""
+        return self._load().get(network_cidr)
+
+    def get_hosts(self, network_cidr: str) -> List[Dict[str, Any]]:
+        """Return all cached hosts of a network"""
+        network = self.get_network(network_cidr)
+        if not network:
+            return []
+        return list(network["hosts"].values())
+
+    def incremental_targets(self, network_cidr: str, all_ips: List[str]) -> List[str]:
+        """
+        Select the IPs to re-probe in an incremental scan
+
+        Every host that was alive last time is probed again, plus a rotating
+        slice of the remaining addresses so new hosts are eventually found
+        without sweeping the whole network on every visit.
+        """
+        network = self.get_network(network_cidr)
+        if not network:
+            return list(all_ips)
+
+        alive = [ip for ip in all_ips if ip in network["hosts"]]
+        alive_set = set(alive)
+        rest = [ip for ip in all_ips if ip not in alive_set]
+        if not rest:
+            return alive
+
+        offset = network.get("rotation_offset", 0) % len(rest)
+        count = min(self.rotation_size, len(rest))
+        rotation = [rest[(offset + i) % len(rest)] for i in range(count)]
+        network["rotation_offset"] = (offset + count) % len(rest)
+
+        return alive + rotation
+
+    def record_scan(self, network_cidr: str, probed_ips: List[str], results: List[Dict[str, Any]]):
+        """
+        Merge the results of a (possibly partial) scan into the cache
+
+        Hosts that were probed but did not answer are removed; hosts outside
+        the probed set keep their previous entry until they expire.
+        """
+        networks = self._load()
+        network = networks.setdefault(network_cidr, {"hosts": {}, "rotation_offset": 0})
+        hosts = network["hosts"]
+        now = time.time()
+
+        for ip in probed_ips:
+            hosts.pop(ip, None)
+
+        for result in results:
+            entry = dict(result)
+            entry["last_seen"] = now
+            hosts[result["ip"]] = entry
+
+        # Expire hosts that have not been seen for a long time
+        for ip in [ip for ip, entry in hosts.items() if now - entry.get("last_seen", 0) > self.max_age]:
+            del hosts[ip]
+
+        network["last_scan"] = now
+        self.save()
+
+    def clear(self, network_cidr: Optional[str] = None):
+        """Forget one network, or everything"""
+        networks = self._load()
+        if network_cidr is None:
+            networks.clear()
+        else:
+            networks.pop(network_cidr, None)
+        self.save()
+
+
+# Singleton instance
+discovery_cache = DiscoveryCache()
@@ -0,0 +1,239 @@
+"""
+Secure store for the tokens in ~/.env
+
+The parsed file is cached in memory and only re-read when its inode, mtime
+or size changes. Updates are read-modify-write cycles under an exclusive
+lock (a thread lock within the process, flock on a lock file across
+processes), so concurrent stores never lose each other's tokens. The new
+content is written to a temporary file that is 0600 from the moment it is
+created and then renamed over ~/.env, so the file is never torn or readable
+by others. Lines the store does not manage (comments, other variables) are
+kept as they are.
+
+Run as a module to check those guarantees on a temporary file, with many
+threads and processes storing at once:
+
+    python -m app.services.env_store check [--threads 300] [--processes 8]
+"""
+
+import fcntl
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+ENV_HEADER = (
+    "# Thinkube secure token storage\n"
+    "# This file contains sensitive tokens and should not be shared\n\n"
+)
+
+
+def parse_env(lines: List[str]) -> Dict[str, str]:
+    env_vars = {}
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#') and '=' in line:
+            key, value = line.split('=', 1)
+            env_vars[key.strip()] = value.strip()
+    return env_vars
+
+
+class EnvStore:
+    """Cached, lock-protected access to a KEY=value file"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or Path.home() / ".env"
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._mutex = threading.Lock()
+        self._identity: Optional[Tuple[int, int, int]] = None
+        self._lines: List[str] = []
+        self._values: Dict[str, str] = {}
+
+    def _stat_identity(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        """Re-read the file if it changed since it was last parsed"""
+        identity = self._stat_identity()
+        if identity is not None and identity == self._identity:
+            return
+        try:
+            f = open(self.path, 'r')
+        except FileNotFoundError:
+            self._identity, self._lines, self._values = None, [], {}
+            return
+        with f:
+            # Identity of exactly what is read, in case the file is replaced meanwhile
+            stat = os.fstat(f.fileno())
+            self._identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._lines = f.readlines()
+        self._values = parse_env(self._lines)
+
+    @contextmanager
+    def _locked(self):
+        with self._mutex:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def read(self) -> Dict[str, str]:
+        """All variables in the file"""
+        with self._mutex:
+            self._refresh()
+            return dict(self._values)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.read().get(key)
+
+    def update(self, updates: Mapping[str, Optional[str]]):
+        """Set variables, or remove those whose value is None, in one atomic write"""
+        with self._locked():
+            self._refresh()
+            lines = list(self._lines) or ENV_HEADER.splitlines(keepends=True)
+            pending = dict(updates)
+            new_lines = []
+            for line in lines:
+                stripped = line.strip()
+                key = stripped.split('=', 1)[0].strip() if '=' in stripped and not stripped.startswith('#') else None
+                if key in pending:
+                    value = pending.pop(key)
+                    if value is not None:
+                        new_lines.append(f"{key}={value}\n")
+                    continue
+                if key is not None and key in updates:
+                    # Drop duplicate definitions of an updated key
+                    continue
+                new_lines.append(line if line.endswith('\n') else line + '\n')
+            for key, value in pending.items():
+                if value is not None:
+                    new_lines.append(f"{key}={value}\n")
+            self._write(new_lines)
+
+    def set(self, key: str, value: str):
+        self.update({key: value})
+
+    def _write(self, lines: List[str]):
+        directory = self.path.parent
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            # mkstemp already creates the file 0600; make sure of it before any secret is written
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._lines = lines
+        self._values = parse_env(lines)
+        self._identity = self._stat_identity()
+
+
+# Singleton instance
+env_store = EnvStore()
+
+
+def _store_worker(path: str, worker: int, count: int):
+    """Store count keys of one worker through its own EnvStore, as another process would"""
+    store = EnvStore(Path(path))
+    for i in range(count):
+        store.set(f"PROC_{worker}_{i}", f"value-{worker}-{i}")
+
+
+def _check(threads: int, processes: int, per_process: int) -> bool:
+    """Store from many threads and processes at once and verify nothing was lost"""
+    import multiprocessing
+    import stat
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / ".env"
+        path.write_text("# kept comment\nUNMANAGED=keep-me\n")
+        store = EnvStore(path)
+        torn_reads = []
+
+        def reader(stop: threading.Event):
+            # Readers must always see a complete file
+            while not stop.is_set():
+                if store.read().get("UNMANAGED") != "keep-me":
+                    torn_reads.append(True)
+
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=_store_worker, args=(str(path), w, per_process)) for w in range(processes)]
+        stop = threading.Event()
+        reader_thread = threading.Thread(target=reader, args=(stop,))
+        writers = [threading.Thread(target=store.set, args=(f"THREAD_{t}", f"value-{t}")) for t in range(threads)]
+
+        start = time.perf_counter()
+        reader_thread.start()
+        for process in workers:
+            process.start()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        for process in workers:
+            process.join()
+        stop.set()
+        reader_thread.join()
+        elapsed = time.perf_counter() - start
+
+        values = EnvStore(path).read()
+        expected = {f"THREAD_{t}": f"value-{t}" for t in range(threads)}
+        expected.update({
+            f"PROC_{w}_{i}": f"value-{w}-{i}" for w in range(processes) for i in range(per_process)
+        })
+        lost = [key for key, value in expected.items() if values.get(key) != value]
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        leftovers = [p.name for p in Path(tmp).iterdir() if p.name.endswith(".tmp")]
+
+        checks = [
+            (f"{len(expected)} stores from {threads} threads and {processes} processes, none lost", not lost),
+            ("unmanaged lines kept", values.get("UNMANAGED") == "keep-me" and "# kept comment\n" in path.read_text()),
+            ("file mode is 0600", mode == 0o600),
+            ("no temporary files left behind", not leftovers),
+            ("readers never saw a torn file", not torn_reads),
+            ("every worker process exited cleanly", all(p.exitcode == 0 for p in workers)),
+        ]
+        for name, ok in checks:
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if lost:
+            print(f"Lost keys: {', '.join(sorted(lost)[:10])}{' ...' if len(lost) > 10 else ''}")
+        print(f"Finished in {elapsed:.2f}s")
+        return all(ok for _, ok in checks)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Secure ~/.env token store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check = subparsers.add_parser("check", help="Verify concurrent stores on a temporary file")
+    check.add_argument("--threads", type=int, default=300)
+    check.add_argument("--processes", type=int, default=8)
+    check.add_argument("--per-process", type=int, default=50)
+
+    args = parser.parse_args()
+    sys.exit(0 if _check(args.threads, args.processes, args.per_process) else 1)
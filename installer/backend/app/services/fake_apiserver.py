@@ -0,0 +1,310 @@
+"""
+Minimal fake Kubernetes API server for exercising the informer cache
+
+Serves list and watch requests for Namespaces, Deployments and Pods over
+plain HTTP from an in-memory object store, the way the real API server does:
+lists carry a resourceVersion, watches stream one JSON event per line and
+resume from a resourceVersion, and an expired watch ends with an ERROR event
+of code 410 so the client has to relist. Only what k8s_informer uses is
+implemented.
+
+Usage:
+    python -m app.services.fake_apiserver check
+    python -m app.services.fake_apiserver serve [--port N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import yaml
+
+RESOURCE_PATHS = {
+    "namespaces": "/api/v1/namespaces",
+    "deployments": "/apis/apps/v1/deployments",
+    "pods": "/api/v1/pods",
+}
+
+
+class FakeApiServer:
+    """In-memory API server for list and watch requests"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.resource_version = 1
+        # path -> (namespace, name) -> object
+        self.objects: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {path: {} for path in RESOURCE_PATHS.values()}
+        self.events: List[Tuple[int, str, str, Dict[str, Any]]] = []  # (resourceVersion, path, type, object)
+        self.compacted: Dict[str, int] = {}  # Watches from before this resourceVersion get 410
+        self.expirations: Dict[str, int] = {}  # Bumped to end the open watches of a path
+        self.list_requests: Dict[str, int] = {path: 0 for path in RESOURCE_PATHS.values()}
+        self.watch_requests: Dict[str, int] = {path: 0 for path in RESOURCE_PATHS.values()}
+        self._changed = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+        self._closing = False
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._closing = True
+        self._notify()
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def write_kubeconfig(self, path: Path):
+        config = {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": "fake", "cluster": {"server": self.url}}],
+            "users": [{"name": "fake", "user": {"token": "fake-token"}}],
+            "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake"}}],
+            "current-context": "fake",
+        }
+        path.write_text(yaml.safe_dump(config))
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def put(self, kind: str, obj: Dict[str, Any], notify: bool = True):
+        """Create or update an object; notify=False changes it without a watch event"""
+        path = RESOURCE_PATHS[kind]
+        metadata = obj.setdefault("metadata", {})
+        key = (metadata.get("namespace", ""), metadata["name"])
+        event_type = "MODIFIED" if key in self.objects[path] else "ADDED"
+        self.resource_version += 1
+        metadata["resourceVersion"] = str(self.resource_version)
+        self.objects[path][key] = obj
+        if notify:
+            self.events.append((self.resource_version, path, event_type, obj))
+            self._notify()
+
+    def delete(self, kind: str, name: str, namespace: str = "", notify: bool = True):
+        path = RESOURCE_PATHS[kind]
+        obj = self.objects[path].pop((namespace, name))
+        self.resource_version += 1
+        obj["metadata"]["resourceVersion"] = str(self.resource_version)
+        if notify:
+            self.events.append((self.resource_version, path, "DELETED", obj))
+            self._notify()
+
+    def expire(self, kind: str):
+        """End the open watches of a resource with 410 Gone, as after an etcd compaction"""
+        path = RESOURCE_PATHS[kind]
+        self.compacted[path] = self.resource_version
+        self.expirations[path] = self.expirations.get(path, 0) + 1
+        self._notify()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while not self._closing:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(' ', 2)
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                url = urlsplit(target)
+                query = dict(parse_qsl(url.query))
+                if method != "GET" or url.path not in self.objects:
+                    self._respond(writer, 404, {"kind": "Status", "code": 404, "message": "not found"})
+                elif query.get("watch") in ("1", "true"):
+                    await self._watch(writer, url.path, query)
+                else:
+                    self.list_requests[url.path] += 1
+                    self._respond(writer, 200, {
+                        "kind": "List",
+                        "apiVersion": "v1",
+                        "metadata": {"resourceVersion": str(self.resource_version)},
+                        "items": list(self.objects[url.path].values()),
+                    })
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    def _respond(self, writer: asyncio.StreamWriter, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode()
+        reason = "OK" if status == 200 else "Not Found"
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+
+    def _send_event(self, writer: asyncio.StreamWriter, event_type: str, obj: Dict[str, Any]):
+        line = json.dumps({"type": event_type, "object": obj}).encode() + b"\n"
+        writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+
+    async def _watch(self, writer: asyncio.StreamWriter, path: str, query: Dict[str, str]):
+        self.watch_requests[path] += 1
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        since = int(query.get("resourceVersion") or self.resource_version)
+        expiration = self.expirations.get(path, 0)
+        gone = {"kind": "Status", "status": "Failure", "reason": "Expired", "code": 410,
+                "message": "too old resource version"}
+        if since < self.compacted.get(path, 0):
+            self._send_event(writer, "ERROR", gone)
+        else:
+            while not self._closing:
+                changed = self._changed
+                for resource_version, event_path, event_type, obj in self.events:
+                    if event_path == path and resource_version > since:
+                        self._send_event(writer, event_type, obj)
+                        since = resource_version
+                await writer.drain()
+                if self.expirations.get(path, 0) != expiration:
+                    self._send_event(writer, "ERROR", gone)
+                    break
+                await changed.wait()
+        writer.write(b"0\r\n\r\n")
+
+
+def _namespace(name: str) -> Dict[str, Any]:
+    return {"metadata": {"name": name}, "status": {"phase": "Active"}}
+
+
+def _deployment(namespace: str, name: str, ready: int) -> Dict[str, Any]:
+    return {
+        "metadata": {"namespace": namespace, "name": name},
+        "spec": {"replicas": 1},
+        "status": {"readyReplicas": ready, "availableReplicas": ready},
+    }
+
+
+def _pod(namespace: str, name: str, ready: bool) -> Dict[str, Any]:
+    return {
+        "metadata": {"namespace": namespace, "name": name},
+        "status": {"phase": "Running", "conditions": [{"type": "Ready", "status": "True" if ready else "False"}]},
+    }
+
+
+async def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+async def _check() -> bool:
+    """Run the informer cache against the fake server: list, watch, 410 and relist"""
+    from .k8s_informer import KubernetesInformerCache
+
+    server = FakeApiServer()
+    server.put("namespaces", _namespace("keycloak"))
+    server.put("deployments", _deployment("keycloak", "keycloak", ready=0))
+    server.put("pods", _pod("keycloak", "keycloak-0", ready=False))
+    await server.start()
+
+    results = []
+
+    def record(name: str, ok: bool):
+        results.append(ok)
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kubeconfig = Path(tmp) / "config"
+        server.write_kubeconfig(kubeconfig)
+        previous = os.environ.get("KUBECONFIG")
+        os.environ["KUBECONFIG"] = str(kubeconfig)
+        informer = KubernetesInformerCache()
+        try:
+            await informer.start()
+            record("initial list syncs every resource", await _wait_for(lambda: informer.synced))
+            status = informer.service_status()["keycloak"]
+            record("listed service is deployed but not ready", status["deployed"] and not status["ready"])
+
+            server.put("deployments", _deployment("keycloak", "keycloak", ready=1))
+            server.put("pods", _pod("keycloak", "keycloak-0", ready=True))
+            record("watch events make the service ready",
+                   await _wait_for(lambda: informer.service_status()["keycloak"]["ready"]))
+
+            server.put("namespaces", _namespace("harbor"))
+            record("watch event adds a namespace",
+                   await _wait_for(lambda: "harbor" in informer.deployed_services()))
+
+            # Lose an event, as if it had been compacted away, then expire the watch
+            lists_before = server.list_requests[RESOURCE_PATHS["namespaces"]]
+            server.delete("namespaces", "harbor", notify=False)
+            server.expire("namespaces")
+            record("410 ERROR event triggers a relist",
+                   await _wait_for(lambda: server.list_requests[RESOURCE_PATHS["namespaces"]] > lists_before))
+            record("relist drops the object whose event was lost",
+                   await _wait_for(lambda: "harbor" not in informer.deployed_services()))
+
+            server.put("namespaces", _namespace("argocd"))
+            record("watch resumes after the relist",
+                   await _wait_for(lambda: "argocd" in informer.deployed_services()))
+            record("informer stayed connected", informer.connected and informer.last_error is None)
+        finally:
+            await informer.stop()
+            await server.stop()
+            if previous is None:
+                os.environ.pop("KUBECONFIG", None)
+            else:
+                os.environ["KUBECONFIG"] = previous
+
+    print(f"{sum(results)}/{len(results)} checks passed")
+    return all(results)
+
+
+async def _serve(port: int):
+    server = FakeApiServer(port=port)
+    for name in ("keycloak", "harbor"):
+        server.put("namespaces", _namespace(name))
+        server.put("deployments", _deployment(name, name, ready=1))
+        server.put("pods", _pod(name, f"{name}-0", ready=True))
+    await server.start()
+    kubeconfig = Path(tempfile.gettempdir()) / f"fake-apiserver-{server.port}.config"
+    server.write_kubeconfig(kubeconfig)
+    print(f"Fake API server on {server.url}; KUBECONFIG={kubeconfig}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Kubernetes API server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("check", help="Run the informer cache against the fake server")
+    serve = subparsers.add_parser("serve", help="Serve a small fake cluster until interrupted")
+    serve.add_argument("--port", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "check":
+        sys.exit(0 if asyncio.run(_check()) else 1)
+    try:
+        asyncio.run(_serve(args.port))
+    except KeyboardInterrupt:
+        pass
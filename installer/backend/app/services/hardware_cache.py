@@ -0,0 +1,107 @@
+"""
+Persistent cache of hardware probe results
+
+Hardware does not change while a host is running, so a probe result stays
+valid until the host reboots. Entries are keyed by host name and remember the
+boot id they were taken under; a different boot id means the host must be
+probed again. Each entry also keeps the fields that changed compared to the
+probe before it, which backs the inventory delta view.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def diff_hardware(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """List the top-level hardware fields whose value differs"""
+    if old is None:
+        return []
+    return [
+        {"field": field, "old": old.get(field), "new": new.get(field)}
+        for field in sorted(set(old) | set(new))
+        if old.get(field) != new.get(field)
+    ]
+
+
+class HardwareCache:
+    """File-backed cache of hardware probe results per host"""
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        self.cache_file = cache_file or Path.home() / ".thinkube-installer" / "hardware-cache.json"
+        self._hosts: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the cache file on first use"""
+        if self._hosts is None:
+            self._hosts = {}
+            if self.cache_file.exists():
+                try:
+                    with open(self.cache_file, 'r') as f:
+                        self._hosts = json.load(f).get("hosts", {})
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable hardware cache {self.cache_file}: {e}")
+        return self._hosts
+
+    def save(self):
+        """Write the cache atomically so a crash never leaves a torn file"""
+        hosts = self._load()
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({"version": 1, "hosts": hosts}, f)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Failed to save hardware cache: {e}")
+
+    def get(self, host: str, boot_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry of a host
+
+        When a boot id is given, an entry recorded under a different boot is
+        treated as missing.
+        """
+        entry = self._load().get(host)
+        if entry is None:
+            return None
+        if boot_id is not None and entry.get("boot_id") != boot_id:
+            return None
+        return entry
+
+    def record(self, host: str, address: str, boot_id: Optional[str], hardware: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a fresh probe result and the changes since the previous one"""
+        hosts = self._load()
+        previous = hosts.get(host)
+        entry = {
+            "host": host,
+            "address": address,
+            "boot_id": boot_id,
+            "probed_at": time.time(),
+            "hardware": hardware,
+            "changes": diff_hardware(previous["hardware"] if previous else None, hardware),
+            "first_probe": previous is None
+        }
+        hosts[host] = entry
+        return entry
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return list(self._load().values())
+
+    def clear(self, host: Optional[str] = None):
+        """Forget one host, or everything"""
+        hosts = self._load()
+        if host is None:
+            hosts.clear()
+        else:
+            hosts.pop(host, None)
+        self.save()
+
+
+# Singleton instance
+hardware_cache = HardwareCache()
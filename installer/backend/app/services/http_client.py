@@ -0,0 +1,100 @@
+"""
+Shared HTTP client for calls to external APIs
+
+One pooled httpx.AsyncClient is created in the application lifespan and
+handed to the endpoints through the get_http_client dependency, so repeated
+calls to ZeroTier, Cloudflare and GitHub reuse DNS results, connections and
+TLS sessions instead of setting them up for every request. HTTP/2 is used
+when the h2 package is installed. Idempotent requests are retried with
+exponential backoff on connection errors, timeouts and throttling or
+gateway responses.
+"""
+
+import asyncio
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0)
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class HttpClient:
+    """Pooled client with retries for idempotent requests"""
+
+    def __init__(self, retries: int = 2, backoff: float = 0.5, max_backoff: float = 5.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _open(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=DEFAULT_TIMEOUT,
+                limits=DEFAULT_LIMITS,
+                follow_redirects=True,
+                headers={"User-Agent": "thinkube-installer"}
+            )
+        return self._client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Also opened on first use, for callers outside the lifespan
+        return self._open()
+
+    async def start(self):
+        self._open()
+        logger.info(f"HTTP client ready ({'HTTP/2' if HTTP2_AVAILABLE else 'HTTP/1.1 only, h2 not installed'})")
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return min(self.backoff * (2 ** attempt), self.max_backoff)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying idempotent ones on transient failures"""
+        retries = self.retries if method.upper() in IDEMPOTENT_METHODS else 0
+        for attempt in range(retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == retries:
+                    raise
+                delay = self._delay(attempt)
+                logger.debug(f"{method} {url} failed ({e!r}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == retries:
+                    return response
+                delay = self._delay(attempt, response)
+                logger.debug(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+
+# Singleton instance
+http_client = HttpClient()
+
+
+def get_http_client() -> HttpClient:
+    """FastAPI dependency for the shared HTTP client"""
+    return http_client
@@ -0,0 +1,230 @@
+"""
+Cached installation state of the local machine
+
+The installation state is computed by a graph of probes: file checks, tool
+lookups and the LXD and MicroK8s commands, which run concurrently where they
+do not depend on each other and each have their own timeout. The result is
+cached for a short time and also invalidated as soon as one of the files or
+binaries it was derived from changes, so repeated UI polling is served from
+memory.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.probe_graph import Probe, ProbeGraph
+from .k8s_informer import k8s_informer, THINKUBE_SERVICES
+from .state_watcher import state_watcher
+
+logger = logging.getLogger(__name__)
+
+
+async def run_command(*args: str) -> Tuple[int, bytes]:
+    """Run a command and return its exit status and stdout"""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, _ = await process.communicate()
+    except asyncio.CancelledError:
+        # Do not leave the command running when its probe times out
+        if process.returncode is None:
+            process.kill()
+        raise
+    return process.returncode, stdout
+
+
+def _home() -> Path:
+    return Path.home()
+
+
+def watched_paths() -> List[Path]:
+    """Files and directories the file-based parts of the state depend on"""
+    home = _home()
+    return [
+        home / "thinkube",
+        home / "thinkube" / "ansible",
+        home / "thinkube" / "inventory" / "inventory.yaml",
+        home / ".venv" / "bin" / "ansible-playbook",
+        home / ".ssh" / "id_rsa.pub",
+        home / ".env",
+    ]
+
+
+async def _probe_repo_cloned(_: Dict[str, Any]) -> bool:
+    thinkube_path = _home() / "thinkube"
+    return thinkube_path.exists() and (thinkube_path / "ansible").exists()
+
+
+async def _probe_ansible_installed(_: Dict[str, Any]) -> bool:
+    # Installed in the user virtual environment by the install script,
+    # otherwise fall back to a system-wide installation
+    user_venv = _home() / ".venv"
+    if user_venv.exists():
+        return (user_venv / "bin" / "ansible-playbook").exists()
+    return shutil.which('ansible-playbook') is not None
+
+
+async def _probe_ssh_keys(_: Dict[str, Any]) -> bool:
+    return (_home() / ".ssh" / "id_rsa.pub").exists()
+
+
+async def _probe_environment(_: Dict[str, Any]) -> bool:
+    home = _home()
+    return (home / ".env").exists() and (home / "thinkube" / "inventory" / "inventory.yaml").exists()
+
+
+async def _probe_lxc_binary(_: Dict[str, Any]) -> Optional[str]:
+    return shutil.which('lxc')
+
+
+async def _probe_lxd_configured(_: Dict[str, Any]) -> bool:
+    returncode, _ = await run_command('lxc', 'list')
+    return returncode == 0
+
+
+async def _probe_microk8s_binary(_: Dict[str, Any]) -> Optional[str]:
+    return shutil.which('microk8s')
+
+
+async def _probe_kubernetes_running(_: Dict[str, Any]) -> bool:
+    # A synced informer has just talked to the API server
+    if k8s_informer.synced:
+        return True
+    returncode, _ = await run_command('microk8s', 'status', '--wait-ready', '--timeout', '5')
+    return returncode == 0
+
+
+async def _probe_namespaces(_: Dict[str, Any]) -> List[str]:
+    if k8s_informer.synced:
+        return k8s_informer.deployed_services()
+    returncode, stdout = await run_command('microk8s', 'kubectl', 'get', 'namespaces', '-o', 'json')
+    if returncode != 0:
+        return []
+    namespaces = {ns['metadata']['name'] for ns in json.loads(stdout.decode())['items']}
+    return [service for service in THINKUBE_SERVICES if service in namespaces]
+
+
+def build_probe_graph() -> ProbeGraph:
+    """
+    The installation state probes
+
+    The namespace listing only needs MicroK8s to be installed, so it runs
+    alongside the (up to five second) readiness check instead of after it.
+    """
+    return ProbeGraph([
+        Probe("thinkube_repo_cloned", _probe_repo_cloned, timeout=2, default=False),
+        Probe("ansible_installed", _probe_ansible_installed, timeout=2, default=False),
+        Probe("ssh_keys_configured", _probe_ssh_keys, timeout=2, default=False),
+        Probe("environment_setup", _probe_environment, timeout=2, default=False),
+        Probe("lxc_binary", _probe_lxc_binary, timeout=2),
+        Probe(
+            "lxd_installed", _probe_lxd_configured, depends_on=("lxc_binary",),
+            timeout=10, default=False, when=lambda deps: bool(deps["lxc_binary"])
+        ),
+        Probe("microk8s_binary", _probe_microk8s_binary, timeout=2),
+        Probe(
+            "kubernetes_running", _probe_kubernetes_running, depends_on=("microk8s_binary",),
+            timeout=8, default=False, when=lambda deps: bool(deps["microk8s_binary"])
+        ),
+        Probe(
+            "namespaces", _probe_namespaces, depends_on=("microk8s_binary",),
+            timeout=10, default=[], when=lambda deps: bool(deps["microk8s_binary"])
+        ),
+    ])
+
+
+def assemble_state(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the probe values into the installation state document"""
+    kubernetes_running = bool(values["kubernetes_running"])
+    state = {
+        "environment_setup": values["environment_setup"],
+        "ansible_installed": values["ansible_installed"],
+        "thinkube_repo_cloned": values["thinkube_repo_cloned"],
+        "ssh_keys_configured": values["ssh_keys_configured"],
+        "lxd_installed": values["lxd_installed"],
+        "microk8s_installed": bool(values["microk8s_binary"]),
+        "kubernetes_running": kubernetes_running,
+        "services_deployed": list(values["namespaces"]) if kubernetes_running else [],
+    }
+    state["installation_complete"] = (
+        state["environment_setup"] and
+        state["ansible_installed"] and
+        state["thinkube_repo_cloned"] and
+        state["ssh_keys_configured"] and
+        state["lxd_installed"] and
+        state["kubernetes_running"] and
+        len(state["services_deployed"]) >= 3  # At least 3 core services
+    )
+    return state
+
+
+class InstallationStateCache:
+    """Single-flight, TTL and change-invalidated cache of the installation state"""
+
+    def __init__(self, ttl: float = 15.0):
+        self.ttl = ttl
+        self._state: Optional[Dict[str, Any]] = None
+        self._computed_at = 0.0
+        self._fingerprint: Optional[Tuple] = None
+        self._pending: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def fingerprint() -> Tuple:
+        """Identity of every watched file and of the resolved tool binaries"""
+        entries = []
+        if state_watcher.running:
+            # inotify reports file changes, no need to stat them
+            entries.append(("generation", state_watcher.generation))
+        else:
+            for path in watched_paths():
+                try:
+                    stat = os.stat(path)
+                    entries.append((str(path), stat.st_ino, stat.st_mtime_ns))
+                except OSError:
+                    entries.append((str(path), None, None))
+        for tool in ('ansible-playbook', 'lxc', 'microk8s'):
+            entries.append((tool, shutil.which(tool)))
+        return tuple(entries)
+
+    def invalidate(self):
+        self._state = None
+
+    def _is_fresh(self, fingerprint: Tuple) -> bool:
+        return (
+            self._state is not None
+            and fingerprint == self._fingerprint
+            and time.monotonic() - self._computed_at < self.ttl
+        )
+
+    async def _compute(self, fingerprint: Tuple) -> Dict[str, Any]:
+        start = time.monotonic()
+        results = await build_probe_graph().run()
+        state = assemble_state({name: result.value for name, result in results.items()})
+        self._state = state
+        self._fingerprint = fingerprint
+        self._computed_at = time.monotonic()
+        logger.debug(f"Installation state computed in {self._computed_at - start:.2f}s")
+        return state
+
+    async def get(self, refresh: bool = False) -> Dict[str, Any]:
+        """Return the installation state, computing it only when stale"""
+        fingerprint = self.fingerprint()
+        if not refresh and self._is_fresh(fingerprint):
+            return dict(self._state)
+        # Concurrent callers wait for the same computation
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.ensure_future(self._compute(fingerprint))
+        return dict(await asyncio.shield(self._pending))
+
+
+# Singleton instance
+installation_state = InstallationStateCache()
@@ -0,0 +1,291 @@
+"""
+In-process index of the Ansible inventory
+
+Parses inventory.yaml and the group_vars/ and host_vars/ next to it once,
+with the C YAML loader when PyYAML has it, and keeps host/group indexes and
+the variables of every host in memory. Effective variables follow Ansible's
+inventory precedence, lowest first: group vars from the inventory file, then
+group_vars/all, then the other group_vars/ files, then the host's vars from
+the inventory file and finally its host_vars/ file. Within each step the all
+group comes first and the other groups of the host go from parents to
+children (by name within a level, honouring ansible_group_priority).
+Everything is re-read once one of the files changes; the files are checked
+for changes at most once per check_interval seconds.
+
+Usage:
+    python -m app.services.inventory_index bench [--inventory PATH] [--rounds N]
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from ..core.inventory import INVENTORY_PATH
+
+logger = logging.getLogger(__name__)
+
+try:
+    YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    # PyYAML built without libyaml
+    YamlLoader = yaml.SafeLoader
+
+VARS_SUFFIXES = ('.yml', '.yaml', '.json')
+
+
+def _load_yaml(path: Path) -> Any:
+    with open(path, 'rb') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+class InventoryIndex:
+    """Hosts, groups and effective variables of one inventory file"""
+
+    def __init__(self, inventory_path: Path = INVENTORY_PATH, check_interval: float = 1.0):
+        self.inventory_path = inventory_path
+        self.check_interval = check_interval
+        self._fingerprint: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self.group_vars: Dict[str, Dict[str, Any]] = {}
+        self.group_children: Dict[str, Set[str]] = {}
+        self.group_hosts: Dict[str, Set[str]] = {}
+        self.host_inventory_vars: Dict[str, Dict[str, Any]] = {}
+        self.host_groups: Dict[str, Set[str]] = {}
+        self.group_depth: Dict[str, int] = {}
+        self.vars_files: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._effective: Dict[str, Dict[str, Any]] = {}
+
+    def _vars_paths(self, kind: str) -> List[Path]:
+        """The group_vars/ or host_vars/ files, including files in per-name directories"""
+        directory = self.inventory_path.parent / kind
+        paths = []
+        try:
+            for entry in sorted(directory.iterdir()):
+                if entry.is_dir():
+                    paths.extend(p for p in sorted(entry.rglob('*')) if p.suffix in VARS_SUFFIXES)
+                elif entry.suffix in VARS_SUFFIXES:
+                    paths.append(entry)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return paths
+
+    def fingerprint(self) -> Tuple:
+        """Identity of the inventory and of every vars file next to it"""
+        stat = self.inventory_path.stat()
+        entries = [(str(self.inventory_path), stat.st_ino, stat.st_mtime_ns, stat.st_size)]
+        for path in [*self._vars_paths("group_vars"), *self._vars_paths("host_vars")]:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Removed since it was listed
+            entries.append((str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        return tuple(entries)
+
+    def invalidate(self):
+        """Check the files for changes on the next lookup"""
+        self._checked_at = 0.0
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if self._fingerprint is not None and now - self._checked_at < self.check_interval:
+            return
+        fingerprint = self.fingerprint()
+        self._checked_at = now
+        if fingerprint != self._fingerprint:
+            start = time.perf_counter()
+            self._load()
+            self._fingerprint = fingerprint
+            logger.debug(f"Indexed {self.inventory_path} in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def _load(self):
+        inventory = _load_yaml(self.inventory_path) or {}
+        group_vars: Dict[str, Dict[str, Any]] = {"all": {}}
+        group_children: Dict[str, Set[str]] = {"all": set()}
+        group_hosts: Dict[str, Set[str]] = {"all": set()}
+        host_vars: Dict[str, Dict[str, Any]] = {}
+
+        def walk(name: str, group: Dict[str, Any]):
+            group = group or {}
+            group_vars.setdefault(name, {}).update(group.get("vars") or {})
+            group_children.setdefault(name, set())
+            group_hosts.setdefault(name, set())
+            for host, values in (group.get("hosts") or {}).items():
+                group_hosts[name].add(host)
+                host_vars.setdefault(host, {}).update(values or {})
+            for child, child_group in (group.get("children") or {}).items():
+                group_children[name].add(child)
+                walk(child, child_group)
+
+        for name, group in inventory.items():
+            walk(name, group)
+            if name != "all":
+                group_children["all"].add(name)
+
+        # Depth is the longest path from all, as Ansible sorts groups by it
+        depth: Dict[str, int] = {}
+
+        def assign_depth(name: str, level: int, path: Tuple[str, ...]):
+            if name in path or depth.get(name, -1) >= level:
+                return
+            depth[name] = level
+            for child in group_children.get(name, ()):
+                assign_depth(child, level + 1, path + (name,))
+
+        assign_depth("all", 0, ())
+
+        parents: Dict[str, Set[str]] = {}
+        for parent, children in group_children.items():
+            for child in children:
+                parents.setdefault(child, set()).add(parent)
+
+        host_groups: Dict[str, Set[str]] = {host: {"all"} for host in host_vars}
+        for group, hosts in group_hosts.items():
+            ancestors, pending = set(), [group]
+            while pending:
+                current = pending.pop()
+                if current not in ancestors:
+                    ancestors.add(current)
+                    pending.extend(parents.get(current, ()))
+            for host in hosts:
+                host_groups[host].update(ancestors)
+
+        vars_files: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for kind in ("group_vars", "host_vars"):
+            base = self.inventory_path.parent / kind
+            for path in self._vars_paths(kind):
+                relative = path.relative_to(base)
+                name = relative.parts[0] if len(relative.parts) > 1 else path.stem
+                try:
+                    data = _load_yaml(path) or {}
+                except FileNotFoundError:
+                    continue  # Removed since it was listed
+                except yaml.YAMLError as e:
+                    logger.warning(f"Ignoring unreadable vars file {path}: {e}")
+                    continue
+                if isinstance(data, dict):
+                    vars_files.setdefault((kind, name), {}).update(data)
+
+        self.group_vars = group_vars
+        self.group_children = group_children
+        self.group_hosts = group_hosts
+        self.host_inventory_vars = host_vars
+        self.host_groups = host_groups
+        self.group_depth = depth
+        self.vars_files = vars_files
+        self._effective = {}
+
+    def _sorted_groups(self, groups: Set[str]) -> List[str]:
+        def key(group: str):
+            priority = self.group_vars.get(group, {}).get("ansible_group_priority", 1)
+            return (self.group_depth.get(group, 0), priority, group)
+        return sorted((g for g in groups if g != "all"), key=key)
+
+    def _resolve(self, host: str) -> Dict[str, Any]:
+        groups = self._sorted_groups(self.host_groups[host])
+        effective: Dict[str, Any] = {}
+        effective.update(self.group_vars["all"])
+        for group in groups:
+            effective.update(self.group_vars.get(group, {}))
+        effective.update(self.vars_files.get(("group_vars", "all"), {}))
+        for group in groups:
+            effective.update(self.vars_files.get(("group_vars", group), {}))
+        effective.update(self.host_inventory_vars[host])
+        effective.update(self.vars_files.get(("host_vars", host), {}))
+        effective.pop("ansible_group_priority", None)
+        return effective
+
+    def groups(self) -> List[str]:
+        self._ensure_loaded()
+        return sorted(self.group_children)
+
+    def hosts(self, group: str = "all") -> List[str]:
+        """Every host in a group, including the hosts of its child groups"""
+        self._ensure_loaded()
+        if group not in self.group_children:
+            raise KeyError(group)
+        if group == "all":
+            return sorted(self.host_groups)
+        return sorted(host for host, groups in self.host_groups.items() if group in groups)
+
+    def host_group_names(self, host: str) -> List[str]:
+        self._ensure_loaded()
+        return ["all", *self._sorted_groups(self.host_groups[host])]
+
+    def host_vars(self, host: str) -> Dict[str, Any]:
+        """The effective variables of a host"""
+        self._ensure_loaded()
+        if host not in self.host_groups:
+            raise KeyError(host)
+        if host not in self._effective:
+            self._effective[host] = self._resolve(host)
+        return self._effective[host]
+
+
+# Singleton instance
+inventory_index = InventoryIndex()
+
+
+def _ansible_inventory_binary() -> Optional[str]:
+    user_venv = Path.home() / ".venv" / "bin" / "ansible-inventory"
+    if user_venv.exists():
+        return str(user_venv)
+    return shutil.which("ansible-inventory")
+
+
+def _benchmark(inventory: Path, rounds: int):
+    start = time.perf_counter()
+    index = InventoryIndex(inventory)
+    hosts = index.hosts()
+    cold = time.perf_counter() - start
+    print(f"Cold index: {cold * 1000:.1f}ms ({len(hosts)} hosts, {len(index.groups())} groups, "
+          f"loader {YamlLoader.__name__})")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for host in hosts:
+            index.host_vars(host)
+    warm = time.perf_counter() - start
+    print(f"Warm lookups: {warm / max(rounds * len(hosts), 1) * 1e6:.1f}us per host "
+          f"(files checked for changes every {index.check_interval:g}s)")
+
+    binary = _ansible_inventory_binary()
+    if binary is None:
+        print("ansible-inventory not found, skipping the comparison")
+        return
+    start = time.perf_counter()
+    output = subprocess.run(
+        [binary, "-i", str(inventory), "--list"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    ansible = time.perf_counter() - start
+    print(f"ansible-inventory --list: {ansible * 1000:.1f}ms")
+
+    hostvars = json.loads(output).get("_meta", {}).get("hostvars", {})
+    mismatches = [
+        host for host in hosts
+        if {k: v for k, v in hostvars.get(host, {}).items() if not k.startswith("ansible_group")}
+        != index.host_vars(host)
+    ]
+    print(f"Effective vars agree for {len(hosts) - len(mismatches)}/{len(hosts)} hosts"
+          + (f"; differ for {', '.join(mismatches)}" if mismatches else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ansible inventory index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench = subparsers.add_parser("bench", help="Time the index against ansible-inventory --list")
+    bench.add_argument("--inventory", type=Path, default=INVENTORY_PATH)
+    bench.add_argument("--rounds", type=int, default=1000)
+
+    args = parser.parse_args()
+    if not args.inventory.exists():
+        parser.error(f"Inventory not found: {args.inventory}")
+    _benchmark(args.inventory, args.rounds)
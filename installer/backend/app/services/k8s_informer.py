@@ -0,0 +1,362 @@
+"""
+In-process Kubernetes informer cache
+
+Lists Namespaces, Deployments and Pods from the cluster API once, then
+follows them with watch requests, keeping a small projection of every object
+in memory indexed by namespace. Questions such as "which thinkube services
+are deployed and ready" are answered from that cache instead of running
+kubectl. Until the cluster exists the informers keep retrying with backoff,
+so the cache fills in by itself once MicroK8s comes up.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import ssl
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import yaml
+
+logger = logging.getLogger(__name__)
+
+THINKUBE_SERVICES = ['keycloak', 'harbor', 'postgresql', 'argocd', 'argo-workflows']
+
+KUBECONFIG_PATHS = (
+    Path("/var/snap/microk8s/current/credentials/client.config"),
+    Path.home() / ".kube" / "config",
+)
+
+
+class KubeConfigError(Exception):
+    """Raised when no usable kubeconfig is available"""
+
+
+class _WatchExpired(Exception):
+    """The watch resource version is too old and the resource must be relisted"""
+
+
+@dataclass
+class ClusterConnection:
+    """What is needed to talk to the API server of the current context"""
+    server: str
+    ssl_context: ssl.SSLContext
+    headers: Dict[str, str]
+    auth: Optional[Tuple[str, str]] = None
+
+
+def _kubeconfig_path() -> Optional[Path]:
+    candidates = []
+    if os.environ.get("KUBECONFIG"):
+        candidates.append(Path(os.environ["KUBECONFIG"].split(os.pathsep)[0]))
+    candidates.extend(KUBECONFIG_PATHS)
+    for path in candidates:
+        if path.is_file() and os.access(path, os.R_OK):
+            return path
+    return None
+
+
+def _load_client_certificate(context: ssl.SSLContext, cert_pem: bytes, key_pem: bytes):
+    # The ssl module only loads certificates from files; keep them on disk
+    # just long enough to load them
+    fd, path = tempfile.mkstemp(prefix="thinkube-k8s-", suffix=".pem")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(cert_pem + b"\n" + key_pem)
+        context.load_cert_chain(path)
+    finally:
+        os.unlink(path)
+
+
+def load_kubeconfig(path: Optional[Path] = None) -> ClusterConnection:
+    """Build a connection from the current context of a kubeconfig file"""
+    path = path or _kubeconfig_path()
+    if path is None:
+        raise KubeConfigError("No readable kubeconfig found")
+    with open(path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+
+    def named(section: str, name: Optional[str]) -> Dict[str, Any]:
+        for entry in config.get(section) or []:
+            if name is None or entry.get("name") == name:
+                return entry.get(section[:-1]) or {}
+        raise KubeConfigError(f"{section[:-1]} {name!r} not found in {path}")
+
+    context = named("contexts", config.get("current-context"))
+    cluster = named("clusters", context.get("cluster"))
+    user = named("users", context.get("user"))
+    if not cluster.get("server"):
+        raise KubeConfigError(f"No API server in {path}")
+
+    if cluster.get("insecure-skip-tls-verify"):
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+    elif cluster.get("certificate-authority-data"):
+        ssl_context = ssl.create_default_context(
+            cadata=base64.b64decode(cluster["certificate-authority-data"]).decode()
+        )
+    elif cluster.get("certificate-authority"):
+        ssl_context = ssl.create_default_context(cafile=cluster["certificate-authority"])
+    else:
+        ssl_context = ssl.create_default_context()
+
+    if user.get("client-certificate-data") and user.get("client-key-data"):
+        _load_client_certificate(
+            ssl_context,
+            base64.b64decode(user["client-certificate-data"]),
+            base64.b64decode(user["client-key-data"])
+        )
+    elif user.get("client-certificate") and user.get("client-key"):
+        ssl_context.load_cert_chain(user["client-certificate"], user["client-key"])
+
+    headers = {"Accept": "application/json"}
+    token = user.get("token")
+    if not token and user.get("tokenFile"):
+        token = Path(user["tokenFile"]).read_text().strip()
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    auth = None
+    if user.get("username") and user.get("password"):
+        auth = (user["username"], user["password"])
+
+    return ClusterConnection(
+        server=cluster["server"].rstrip('/'),
+        ssl_context=ssl_context,
+        headers=headers,
+        auth=auth
+    )
+
+
+def _is_ready(conditions: Optional[List[Dict[str, Any]]]) -> bool:
+    return any(c.get("type") == "Ready" and c.get("status") == "True" for c in conditions or [])
+
+
+def project_namespace(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {"phase": (obj.get("status") or {}).get("phase")}
+
+
+def project_deployment(obj: Dict[str, Any]) -> Dict[str, Any]:
+    spec = obj.get("spec") or {}
+    status = obj.get("status") or {}
+    return {
+        "replicas": spec.get("replicas", 1),
+        "ready_replicas": status.get("readyReplicas", 0),
+        "available_replicas": status.get("availableReplicas", 0)
+    }
+
+
+def project_pod(obj: Dict[str, Any]) -> Dict[str, Any]:
+    status = obj.get("status") or {}
+    return {
+        "phase": status.get("phase"),
+        "ready": _is_ready(status.get("conditions"))
+    }
+
+
+class _Informer:
+    """List/watch loop for one resource type, indexed by namespace"""
+
+    def __init__(self, kind: str, path: str, project: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        self.kind = kind
+        self.path = path
+        self.project = project
+        # namespace ("" for cluster-scoped objects) -> name -> projection
+        self.store: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.resource_version: Optional[str] = None
+        self.synced = False
+
+    def _apply(self, event_type: str, obj: Dict[str, Any]):
+        metadata = obj.get("metadata") or {}
+        namespace = metadata.get("namespace", "")
+        name = metadata.get("name")
+        if event_type == "DELETED":
+            names = self.store.get(namespace)
+            if names is not None:
+                names.pop(name, None)
+                if not names:
+                    del self.store[namespace]
+        else:
+            self.store.setdefault(namespace, {})[name] = self.project(obj)
+        if metadata.get("resourceVersion"):
+            self.resource_version = metadata["resourceVersion"]
+
+    async def list(self, client: httpx.AsyncClient):
+        response = await client.get(self.path)
+        response.raise_for_status()
+        data = response.json()
+        store: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for obj in data.get("items") or []:
+            metadata = obj.get("metadata") or {}
+            store.setdefault(metadata.get("namespace", ""), {})[metadata.get("name")] = self.project(obj)
+        self.store = store
+        self.resource_version = (data.get("metadata") or {}).get("resourceVersion")
+        self.synced = True
+        logger.debug(f"Listed {sum(len(v) for v in store.values())} {self.kind}")
+
+    async def watch(self, client: httpx.AsyncClient):
+        params = {
+            "watch": "1",
+            "allowWatchBookmarks": "true",
+            "timeoutSeconds": "300",
+        }
+        if self.resource_version:
+            params["resourceVersion"] = self.resource_version
+        async with client.stream("GET", self.path, params=params, timeout=httpx.Timeout(10.0, read=330.0)) as response:
+            if response.status_code == 410:
+                raise _WatchExpired()
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                event_type = event.get("type")
+                obj = event.get("object") or {}
+                if event_type == "ERROR":
+                    if obj.get("code") == 410:
+                        raise _WatchExpired()
+                    raise httpx.HTTPError(f"Watch error: {obj.get('message')}")
+                if event_type == "BOOKMARK":
+                    self.resource_version = (obj.get("metadata") or {}).get("resourceVersion", self.resource_version)
+                    continue
+                self._apply(event_type, obj)
+
+    async def run(self, client: httpx.AsyncClient):
+        """Follow changes after an initial list()"""
+        while True:
+            try:
+                await self.watch(client)
+            except _WatchExpired:
+                logger.debug(f"Watch of {self.kind} expired, relisting")
+                await self.list(client)
+
+
+class KubernetesInformerCache:
+    """Informers for Namespaces, Deployments and Pods of the local cluster"""
+
+    def __init__(self, max_backoff: float = 60.0):
+        self.max_backoff = max_backoff
+        self.informers = {
+            "namespaces": _Informer("namespaces", "/api/v1/namespaces", project_namespace),
+            "deployments": _Informer("deployments", "/apis/apps/v1/deployments", project_deployment),
+            "pods": _Informer("pods", "/api/v1/pods", project_pod),
+        }
+        self.connected = False
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def synced(self) -> bool:
+        """True while connected and every resource has been listed"""
+        return self.connected and all(i.synced for i in self.informers.values())
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+
+    async def _follow(self, client: httpx.AsyncClient):
+        """Run every watch until one fails, then stop the others before the client closes"""
+        tasks = [asyncio.create_task(i.run(client)) for i in self.informers.values()]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                connection = load_kubeconfig()
+                async with httpx.AsyncClient(
+                    base_url=connection.server,
+                    headers=connection.headers,
+                    auth=connection.auth,
+                    verify=connection.ssl_context,
+                    timeout=10.0
+                ) as client:
+                    # List everything first so the cache is consistent before it is used
+                    for informer in self.informers.values():
+                        await informer.list(client)
+                    self.connected = True
+                    self.last_error = None
+                    backoff = 1.0
+                    logger.info(f"Kubernetes informers synced with {connection.server}")
+                    await self._follow(client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.connected or self.last_error != str(e):
+                    logger.info(f"Kubernetes informers not connected: {e}")
+                self.connected = False
+                self.last_error = str(e)
+                for informer in self.informers.values():
+                    informer.synced = False
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def namespaces(self) -> List[str]:
+        return sorted(self.informers["namespaces"].store.get("", {}))
+
+    def service_status(self, services: List[str] = THINKUBE_SERVICES) -> Dict[str, Dict[str, Any]]:
+        """
+        Deployment and readiness of each service namespace
+
+        A service is ready when its namespace exists, every Deployment in it
+        has all replicas ready and every running pod passes its readiness check.
+        """
+        namespaces = self.informers["namespaces"].store.get("", {})
+        deployments = self.informers["deployments"].store
+        pods = self.informers["pods"].store
+
+        status = {}
+        for service in services:
+            service_deployments = deployments.get(service, {})
+            active_pods = [
+                p for p in pods.get(service, {}).values()
+                if p["phase"] not in ("Succeeded", "Failed")
+            ]
+            deployed = service in namespaces
+            status[service] = {
+                "deployed": deployed,
+                "deployments": len(service_deployments),
+                "deployments_ready": sum(
+                    1 for d in service_deployments.values() if d["ready_replicas"] >= d["replicas"]
+                ),
+                "pods": len(active_pods),
+                "pods_ready": sum(1 for p in active_pods if p["ready"]),
+            }
+            status[service]["ready"] = (
+                deployed
+                and bool(service_deployments or active_pods)
+                and status[service]["deployments_ready"] == status[service]["deployments"]
+                and status[service]["pods_ready"] == status[service]["pods"]
+            )
+        return status
+
+    def deployed_services(self, services: List[str] = THINKUBE_SERVICES) -> List[str]:
+        namespaces = self.informers["namespaces"].store.get("", {})
+        return [service for service in services if service in namespaces]
+
+
+# Singleton instance
+k8s_informer = KubernetesInformerCache()
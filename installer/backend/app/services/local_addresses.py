@@ -0,0 +1,352 @@
+"""
+In-memory index of local interfaces, addresses and the default route
+
+Built once from a netlink (NETLINK_ROUTE) dump, or from /proc/net and
+interface ioctls where netlink is unavailable, and kept current by listening
+for netlink address, link and route notifications. Lookups such as "is this
+IP local?" are then plain set and dict reads instead of spawning `ip addr`
+and `ip route` on every request.
+"""
+
+import asyncio
+import fcntl
+import ipaddress
+import logging
+import os
+import socket
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Netlink constants (linux/netlink.h, linux/rtnetlink.h)
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+RTM_NEWROUTE = 24
+RTM_GETROUTE = 26
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFLA_IFNAME = 3
+RTA_DST = 1
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PREFSRC = 7
+RTA_TABLE = 15
+RT_TABLE_MAIN = 254
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+
+_NLMSGHDR = struct.Struct('=IHHII')
+_RTATTR = struct.Struct('=HH')
+
+# ioctl requests (linux/sockios.h)
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+
+
+@dataclass(frozen=True)
+class InterfaceAddress:
+    """One address assigned to a local interface"""
+    interface: str
+    address: str
+    prefixlen: int
+    family: int  # 4 or 6
+
+    @property
+    def network_cidr(self) -> str:
+        return str(ipaddress.ip_network(f"{self.address}/{self.prefixlen}", strict=False))
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _parse_attrs(data: bytes, offset: int) -> Dict[int, bytes]:
+    attrs = {}
+    while offset + _RTATTR.size <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        attrs[attr_type] = data[offset + _RTATTR.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def _netlink_dump(request_type: int, family: int = socket.AF_UNSPEC) -> List[tuple]:
+    """Send a dump request and return the (type, payload) of every reply message"""
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+        sock.bind((0, 0))
+        if request_type == RTM_GETLINK:
+            body = struct.pack('=BxHiII', family, 0, 0, 0, 0)
+        elif request_type == RTM_GETROUTE:
+            body = struct.pack('=BBBBBBBBI', family, 0, 0, 0, 0, 0, 0, 0, 0)
+        else:
+            body = struct.pack('=BBBBI', family, 0, 0, 0, 0)
+        seq = int(time.time()) & 0xFFFFFFFF
+        sock.send(_NLMSGHDR.pack(_NLMSGHDR.size + len(body), request_type, NLM_F_REQUEST | NLM_F_DUMP, seq, 0) + body)
+
+        messages = []
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + _NLMSGHDR.size <= len(data):
+                length, msg_type, _, msg_seq, _ = _NLMSGHDR.unpack_from(data, offset)
+                if length < _NLMSGHDR.size:
+                    return messages
+                if msg_type == NLMSG_DONE:
+                    return messages
+                if msg_type == NLMSG_ERROR:
+                    error = struct.unpack_from('=i', data, offset + _NLMSGHDR.size)[0]
+                    if error:
+                        raise OSError(-error, os.strerror(-error))
+                    return messages
+                messages.append((msg_type, data[offset + _NLMSGHDR.size:offset + length]))
+                offset += _align(length)
+
+
+def _read_netlink() -> Dict[str, Any]:
+    """Build the interface/address/route table from netlink dumps"""
+    names: Dict[int, str] = {}
+    for msg_type, payload in _netlink_dump(RTM_GETLINK):
+        if msg_type != RTM_NEWLINK:
+            continue
+        index = struct.unpack_from('=i', payload, 4)[0]
+        attrs = _parse_attrs(payload, 16)
+        if IFLA_IFNAME in attrs:
+            names[index] = attrs[IFLA_IFNAME].rstrip(b'\x00').decode()
+
+    addresses: List[InterfaceAddress] = []
+    for msg_type, payload in _netlink_dump(RTM_GETADDR):
+        if msg_type != RTM_NEWADDR:
+            continue
+        family, prefixlen, _, _, index = struct.unpack_from('=BBBBI', payload, 0)
+        attrs = _parse_attrs(payload, 8)
+        raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+        if raw is None or family not in (socket.AF_INET, socket.AF_INET6):
+            continue
+        address = socket.inet_ntop(family, raw)
+        addresses.append(InterfaceAddress(
+            interface=names.get(index, str(index)),
+            address=address,
+            prefixlen=prefixlen,
+            family=4 if family == socket.AF_INET else 6
+        ))
+
+    default_route = None
+    for msg_type, payload in _netlink_dump(RTM_GETROUTE, socket.AF_INET):
+        if msg_type != RTM_NEWROUTE:
+            continue
+        family, dst_len, _, _, table = struct.unpack_from('=BBBBB', payload, 0)
+        attrs = _parse_attrs(payload, 12)
+        if RTA_TABLE in attrs:
+            table = struct.unpack('=I', attrs[RTA_TABLE])[0]
+        if dst_len != 0 or table != RT_TABLE_MAIN or RTA_DST in attrs:
+            continue
+        oif = struct.unpack('=i', attrs[RTA_OIF])[0] if RTA_OIF in attrs else None
+        default_route = {
+            "interface": names.get(oif) if oif is not None else None,
+            "gateway": socket.inet_ntop(socket.AF_INET, attrs[RTA_GATEWAY]) if RTA_GATEWAY in attrs else None,
+            "source": socket.inet_ntop(socket.AF_INET, attrs[RTA_PREFSRC]) if RTA_PREFSRC in attrs else None
+        }
+        break
+
+    return {"addresses": addresses, "default_route": default_route}
+
+
+def _read_procfs() -> Dict[str, Any]:
+    """Build the table from interface ioctls and /proc/net when netlink is unavailable"""
+    addresses: List[InterfaceAddress] = []
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _, name in socket.if_nameindex():
+            request = struct.pack('256s', name.encode()[:15])
+            try:
+                address = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)[20:24])
+                netmask = socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFNETMASK, request)[20:24])
+            except OSError:
+                continue  # No IPv4 address on this interface
+            prefixlen = ipaddress.IPv4Network(f"0.0.0.0/{netmask}").prefixlen
+            addresses.append(InterfaceAddress(name, address, prefixlen, 4))
+
+    try:
+        with open('/proc/net/if_inet6', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 6:
+                    continue
+                address = str(ipaddress.IPv6Address(bytes.fromhex(parts[0])))
+                addresses.append(InterfaceAddress(parts[5], address, int(parts[2], 16), 6))
+    except OSError:
+        pass
+
+    default_route = None
+    try:
+        with open('/proc/net/route', 'r') as f:
+            next(f)  # Header
+            for line in f:
+                parts = line.split()
+                # Iface Destination Gateway Flags RefCnt Use Metric Mask ...
+                if len(parts) >= 8 and parts[1] == '00000000' and parts[7] == '00000000':
+                    gateway = socket.inet_ntoa(struct.pack('<I', int(parts[2], 16)))
+                    default_route = {"interface": parts[0], "gateway": gateway, "source": None}
+                    break
+    except OSError:
+        pass
+
+    return {"addresses": addresses, "default_route": default_route}
+
+
+class LocalAddressService:
+    """Live table of local addresses served from memory"""
+
+    def __init__(self, poll_interval: float = 5.0):
+        # Without change notifications the table is rebuilt at most this often
+        self.poll_interval = poll_interval
+        self._addresses: List[InterfaceAddress] = []
+        self._local_ips: Set[str] = set()
+        self._default_route: Optional[Dict[str, Any]] = None
+        self._built_at = 0.0
+        self._source = None
+        self._monitor: Optional[socket.socket] = None
+        self._rebuild_handle: Optional[asyncio.TimerHandle] = None
+
+    def rebuild(self):
+        """Re-read the whole table"""
+        try:
+            table = _read_netlink()
+            self._source = "netlink"
+        except Exception as e:
+            logger.debug(f"Netlink address dump failed, falling back to /proc: {e}")
+            table = _read_procfs()
+            self._source = "procfs"
+
+        addresses = table["addresses"]
+        default_route = table["default_route"]
+        if default_route and not default_route["source"]:
+            # Primary IPv4 address of the default route interface
+            default_route["source"] = next(
+                (a.address for a in addresses if a.family == 4 and a.interface == default_route["interface"]),
+                None
+            )
+
+        self._addresses = addresses
+        self._local_ips = {a.address for a in addresses if not ipaddress.ip_address(a.address).is_loopback}
+        self._default_route = default_route
+        self._built_at = time.monotonic()
+        logger.info(f"Local address table rebuilt from {self._source}: {len(addresses)} addresses")
+
+    def _ensure_current(self):
+        if self._monitor is None and time.monotonic() - self._built_at > self.poll_interval:
+            self.rebuild()
+
+    async def start(self):
+        """Build the table and subscribe to netlink change notifications"""
+        self.rebuild()
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE))
+            sock.setblocking(False)
+        except Exception as e:
+            logger.warning(f"Netlink notifications unavailable, refreshing local addresses every {self.poll_interval}s: {e}")
+            return
+        self._monitor = sock
+        asyncio.get_running_loop().add_reader(sock.fileno(), self._on_notification)
+
+    async def stop(self):
+        if self._monitor is not None:
+            asyncio.get_running_loop().remove_reader(self._monitor.fileno())
+            self._monitor.close()
+            self._monitor = None
+        if self._rebuild_handle is not None:
+            self._rebuild_handle.cancel()
+            self._rebuild_handle = None
+
+    def _on_notification(self):
+        try:
+            while True:
+                self._monitor.recv(65536)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            logger.debug(f"Netlink monitor read failed: {e}")
+        # Changes usually arrive in bursts; rebuild once they settle
+        if self._rebuild_handle is None:
+            self._rebuild_handle = asyncio.get_running_loop().call_later(0.2, self._rebuild_after_change)
+
+    def _rebuild_after_change(self):
+        self._rebuild_handle = None
+        self.rebuild()
+
+    def addresses(self) -> List[InterfaceAddress]:
+        self._ensure_current()
+        return list(self._addresses)
+
+    def local_ips(self) -> Set[str]:
+        """All non-loopback local addresses, IPv4 and IPv6"""
+        self._ensure_current()
+        return set(self._local_ips)
+
+    def is_local(self, ip: str) -> bool:
+        self._ensure_current()
+        return ip.split('%')[0] in self._local_ips
+
+    def default_route(self) -> Optional[Dict[str, Any]]:
+        self._ensure_current()
+        return dict(self._default_route) if self._default_route else None
+
+    def networks(self) -> List[Dict[str, str]]:
+        """IPv4 networks attached to local interfaces, excluding loopback and link-local"""
+        networks = []
+        for address in self.addresses():
+            if address.family != 4:
+                continue
+            network = ipaddress.IPv4Network(address.network_cidr)
+            if network.is_loopback or network.is_link_local or network.prefixlen >= 31:
+                continue
+            if not any(n["network_cidr"] == str(network) for n in networks):
+                networks.append({"network_cidr": str(network), "interface": address.interface})
+        return networks
+
+    def interfaces_for_network(self, network_cidr: str) -> List[str]:
+        network = ipaddress.ip_network(network_cidr, strict=False)
+        interfaces = []
+        for address in self.addresses():
+            ip = ipaddress.ip_address(address.address)
+            if ip.version == network.version and ip in network and address.interface not in interfaces:
+                interfaces.append(address.interface)
+        return interfaces
+
+    def ipv6_interfaces(self) -> List[str]:
+        interfaces = []
+        for address in self.addresses():
+            if address.family == 6 and address.interface != 'lo' and address.interface not in interfaces:
+                interfaces.append(address.interface)
+        return interfaces
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The whole table, for debugging endpoints"""
+        self._ensure_current()
+        return {
+            "source": self._source,
+            "monitoring": self._monitor is not None,
+            "addresses": [
+                {"interface": a.interface, "address": a.address, "prefixlen": a.prefixlen, "family": a.family}
+                for a in self._addresses
+            ],
+            "default_route": self._default_route
+        }
+
+
+# Singleton instance
+local_address_service = LocalAddressService()
@@ -0,0 +1,283 @@
+"""
+Passive mDNS/DNS-SD browser for SSH hosts
+
+Listens on the mDNS multicast group for _ssh._tcp and _workstation._tcp
+announcements and keeps a live table of hosts and their addresses, so
+discovery can list well-behaved LAN hosts without sweeping the network.
+
+Usage:
+    python -m app.services.mdns_browser check
+"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import struct
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..utils import dns
+from ..utils.resolver import MDNS_GROUP, MDNS_PORT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_TYPES = ("_ssh._tcp.local", "_workstation._tcp.local")
+
+
+class _BrowserProtocol(asyncio.DatagramProtocol):
+    def __init__(self, browser: "MDNSBrowser"):
+        self.browser = browser
+
+    def datagram_received(self, data, addr):
+        try:
+            message = dns.parse_message(data)
+        except Exception:
+            return
+        if message["is_response"]:
+            self.browser.handle_records(message["records"])
+
+    def error_received(self, exc):
+        logger.debug(f"mDNS browser socket error: {exc}")
+
+
+class MDNSBrowser:
+    """Background DNS-SD browser keeping a table of announced hosts"""
+
+    def __init__(
+        self,
+        service_types: Tuple[str, ...] = DEFAULT_SERVICE_TYPES,
+        group: str = MDNS_GROUP,
+        port: int = MDNS_PORT,
+        query_interval: float = 120.0
+    ):
+        self.service_types = tuple(t.lower() for t in service_types)
+        self.group = group
+        self.port = port
+        self.query_interval = query_interval
+
+        # service instance name -> {"target": host name, "port": int, "service": type, "expires": ts}
+        self._instances: Dict[str, Dict[str, Any]] = {}
+        # host name -> {address: expiry timestamp}
+        self._addresses: Dict[str, Dict[str, float]] = {}
+
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._query_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._transport is not None
+
+    def _create_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError:
+                pass
+        sock.bind(('', self.port))
+        membership = struct.pack('4s4s', socket.inet_aton(self.group), socket.inet_aton('0.0.0.0'))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 255)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        sock.setblocking(False)
+        return sock
+
+    async def start(self):
+        """Join the multicast group and start browsing"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            sock = self._create_socket()
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _BrowserProtocol(self), sock=sock
+            )
+        except Exception as e:
+            logger.warning(f"mDNS browser disabled, could not listen on {self.group}:{self.port}: {e}")
+            return
+        # Port 0 picks a free port
+        self.port = self._transport.get_extra_info('sockname')[1]
+        self._query_task = asyncio.create_task(self._query_loop())
+        logger.info(f"mDNS browser listening for {', '.join(self.service_types)}")
+
+    async def stop(self):
+        """Leave the multicast group"""
+        if self._query_task:
+            self._query_task.cancel()
+            try:
+                await self._query_task
+            except asyncio.CancelledError:
+                pass
+            self._query_task = None
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+    def query(self):
+        """Ask responders to (re-)announce the browsed service types"""
+        if not self._transport:
+            return
+        for service_type in self.service_types:
+            self._transport.sendto(
+                dns.build_query(0, service_type, dns.TYPE_PTR, recursion=False),
+                (self.group, self.port)
+            )
+
+    async def _query_loop(self):
+        while True:
+            self.query()
+            await asyncio.sleep(self.query_interval)
+
+    def handle_records(self, records: List[Dict[str, Any]]):
+        """Fold the records of one mDNS response into the host table"""
+        now = time.time()
+        for record in records:
+            name = record["name"].lower()
+            expires = now + record["ttl"]
+            goodbye = record["ttl"] == 0
+
+            if record["type"] == dns.TYPE_PTR and name in self.service_types:
+                instance = record["data"].lower()
+                if goodbye:
+                    self._instances.pop(instance, None)
+                else:
+                    entry = self._instances.setdefault(instance, {"service": name})
+                    entry["expires"] = expires
+
+            elif record["type"] == dns.TYPE_SRV:
+                if goodbye:
+                    self._instances.pop(name, None)
+                elif any(name.endswith('.' + t) for t in self.service_types):
+                    service = next(t for t in self.service_types if name.endswith('.' + t))
+                    entry = self._instances.setdefault(name, {"service": service})
+                    entry["target"] = record["data"]["target"].lower()
+                    entry["port"] = record["data"]["port"]
+                    entry["expires"] = max(entry.get("expires", 0), expires)
+
+            elif record["type"] in (dns.TYPE_A, dns.TYPE_AAAA):
+                addresses = self._addresses.setdefault(name, {})
+                if goodbye:
+                    addresses.pop(record["data"], None)
+                else:
+                    addresses[record["data"]] = expires
+
+    def _prune(self):
+        now = time.time()
+        for instance in [i for i, e in self._instances.items() if e.get("expires", 0) < now]:
+            del self._instances[instance]
+        for host, addresses in list(self._addresses.items()):
+            for address in [a for a, expires in addresses.items() if expires < now]:
+                del addresses[address]
+            if not addresses:
+                del self._addresses[host]
+
+    def get_hosts(self) -> List[Dict[str, Any]]:
+        """Return the announced hosts that have at least one known address"""
+        self._prune()
+        hosts: Dict[str, Dict[str, Any]] = {}
+        for instance in self._instances.values():
+            target = instance.get("target")
+            if not target or target not in self._addresses:
+                continue
+            host = hosts.setdefault(target, {
+                "hostname": target[:-len('.local')] if target.endswith('.local') else target,
+                "addresses": sorted(self._addresses[target]),
+                "services": [],
+                "ssh_port": None
+            })
+            if instance["service"] not in host["services"]:
+                host["services"].append(instance["service"])
+            if instance["service"].startswith("_ssh."):
+                host["ssh_port"] = instance.get("port")
+        return list(hosts.values())
+
+    def hosts_in_network(self, network_cidr: str) -> Dict[str, Dict[str, Any]]:
+        """Map each announced address inside a network to its host entry"""
+        network = ipaddress.ip_network(network_cidr, strict=False)
+        result = {}
+        for host in self.get_hosts():
+            for address in host["addresses"]:
+                ip = ipaddress.ip_address(address)
+                if ip.version == network.version and ip in network:
+                    result[address] = host
+        return result
+
+
+# Singleton instance
+mdns_browser = MDNSBrowser()
+
+
+def _announcement(hostname: str, address: str, port: int, ttl: int = 120) -> bytes:
+    """An mDNS response announcing an SSH service: PTR, SRV and A records"""
+    instance = f"{hostname}._ssh._tcp.local"
+    target = f"{hostname}.local"
+
+    def record(name: str, rtype: int, rdata: bytes) -> bytes:
+        return dns.encode_name(name) + struct.pack('!HHIH', rtype, dns.CLASS_IN, ttl, len(rdata)) + rdata
+
+    records = [
+        record("_ssh._tcp.local", dns.TYPE_PTR, dns.encode_name(instance)),
+        record(instance, dns.TYPE_SRV, struct.pack('!HHH', 0, 0, port) + dns.encode_name(target)),
+        record(target, dns.TYPE_A, socket.inet_aton(address)),
+    ]
+    header = struct.pack('!HHHHHH', 0, 0x8400, 0, len(records), 0, 0)
+    return header + b''.join(records)
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+async def _check() -> bool:
+    """Announce an SSH host on loopback and watch it enter and leave the table"""
+    browser = MDNSBrowser(port=0)
+    results = []
+
+    def record(name: str, ok: bool):
+        results.append(ok)
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+
+    await browser.start()
+    record("browser listens on a free port", browser.running and browser.port != 0)
+    if browser.running:
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sender.sendto(_announcement("probe-host", "127.0.0.1", 2222), ("127.0.0.1", browser.port))
+
+            def announced() -> List[Dict[str, Any]]:
+                return [h for h in browser.get_hosts() if h["hostname"] == "probe-host"]
+
+            record("announced host enters the table", await _wait_for(lambda: bool(announced())))
+            hosts = announced()
+            record("host has its address and SSH port",
+                   bool(hosts) and hosts[0]["addresses"] == ["127.0.0.1"] and hosts[0]["ssh_port"] == 2222)
+            record("host is listed in its network", "127.0.0.1" in browser.hosts_in_network("127.0.0.0/8"))
+            record("host is not listed in other networks", not browser.hosts_in_network("192.168.1.0/24"))
+
+            sender.sendto(_announcement("probe-host", "127.0.0.1", 2222, ttl=0), ("127.0.0.1", browser.port))
+            record("goodbye removes the host", await _wait_for(lambda: not announced()))
+        finally:
+            sender.close()
+            await browser.stop()
+
+    print(f"{sum(results)}/{len(results)} checks passed")
+    return all(results)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Passive mDNS browser for SSH hosts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("check", help="Announce an SSH host on loopback and check the host table")
+
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(_check()) else 1)
@@ -0,0 +1,294 @@
+"""
+System requirements checks
+
+Every requirement from REQUIREMENTS.md is a check registered with the
+@requirement decorator, declaring the checks it depends on and its own
+timeout. The checks run as a probe graph, so independent checks run
+concurrently and a slow one only delays itself. Results can be streamed as
+they finish, and the last complete run is kept as a summary for re-visits of
+the Requirements page. Only passing runs are reused for long; a failing run
+is re-checked on the next visit, so a fixed problem shows up right away.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from ..utils.probe_graph import Probe, ProbeGraph, ProbeResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequirementCheck:
+    """A registered requirement check"""
+    id: str
+    name: str
+    category: str
+    required: bool
+    run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    depends_on: tuple = ()
+    timeout: float = 10.0
+
+    def entry(self, status: str, details: str, action: Optional[str] = None) -> Dict[str, Any]:
+        """A result entry in the shape the Requirements page expects"""
+        entry = {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "required": self.required,
+            "status": status,
+            "details": details
+        }
+        if action:
+            entry["action"] = action
+        return entry
+
+    def failed(self, details: str) -> Dict[str, Any]:
+        """Entry for a check that could not be completed"""
+        if self.required:
+            return self.entry("fail", details)
+        return self.entry("missing", details, action="install")
+
+
+# Registered checks, in the order they are listed
+REQUIREMENT_CHECKS: Dict[str, RequirementCheck] = {}
+
+
+def requirement(
+    id: str,
+    name: str,
+    category: str,
+    required: bool,
+    depends_on: tuple = (),
+    timeout: float = 10.0
+):
+    """
+    Register a requirement check
+
+    The decorated coroutine receives the result entries of its dependencies
+    keyed by check id and returns (status, details) or (status, details,
+    action).
+    """
+    def decorator(func):
+        check = RequirementCheck(
+            id=id, name=name, category=category, required=required,
+            run=None, depends_on=depends_on, timeout=timeout
+        )
+
+        async def run(dependencies: Dict[str, Any]) -> Dict[str, Any]:
+            return check.entry(*await func(dependencies))
+
+        check.run = run
+        REQUIREMENT_CHECKS[id] = check
+        return func
+    return decorator
+
+
+async def _run(*args: str) -> tuple:
+    """Run a command and return (exit status, stdout)"""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, _ = await process.communicate()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+        raise
+    return process.returncode, stdout.decode()
+
+
+# HARD REQUIREMENTS (must pass)
+
+@requirement("ubuntu", "Ubuntu 24.04.x LTS", "system", required=True, timeout=5)
+async def check_ubuntu(_):
+    with open('/etc/os-release', 'r') as f:
+        os_release = f.read()
+
+    os_info = {}
+    for line in os_release.strip().split('\n'):
+        if '=' in line:
+            key, value = line.split('=', 1)
+            os_info[key] = value.strip('"')
+
+    dist_id = os_info.get('ID', '').lower()
+    version_id = os_info.get('VERSION_ID', '')
+    if dist_id == 'ubuntu' and version_id.startswith('24.04'):
+        return "pass", f"{os_info.get('VERSION', '')} detected"
+
+    # Fallback to distro module
+    import distro
+    dist_info = distro.info()
+    dist_name = dist_info.get('id', '')
+    dist_version = dist_info.get('version', '')
+    if dist_name == 'ubuntu' and dist_version.startswith('24.04'):
+        return "pass", f"Ubuntu {dist_version} LTS detected"
+    return "fail", f"Found {dist_id or dist_name} {version_id or dist_version}. This installer requires Ubuntu 24.04.x"
+
+
+@requirement("sudo", "Non-root user with sudo", "system", required=True, timeout=5)
+async def check_sudo(_):
+    if os.geteuid() == 0:
+        return "fail", "Running as root. Please run as normal user with sudo access"
+    await _run('sudo', '-n', 'true')
+    current_user = os.environ.get('USER', 'unknown')
+    return "pass", f"User '{current_user}' has sudo access"
+
+
+@requirement("openssh_server", "OpenSSH Server", "system", required=True, timeout=5)
+async def check_openssh_server(_):
+    # Required for Ansible to connect to localhost
+    returncode, stdout = await _run('dpkg', '-l', 'openssh-server')
+    if returncode != 0 or 'ii  openssh-server' not in stdout:
+        return "fail", "OpenSSH server is not installed. Run: sudo apt install openssh-server"
+    _, service_status = await _run('systemctl', 'is-active', 'ssh')
+    service_status = service_status.strip()
+    if service_status == 'active':
+        return "pass", "OpenSSH server is installed and running"
+    return "fail", f"OpenSSH server is installed but not running (status: {service_status})"
+
+
+@requirement("network", "Network connectivity", "system", required=True, timeout=3)
+async def check_network(_):
+    # Try to reach Ubuntu package servers
+    try:
+        _, writer = await asyncio.open_connection("archive.ubuntu.com", 443)
+    except OSError:
+        return "fail", "Cannot reach Ubuntu package servers"
+    writer.close()
+    return "pass", "Internet access confirmed"
+
+
+@requirement("disk", "Disk space", "system", required=True, timeout=3)
+async def check_disk(_):
+    # 10GB minimum for control node
+    free_gb = shutil.disk_usage(os.path.expanduser("~")).free / (1024**3)
+    if free_gb >= 10:
+        return "pass", f"{free_gb:.1f}GB free in home directory"
+    return "fail", f"Only {free_gb:.1f}GB free. Need at least 10GB"
+
+
+# SOFT REQUIREMENTS (will be installed if missing)
+
+@requirement("git", "Git", "tools", required=False, timeout=5)
+async def check_git(_):
+    if not shutil.which('git'):
+        return "missing", "Will be installed during setup", "install"
+    returncode, stdout = await _run('git', '--version')
+    version = stdout.strip() if returncode == 0 else "unknown"
+    return "pass", f"Git is installed ({version})"
+
+
+@requirement("ssh_client", "OpenSSH Client", "tools", required=False, timeout=3)
+async def check_ssh_client(_):
+    if shutil.which('ssh'):
+        return "pass", "SSH client is installed"
+    return "missing", "Will be installed", "install"
+
+
+@requirement("venv", "Python Virtual Environment", "tools", required=False, timeout=3)
+async def check_venv(_):
+    # User-level as per install script
+    user_venv = Path.home() / ".venv"
+    if user_venv.exists() and (user_venv / "bin" / "python").exists():
+        return "pass", f"Virtual environment exists at {user_venv}"
+    return "missing", "Will be created in ~/.venv", "install"
+
+
+@requirement("ansible", "Ansible (in venv)", "tools", required=False, depends_on=("venv",), timeout=15)
+async def check_ansible(dependencies):
+    # Must be in the user virtual environment as per install script
+    ansible_bin = Path.home() / ".venv" / "bin" / "ansible-playbook"
+    if dependencies["venv"]["status"] == "pass" and ansible_bin.exists():
+        returncode, stdout = await _run(str(ansible_bin), '--version')
+        if returncode == 0:
+            version_line = stdout.split('\n')[0]
+            return "pass", f"Ansible installed in user venv ({version_line})"
+
+    # Mention a system-wide Ansible for informational purposes
+    system_ansible_note = ""
+    if shutil.which('ansible-playbook'):
+        system_ansible_note = " (system-wide Ansible detected, but thinkube needs user venv)"
+    return "missing", f"Will be installed in user virtual environment{system_ansible_note}", "install"
+
+
+def _result_entry(check: RequirementCheck, result: ProbeResult) -> Dict[str, Any]:
+    if result.timed_out:
+        return check.failed(f"Check timed out after {check.timeout:g}s")
+    if result.error is not None:
+        return check.failed(f"Could not run check: {result.error}")
+    return result.value
+
+
+class RequirementsChecker:
+    """Runs the registered checks and keeps the last summary"""
+
+    def __init__(self, summary_ttl: float = 300.0, failure_ttl: float = 0.0):
+        self.summary_ttl = summary_ttl
+        self.failure_ttl = failure_ttl
+        self._summary: Optional[Dict[str, Any]] = None
+
+    def _graph(self) -> ProbeGraph:
+        return ProbeGraph([
+            Probe(
+                name=check.id,
+                run=check.run,
+                depends_on=check.depends_on,
+                timeout=check.timeout,
+                default=check.failed("Check did not complete")
+            )
+            for check in REQUIREMENT_CHECKS.values()
+        ])
+
+    @property
+    def last_summary(self) -> Optional[Dict[str, Any]]:
+        """The last complete run, however old"""
+        return self._summary
+
+    def cached_summary(self) -> Optional[Dict[str, Any]]:
+        """The last complete run, if it is recent enough to reuse"""
+        if self._summary is None:
+            return None
+        ttl = self.summary_ttl if self._summary["all_required_passed"] else self.failure_ttl
+        if time.time() - self._summary["checked_at"] >= ttl:
+            return None
+        return self._summary
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """Run every check, yielding result entries as they finish"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        async for result in self._graph().stream():
+            entry = _result_entry(REQUIREMENT_CHECKS[result.name], result)
+            entries[result.name] = entry
+            yield entry
+
+        requirements = [entries[check_id] for check_id in REQUIREMENT_CHECKS if check_id in entries]
+        self._summary = {
+            "requirements": requirements,
+            "all_required_passed": all(
+                r["status"] == "pass" for r in requirements if r["required"]
+            ),
+            "checked_at": time.time()
+        }
+
+    async def check(self, refresh: bool = False) -> Dict[str, Any]:
+        """Return the cached summary, or run every check and summarize"""
+        if not refresh:
+            summary = self.cached_summary()
+            if summary is not None:
+                return {**summary, "cached": True}
+        async for _ in self.stream():
+            pass
+        return {**self._summary, "cached": False}
+
+
+# Singleton instance
+requirements_checker = RequirementsChecker()
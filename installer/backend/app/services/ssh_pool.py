@@ -0,0 +1,202 @@
+"""
+Pooled in-process SSH client
+
+Keeps one authenticated asyncssh connection per (user, host, port, auth
+method) and runs commands as separate channels over it, instead of spawning
+an ssh/sshpass process per command. Idle connections are closed after a
+timeout and the number of concurrent channels per host is limited, since
+sshd caps sessions per connection (MaxSessions, 10 by default).
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import asyncssh
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SSHResult:
+    """Result of one remote command"""
+    exit_status: Optional[int]
+    stdout: str
+    stderr: str
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_status == 0
+
+
+class SSHConnectionError(Exception):
+    """Raised when a connection to the host cannot be established"""
+
+
+@dataclass
+class _PooledConnection:
+    connection: asyncssh.SSHClientConnection
+    last_used: float
+    in_use: int = 0
+
+
+class SSHConnectionPool:
+    """Keyed pool of SSH connections with idle eviction and per-host limits"""
+
+    def __init__(
+        self,
+        idle_timeout: float = 120.0,
+        max_channels_per_host: int = 8,
+        connect_timeout: float = 10.0
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_channels_per_host = max_channels_per_host
+        self.connect_timeout = connect_timeout
+        self._connections: Dict[Tuple, _PooledConnection] = {}
+        self._opening: Dict[Tuple, asyncio.Task] = {}
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._evictor: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(host: str, username: str, port: int, password: Optional[str]) -> Tuple:
+        # Never keep the password itself in the key
+        auth = "password:" + hashlib.sha256(password.encode()).hexdigest() if password else "key"
+        return (username, host, port, auth)
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_channels_per_host)
+        return self._host_limits[host]
+
+    async def _connect(self, host: str, username: str, port: int, password: Optional[str]) -> asyncssh.SSHClientConnection:
+        options = {
+            "username": username,
+            "port": port,
+            "known_hosts": None,  # Equivalent of StrictHostKeyChecking=no for fresh nodes
+        }
+        if password:
+            options["password"] = password
+        try:
+            return await asyncio.wait_for(
+                asyncssh.connect(host, **options),
+                timeout=self.connect_timeout
+            )
+        except asyncio.TimeoutError:
+            raise SSHConnectionError(f"Connection to {host}:{port} timed out")
+        except (OSError, asyncssh.Error) as e:
+            raise SSHConnectionError(str(e) or e.__class__.__name__)
+
+    async def _open(self, key: Tuple, host: str, username: str, port: int, password: Optional[str]) -> _PooledConnection:
+        connection = await self._connect(host, username, port, password)
+        pooled = _PooledConnection(connection=connection, last_used=time.monotonic())
+        self._connections[key] = pooled
+        logger.debug(f"Opened SSH connection to {username}@{host}:{port}")
+        self._start_evictor()
+        return pooled
+
+    async def _acquire(self, host: str, username: str, port: int, password: Optional[str]) -> Tuple[Tuple, _PooledConnection]:
+        key = self._key(host, username, port, password)
+        pooled = self._connections.get(key)
+        if pooled is None:
+            # Concurrent callers share one connection attempt, and its failure
+            opening = self._opening.get(key)
+            if opening is None:
+                opening = asyncio.create_task(self._open(key, host, username, port, password))
+                self._opening[key] = opening
+                opening.add_done_callback(lambda _: self._opening.pop(key, None))
+            pooled = await asyncio.shield(opening)
+        pooled.in_use += 1
+        return key, pooled
+
+    def _release(self, pooled: _PooledConnection):
+        pooled.in_use -= 1
+        pooled.last_used = time.monotonic()
+
+    def _discard(self, key: Tuple, pooled: _PooledConnection):
+        if self._connections.get(key) is pooled:
+            del self._connections[key]
+        pooled.connection.close()
+
+    async def run(
+        self,
+        host: str,
+        username: str,
+        command: str,
+        password: Optional[str] = None,
+        port: int = 22,
+        timeout: Optional[float] = 60.0,
+        input: Optional[str] = None
+    ) -> SSHResult:
+        """
+        Run a command on a host over a pooled connection
+
+        Raises SSHConnectionError if the host cannot be reached or
+        authentication fails. A connection that was dropped by the server
+        is reopened once.
+        """
+        for attempt in range(2):
+            key, pooled = await self._acquire(host, username, port, password)
+            try:
+                async with self._host_limit(host):
+                    result = await pooled.connection.run(command, input=input, check=False, timeout=timeout)
+                return SSHResult(
+                    exit_status=result.exit_status,
+                    stdout=result.stdout or "",
+                    stderr=result.stderr or ""
+                )
+            except asyncssh.TimeoutError as e:
+                return SSHResult(exit_status=None, stdout=e.stdout or "", stderr=f"Command timed out after {timeout}s")
+            except (asyncssh.ConnectionLost, asyncssh.DisconnectError, asyncssh.ChannelOpenError, BrokenPipeError) as e:
+                self._discard(key, pooled)
+                if attempt == 1:
+                    raise SSHConnectionError(str(e) or e.__class__.__name__)
+                logger.debug(f"Pooled SSH connection to {host} was lost, reconnecting: {e}")
+            finally:
+                self._release(pooled)
+
+    async def run_many(
+        self,
+        host: str,
+        username: str,
+        commands: List[str],
+        password: Optional[str] = None,
+        port: int = 22,
+        timeout: Optional[float] = 60.0
+    ) -> List[SSHResult]:
+        """Run several commands concurrently as channels of one connection"""
+        return list(await asyncio.gather(*[
+            self.run(host, username, command, password=password, port=port, timeout=timeout)
+            for command in commands
+        ]))
+
+    def _start_evictor(self):
+        if self._evictor is None or self._evictor.done():
+            self._evictor = asyncio.create_task(self._evict_idle())
+
+    async def _evict_idle(self):
+        while self._connections:
+            await asyncio.sleep(min(self.idle_timeout, 30))
+            now = time.monotonic()
+            for key, pooled in list(self._connections.items()):
+                if pooled.in_use == 0 and now - pooled.last_used > self.idle_timeout:
+                    logger.debug(f"Closing idle SSH connection to {key[0]}@{key[1]}")
+                    self._discard(key, pooled)
+
+    async def close_all(self):
+        """Close every pooled connection"""
+        if self._evictor is not None:
+            self._evictor.cancel()
+            self._evictor = None
+        for key, pooled in list(self._connections.items()):
+            self._discard(key, pooled)
+            try:
+                await pooled.connection.wait_closed()
+            except Exception:
+                pass
+
+
+# Singleton instance
+ssh_pool = SSHConnectionPool()
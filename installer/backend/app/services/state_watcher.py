@@ -0,0 +1,240 @@
+"""
+inotify-driven watcher for the files that make up the installation state
+
+Watches ~/.env, the inventory, the SSH public key, the Ansible virtual
+environment, the thinkube checkout and the deployment-state snapshot and
+journal through inotify (via ctypes, no extra dependency) and keeps a live model of them in
+memory. Every change invalidates the cached installation state and is pushed
+to the status WebSocket clients, so the UI no longer has to poll for it.
+
+Files that do not exist yet are covered by watching their nearest existing
+ancestor directory; the watches move down the path as directories appear.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..shared import app_state, broadcast_status
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+REARM_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def watched_files() -> Dict[str, Path]:
+    """The paths the installation state is derived from, by model key"""
+    home = Path.home()
+    return {
+        "env_file": home / ".env",
+        "inventory": home / "thinkube" / "inventory" / "inventory.yaml",
+        "ssh_public_key": home / ".ssh" / "id_rsa.pub",
+        "ansible_playbook": home / ".venv" / "bin" / "ansible-playbook",
+        "thinkube_ansible": home / "thinkube" / "ansible",
+        "deployment_state": home / ".thinkube-installer" / "deployment-state.json",
+        # Saves only append here; the snapshot changes only on compaction
+        "deployment_journal": home / ".thinkube-installer" / "deployment-state.journal",
+    }
+
+
+class _Inotify:
+    """Thin ctypes binding of the inotify system calls"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Yield (wd, mask, name) for every queued event"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class InstallationStateWatcher:
+    """Live model of the installation files, pushed to clients on change"""
+
+    def __init__(self, debounce: float = 0.05):
+        self.debounce = debounce
+        self.files: Dict[str, Path] = {}
+        self.state: Dict[str, Dict[str, Any]] = {}
+        # Bumped on every change; stands in for stat-based change detection
+        self.generation = 0
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, Path] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._rearm_needed = False
+
+    @property
+    def running(self) -> bool:
+        return self._inotify is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self.files = watched_files()
+        self.state = self._read_state()
+        try:
+            self._inotify = _Inotify()
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify unavailable, installation state will be polled: {e}")
+            return
+        self._loop = asyncio.get_running_loop()
+        self._arm()
+        self._loop.add_reader(self._inotify.fd, self._on_readable)
+        logger.info(f"Watching {len(self._watches)} directories for installation state changes")
+
+    async def stop(self):
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self._inotify is not None:
+            self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+
+    def _watch_dirs(self):
+        """The nearest existing directory above every watched file"""
+        dirs = set()
+        for path in self.files.values():
+            directory = path.parent
+            while not directory.is_dir() and directory != directory.parent:
+                directory = directory.parent
+            dirs.add(directory)
+        return dirs
+
+    def _arm(self):
+        for wd in list(self._watches):
+            self._inotify.rm_watch(wd)
+        self._watches.clear()
+        for directory in self._watch_dirs():
+            try:
+                self._watches[self._inotify.add_watch(directory, WATCH_MASK)] = directory
+            except OSError as e:
+                logger.debug(f"Cannot watch {directory}: {e}")
+
+    def _relevant(self, path: Path) -> bool:
+        # A watched file itself, or a directory on the way to one
+        return any(path == target or path in target.parents for target in self.files.values())
+
+    def _on_readable(self):
+        changed = False
+        for wd, mask, name in self._inotify.read_events():
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self._rearm_needed = True
+                changed = True
+                continue
+            path = directory / name if name else directory
+            if self._relevant(path):
+                changed = True
+                if mask & REARM_MASK and any(path in target.parents for target in self.files.values()):
+                    self._rearm_needed = True
+        if changed and self._pending is None:
+            # Coalesce bursts such as write + rename into one refresh
+            self._pending = self._loop.call_later(self.debounce, self._refresh)
+
+    def _read_state(self) -> Dict[str, Dict[str, Any]]:
+        state = {}
+        for key, path in self.files.items():
+            try:
+                stat = path.stat()
+                state[key] = {"path": str(path), "exists": True, "mtime": stat.st_mtime, "size": stat.st_size}
+            except OSError:
+                state[key] = {"path": str(path), "exists": False, "mtime": None, "size": None}
+        return state
+
+    def _refresh(self):
+        self._pending = None
+        if self._rearm_needed:
+            self._rearm_needed = False
+            self._arm()
+        state = self._read_state()
+        if state == self.state:
+            return
+        self.state = state
+        self.generation += 1
+        logger.info(f"Installation files changed: {', '.join(k for k, v in state.items() if v['exists'])}")
+        asyncio.ensure_future(self._publish())
+
+    def summary(self) -> Dict[str, Any]:
+        """The file-based parts of the installation state"""
+        exists = {key: entry["exists"] for key, entry in self.state.items()}
+        return {
+            "environment_setup": exists.get("env_file", False) and exists.get("inventory", False),
+            "ansible_installed": exists.get("ansible_playbook", False),
+            "thinkube_repo_cloned": exists.get("thinkube_ansible", False),
+            "ssh_keys_configured": exists.get("ssh_public_key", False),
+            # A cleared state leaves an empty journal behind
+            "deployment_state_saved": exists.get("deployment_state", False) or bool(
+                self.state.get("deployment_journal", {}).get("size")
+            ),
+            "files": self.state,
+            "generation": self.generation
+        }
+
+    async def _publish(self):
+        # Imported here, the installation state cache depends on this module
+        from .installation_state import installation_state
+        installation_state.invalidate()
+        app_state.installation_status["installation_files"] = self.summary()
+        await broadcast_status(app_state.installation_status)
+
+
+# Singleton instance
+state_watcher = InstallationStateWatcher()
@@ -0,0 +1,107 @@
+"""
+In-memory cache of credential verification results
+
+The configuration wizard verifies the same Cloudflare, ZeroTier and GitHub
+tokens on every step change and page reload. Results are kept here under an
+HMAC of (provider, token, resource) with a random per-process key, so tokens
+are never stored and the keys are useless outside this process. Successful
+verifications are reused for a while; failures only briefly, so a fixed
+token is picked up right away. Identical verifications that run at the same
+time share one upstream call. Exceptions are never cached.
+"""
+
+import asyncio
+import copy
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _is_valid(result: Any) -> bool:
+    """Verification endpoints return either {"valid": ...} or a model with success"""
+    if isinstance(result, dict):
+        return bool(result.get("valid"))
+    return bool(getattr(result, "success", False))
+
+
+class VerificationCache:
+    """TTL cache of verification results keyed by token hash"""
+
+    def __init__(self, positive_ttl: float = 600.0, negative_ttl: float = 15.0, max_entries: int = 256):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._salt = secrets.token_bytes(32)
+        self._entries: Dict[str, Tuple[str, float, Any]] = {}  # key -> (provider, expires, result)
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def key(self, provider: str, token: str, resource: str = "") -> str:
+        message = "\0".join((provider, token, resource)).encode()
+        return hmac.new(self._salt, message, hashlib.sha256).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[2]
+
+    def _store(self, key: str, provider: str, result: Any):
+        now = time.monotonic()
+        ttl = self.positive_ttl if _is_valid(result) else self.negative_ttl
+        for stale in [k for k, entry in self._entries.items() if entry[1] <= now]:
+            del self._entries[stale]
+        while len(self._entries) >= self.max_entries:
+            # Oldest insertion first
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (provider, now + ttl, result)
+
+    async def _run(self, key: str, provider: str, verify: Callable[[], Awaitable[Any]]) -> Any:
+        result = await verify()
+        self._store(key, provider, result)
+        return result
+
+    async def verify(
+        self,
+        provider: str,
+        token: str,
+        resource: str,
+        verify: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached result for these credentials, or run verify()
+
+        verify must raise rather than return a result for transient failures
+        it does not want cached.
+        """
+        key = self.key(provider, token, resource)
+        result = self._lookup(key)
+        if result is not None:
+            logger.debug(f"Verification cache hit for {provider}")
+            return copy.deepcopy(result)
+        # Concurrent callers share one upstream call, and its failure
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.create_task(self._run(key, provider, verify))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return copy.deepcopy(await asyncio.shield(pending))
+
+    def invalidate(self, provider: Optional[str] = None):
+        """Forget the results of one provider, or everything"""
+        if provider is None:
+            self._entries.clear()
+        else:
+            for key in [k for k, entry in self._entries.items() if entry[0] == provider]:
+                del self._entries[key]
+
+
+# Singleton instance
+verification_cache = VerificationCache()
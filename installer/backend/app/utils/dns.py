@@ -0,0 +1,145 @@
+"""
+Minimal DNS wire format helpers
+
+Only what the installer needs for reverse lookups and DNS-SD browsing:
+building single-question queries and decoding responses, including name
+compression and the A, AAAA, PTR, SRV and TXT record types.
+"""
+
+import ipaddress
+import struct
+from typing import Dict, Any, List, Tuple
+
+TYPE_A = 1
+TYPE_PTR = 12
+TYPE_TXT = 16
+TYPE_AAAA = 28
+TYPE_SRV = 33
+TYPE_ANY = 255
+
+CLASS_IN = 1
+# mDNS: top bit of the question class requests a unicast response,
+# top bit of a record class is the cache-flush flag
+CLASS_UNICAST_RESPONSE = 0x8000
+CLASS_MASK = 0x7FFF
+
+
+def reverse_pointer(ip: str) -> str:
+    """Return the in-addr.arpa / ip6.arpa name for an address"""
+    # Scoped link-local addresses (fe80::1%eth0) share the unscoped name
+    return ipaddress.ip_address(ip.split('%')[0]).reverse_pointer
+
+
+def encode_name(name: str) -> bytes:
+    """Encode a dotted domain name as a sequence of length-prefixed labels"""
+    encoded = b''
+    for label in name.rstrip('.').split('.'):
+        if label:
+            raw = label.encode('utf-8')
+            encoded += bytes([len(raw)]) + raw
+    return encoded + b'\x00'
+
+
+def build_query(txid: int, name: str, qtype: int, qclass: int = CLASS_IN, recursion: bool = True) -> bytes:
+    """Build a query message with a single question"""
+    flags = 0x0100 if recursion else 0x0000
+    header = struct.pack('!HHHHHH', txid, flags, 1, 0, 0, 0)
+    return header + encode_name(name) + struct.pack('!HH', qtype, qclass)
+
+
+def decode_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Decode a possibly compressed name, returning it and the offset after it"""
+    labels = []
+    end_offset = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Name runs past end of message")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise ValueError("Truncated compression pointer")
+            if end_offset is None:
+                end_offset = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise ValueError("Compression pointer loop")
+            continue
+        if length == 0:
+            offset += 1
+            break
+        labels.append(data[offset + 1:offset + 1 + length].decode('utf-8', errors='replace'))
+        offset += 1 + length
+    return '.'.join(labels), end_offset if end_offset is not None else offset
+
+
+def _decode_rdata(data: bytes, offset: int, rtype: int, rdlength: int) -> Any:
+    rdata = data[offset:offset + rdlength]
+    if rtype == TYPE_A and rdlength == 4:
+        return str(ipaddress.IPv4Address(rdata))
+    if rtype == TYPE_AAAA and rdlength == 16:
+        return str(ipaddress.IPv6Address(rdata))
+    if rtype == TYPE_PTR:
+        return decode_name(data, offset)[0]
+    if rtype == TYPE_SRV and rdlength >= 7:
+        priority, weight, port = struct.unpack('!HHH', rdata[:6])
+        return {
+            "priority": priority,
+            "weight": weight,
+            "port": port,
+            "target": decode_name(data, offset + 6)[0]
+        }
+    if rtype == TYPE_TXT:
+        entries = []
+        pos = 0
+        while pos < len(rdata):
+            length = rdata[pos]
+            entries.append(rdata[pos + 1:pos + 1 + length].decode('utf-8', errors='replace'))
+            pos += 1 + length
+        return entries
+    return rdata
+
+
+def parse_message(data: bytes) -> Dict[str, Any]:
+    """
+    Parse a DNS message
+
+    Returns the header fields, the question names and all resource records
+    (answers, authority and additional sections flattened into "records").
+    """
+    if len(data) < 12:
+        raise ValueError("Message shorter than DNS header")
+    txid, flags, qdcount, ancount, nscount, arcount = struct.unpack('!HHHHHH', data[:12])
+    offset = 12
+
+    questions = []
+    for _ in range(qdcount):
+        name, offset = decode_name(data, offset)
+        qtype, qclass = struct.unpack('!HH', data[offset:offset + 4])
+        offset += 4
+        questions.append({"name": name, "type": qtype, "class": qclass & CLASS_MASK})
+
+    records: List[Dict[str, Any]] = []
+    for _ in range(ancount + nscount + arcount):
+        name, offset = decode_name(data, offset)
+        rtype, rclass, ttl, rdlength = struct.unpack('!HHIH', data[offset:offset + 10])
+        offset += 10
+        if offset + rdlength > len(data):
+            raise ValueError("Record data runs past end of message")
+        records.append({
+            "name": name,
+            "type": rtype,
+            "class": rclass & CLASS_MASK,
+            "ttl": ttl,
+            "data": _decode_rdata(data, offset, rtype, rdlength)
+        })
+        offset += rdlength
+
+    return {
+        "id": txid,
+        "is_response": bool(flags & 0x8000),
+        "rcode": flags & 0x000F,
+        "questions": questions,
+        "records": records
+    }
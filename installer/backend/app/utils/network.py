@@ -6,67 +6,19 @@ import asyncio
 import logging
 import ipaddress
 import socket
-import re
-from typing import Set, Dict, Any, List
+from typing import Set, Dict, Any, List, Optional
+
+from .resolver import resolve_hostnames
+from .ssh_fingerprint import classify_banner
+from ..services.local_addresses import local_address_service
+from ..services.ssh_pool import ssh_pool
 
 logger = logging.getLogger(__name__)
 
 
 async def get_local_ip_addresses() -> Set[str]:
-    """Get all local IP addresses"""
-    try:
-        local_ips = set()
-        
-        # Method 1: Parse ip addr output 
-        result = await asyncio.create_subprocess_exec(
-            'ip', 'addr', 'show',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
-        
-        if result.returncode == 0:
-            # Extract all IP addresses from ip addr output, excluding CIDR
-            ip_pattern = r'inet (\d+\.\d+\.\d+\.\d+)/\d+'
-            for match in re.finditer(ip_pattern, stdout.decode()):
-                ip = match.group(1)
-                if ip != '127.0.0.1':  # Exclude localhost
-                    local_ips.add(ip)
-                    logger.info(f"Found local IP: {ip}")
-        
-        # Method 2: Use hostname resolution as fallback
-        try:
-            hostname = socket.gethostname()
-            host_ip = socket.gethostbyname(hostname)
-            if host_ip != '127.0.0.1':
-                local_ips.add(host_ip)
-                logger.info(f"Found hostname IP: {host_ip}")
-        except:
-            pass
-        
-        # Method 3: Check default route interface
-        try:
-            route_result = await asyncio.create_subprocess_exec(
-                'ip', 'route', 'get', '8.8.8.8',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            route_stdout, _ = await route_result.communicate()
-            if route_result.returncode == 0:
-                # Extract source IP from route output
-                src_match = re.search(r'src (\d+\.\d+\.\d+\.\d+)', route_stdout.decode())
-                if src_match:
-                    src_ip = src_match.group(1)
-                    local_ips.add(src_ip)
-                    logger.info(f"Found route source IP: {src_ip}")
-        except:
-            pass
-        
-        logger.info(f"Total local IPs found: {local_ips}")
-        return local_ips
-    except Exception as e:
-        logger.error(f"Error getting local IPs: {e}")
-        return set()
+    """Get all local IP addresses (IPv4 and IPv6, excluding loopback)"""
+    return local_address_service.local_ips()
 
 
 def is_local_ip(ip_address: str, local_ips: Set[str] = None) -> bool:
@@ -90,10 +42,32 @@ def is_local_ip(ip_address: str, local_ips: Set[str] = None) -> bool:
         return False
 
 
-async def ping_sweep(network_cidr: str) -> List[str]:
-    """Perform a ping sweep to find active IPs"""
+def network_hosts(network_cidr: str) -> List[str]:
+    """List the host addresses of a network that discovery will consider"""
+    network = ipaddress.IPv4Network(network_cidr, strict=False)
+    
+    # Limit to reasonable subnet size (max 254 hosts)
+    host_count = min(254, network.num_addresses - 2)
+    hosts = []
+    for i, ip in enumerate(network.hosts()):
+        if i >= host_count:
+            break
+        hosts.append(str(ip))
+    return hosts
+
+
+async def ping_sweep(
+    network_cidr: str,
+    hosts: Optional[List[str]] = None,
+    budget: Optional[asyncio.Semaphore] = None
+) -> List[str]:
+    """
+    Perform a ping sweep to find active IPs, optionally only over the given hosts
+
+    When a budget semaphore is given, every ping holds a slot of it instead
+    of running in fixed batches, so several sweeps can share one limit.
+    """
     try:
-        network = ipaddress.IPv4Network(network_cidr, strict=False)
         active_ips = []
         
         # Create tasks for concurrent pinging
@@ -111,14 +85,17 @@ async def ping_sweep(network_cidr: str) -> List[str]:
                 pass
             return None
         
-        # Limit to reasonable subnet size (max 254 hosts)
-        host_count = min(254, network.num_addresses - 2)
-        tasks = []
+        if hosts is None:
+            hosts = network_hosts(network_cidr)
         
-        for i, ip in enumerate(network.hosts()):
-            if i >= host_count:
-                break
-            tasks.append(ping_ip(str(ip)))
+        if budget is not None:
+            async def budgeted_ping(ip_str):
+                async with budget:
+                    return await ping_ip(ip_str)
+            results = await asyncio.gather(*[budgeted_ping(ip) for ip in hosts])
+            return [ip for ip in results if ip]
+        
+        tasks = [ping_ip(ip) for ip in hosts]
         
         # Execute pings concurrently in batches to avoid overwhelming
         batch_size = 50
@@ -133,6 +110,98 @@ async def ping_sweep(network_cidr: str) -> List[str]:
         return []
 
 
+async def get_local_networks() -> List[Dict[str, str]]:
+    """List the IPv4 networks directly attached to local interfaces"""
+    return local_address_service.networks()
+
+
+async def get_interfaces_for_network(network_cidr: str) -> List[str]:
+    """List the local interfaces with an address inside the given network"""
+    return local_address_service.interfaces_for_network(network_cidr)
+
+
+async def get_ipv6_interfaces() -> List[str]:
+    """List the non-loopback interfaces that have IPv6 enabled"""
+    return local_address_service.ipv6_interfaces()
+
+
+def read_arp_table() -> Dict[str, str]:
+    """Map IPv4 neighbour addresses to MAC addresses from /proc/net/arp"""
+    neighbours = {}
+    try:
+        with open('/proc/net/arp', 'r') as f:
+            next(f)  # Header
+            for line in f:
+                parts = line.split()
+                # IP address, HW type, Flags, HW address, Mask, Device
+                if len(parts) >= 6 and parts[2] != '0x0' and parts[3] != '00:00:00:00:00:00':
+                    neighbours[parts[0]] = parts[3].lower()
+    except Exception as e:
+        logger.debug(f"Could not read ARP table: {e}")
+    return neighbours
+
+
+async def ipv6_neighbor_discovery(interfaces: Optional[List[str]] = None, timeout: int = 2) -> List[Dict[str, Any]]:
+    """
+    Find IPv6 neighbours without sweeping
+
+    Sends an echo request to the all-nodes multicast group on every
+    interface, which makes every IPv6 host on the link answer and land in
+    the kernel neighbour table, then reads that table per interface.
+    Link-local addresses are returned with their %interface scope so they
+    can be connected to directly.
+    """
+    if interfaces is None:
+        interfaces = await get_ipv6_interfaces()
+    
+    async def discover_on(interface: str) -> List[Dict[str, Any]]:
+        try:
+            ping = await asyncio.create_subprocess_exec(
+                'ping', '-6', '-c', '2', '-i', '0.5', '-w', str(timeout), '-I', interface, 'ff02::1',
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            await ping.communicate()
+            
+            neigh = await asyncio.create_subprocess_exec(
+                'ip', '-6', 'neigh', 'show', 'dev', interface,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, _ = await neigh.communicate()
+        except Exception as e:
+            logger.debug(f"IPv6 neighbour discovery on {interface} failed: {e}")
+            return []
+        
+        neighbours = []
+        for line in stdout.decode().split('\n'):
+            # Format: "fe80::1 lladdr aa:bb:cc:dd:ee:ff router REACHABLE"
+            parts = line.split()
+            if len(parts) < 3 or 'lladdr' not in parts or parts[-1] in ('FAILED', 'INCOMPLETE'):
+                continue
+            try:
+                # An unexpected line is skipped instead of failing the whole discovery
+                address = ipaddress.IPv6Address(parts[0])
+                mac = parts[parts.index('lladdr') + 1].lower()
+            except (ValueError, IndexError):
+                logger.debug(f"Skipping unparsable neighbour entry on {interface}: {line!r}")
+                continue
+            if address.is_multicast or address.is_loopback:
+                continue
+            neighbours.append({
+                "address": f"{address}%{interface}" if address.is_link_local else str(address),
+                "interface": interface,
+                "mac": mac,
+                "scope": "link" if address.is_link_local else "global"
+            })
+        return neighbours
+    
+    results = await asyncio.gather(*[discover_on(interface) for interface in interfaces])
+    neighbours = [n for per_interface in results for n in per_interface]
+    logger.info(f"Found {len(neighbours)} IPv6 neighbours on {len(interfaces)} interfaces")
+    return neighbours
+
+
 async def check_ssh_banner(ip: str, port: int = 22, timeout: int = 3) -> Dict[str, Any]:
     """Check if SSH is running and get banner info"""
     try:
@@ -153,17 +222,15 @@ async def check_ssh_banner(ip: str, port: int = 22, timeout: int = 3) -> Dict[st
         banner_str = banner.decode('utf-8', errors='ignore').strip()
         
         # Analyze banner for Ubuntu indicators
-        is_ubuntu = 'Ubuntu' in banner_str
+        fingerprint = classify_banner(banner_str)
+        is_ubuntu = fingerprint.distro == 'Ubuntu' and fingerprint.match != 'upstream'
         
-        # Be more specific about Ubuntu detection
-        is_likely_ubuntu = False
-        if is_ubuntu:
-            is_likely_ubuntu = True
-        elif 'OpenSSH' in banner_str:
-            # Check for Ubuntu-specific OpenSSH patterns
-            # Ubuntu typically has version patterns like "OpenSSH_8.9p1" or "OpenSSH_9.6p1"
-            if any(version in banner_str for version in ['OpenSSH_8.9', 'OpenSSH_9.0', 'OpenSSH_9.3', 'OpenSSH_9.6']):
-                is_likely_ubuntu = True
+        # Without a distribution comment the upstream version can still
+        # point at an Ubuntu release
+        is_likely_ubuntu = is_ubuntu or (
+            fingerprint.match == 'upstream' and
+            any(label.startswith('Ubuntu') for label in fingerprint.candidates or (fingerprint.label or '',))
+        )
         
         ssh_version = banner_str if banner_str.startswith('SSH-') else None
         
@@ -172,7 +239,8 @@ async def check_ssh_banner(ip: str, port: int = 22, timeout: int = 3) -> Dict[st
             'banner': banner_str,
             'is_ubuntu': is_ubuntu,
             'is_likely_ubuntu': is_likely_ubuntu,
-            'ssh_version': ssh_version
+            'ssh_version': ssh_version,
+            'fingerprint': fingerprint.to_dict()
         }
         
     except Exception as e:
@@ -182,68 +250,15 @@ async def check_ssh_banner(ip: str, port: int = 22, timeout: int = 3) -> Dict[st
             'is_ubuntu': False,
             'is_likely_ubuntu': False,
             'ssh_version': None,
+            'fingerprint': None,
             'error': str(e)
         }
 
 
 async def get_hostname_info(ip: str) -> str:
-    """Try to get hostname via multiple methods"""
-    # Method 1: Try mDNS/Avahi discovery (works on Ubuntu desktop)
-    try:
-        result = await asyncio.create_subprocess_exec(
-            'avahi-resolve', '-a', ip,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
-        
-        if stdout:
-            output = stdout.decode().strip()
-            # Format: "192.168.1.101    hostname.local"
-            parts = output.split()
-            if len(parts) >= 2:
-                hostname = parts[1].rstrip('.local')
-                return hostname
-    except:
-        pass
-    
-    # Method 2: NetBIOS name resolution (for mixed networks)
-    try:
-        result = await asyncio.create_subprocess_exec(
-            'nmblookup', '-A', ip,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
-        
-        if stdout:
-            output = stdout.decode()
-            for line in output.split('\n'):
-                if '<00>' in line and 'GROUP' not in line:
-                    hostname = line.split()[0].strip()
-                    if hostname and hostname != ip:
-                        return hostname
-    except:
-        pass
-    
-    # Method 3: Simple reverse DNS (may not work on clean systems)
-    try:
-        result = await asyncio.create_subprocess_exec(
-            'dig', '+short', '-x', ip,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await result.communicate()
-        
-        if stdout:
-            hostname = stdout.decode().strip().rstrip('.')
-            if hostname and not hostname.startswith(';') and hostname != ip and '.' in hostname:
-                # Only accept FQDN results, not just IP addresses
-                return hostname.split('.')[0]  # Return just the hostname part
-    except:
-        pass
-    
-    return None
+    """Try to get hostname via reverse DNS, mDNS and NetBIOS"""
+    hostnames = await resolve_hostnames([ip])
+    return hostnames.get(ip)
 
 
 async def get_hostname_via_ssh(ip: str, timeout: int = 5) -> str:
@@ -251,22 +266,16 @@ async def get_hostname_via_ssh(ip: str, timeout: int = 5) -> str:
     try:
         # Try to get hostname via SSH (if SSH key auth is available)
         # This is the most reliable method for clean systems
-        result = await asyncio.create_subprocess_exec(
-            'ssh', '-o', 'ConnectTimeout=3', 
-            '-o', 'StrictHostKeyChecking=no',
-            '-o', 'UserKnownHostsFile=/dev/null',
-            '-o', 'BatchMode=yes',  # Don't prompt for password
-            f'thinkube@{ip}', 'hostname',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        result = await asyncio.wait_for(
+            ssh_pool.run(ip, 'thinkube', 'hostname', timeout=timeout),
+            timeout=timeout
         )
-        stdout, stderr = await asyncio.wait_for(result.communicate(), timeout=timeout)
         
-        if result.returncode == 0 and stdout:
-            hostname = stdout.decode().strip()
+        if result.ok and result.stdout:
+            hostname = result.stdout.strip()
             if hostname and hostname != ip:
                 return hostname
     except:
         pass
     
-    return None
\ No newline at end of file
+    return None
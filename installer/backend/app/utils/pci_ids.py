@@ -0,0 +1,180 @@
+"""
+PCI ID database lookups
+
+Resolves vendor and device ids such as 10de:2204 to names ("GA102 [GeForce
+RTX 3090]") straight from a pci.ids file, without running lspci. The file is
+memory-mapped and only indexed on first use: one regex pass records the
+offset of every vendor block, and a vendor's device lines are indexed the
+first time one of its devices is looked up.
+
+A pci.ids placed in app/data takes precedence over the system copies.
+
+    python -m app.utils.pci_ids lookup 10de:2204
+    python -m app.utils.pci_ids bench --file /usr/share/misc/pci.ids
+"""
+
+import mmap
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BUNDLED_PCI_IDS = Path(__file__).resolve().parent.parent / "data" / "pci.ids"
+SYSTEM_PCI_IDS = (
+    Path("/usr/share/misc/pci.ids"),
+    Path("/usr/share/hwdata/pci.ids"),
+    Path("/usr/share/pci.ids"),
+)
+
+_VENDOR_RE = re.compile(rb'^([0-9a-f]{4})  ', re.MULTILINE)
+_DEVICE_RE = re.compile(rb'^\t([0-9a-f]{4})  ', re.MULTILINE)
+
+
+class PCIIdsDatabase:
+    """Lazily indexed, memory-mapped pci.ids file"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        # vendor id -> (offset of vendor line, end of its device block)
+        self._vendors: Optional[Dict[bytes, Tuple[int, int]]] = None
+        # vendor id -> device id -> offset of device line
+        self._devices: Dict[bytes, Dict[bytes, int]] = {}
+
+    def _index(self) -> Dict[bytes, Tuple[int, int]]:
+        if self._vendors is None:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            starts: List[Tuple[bytes, int]] = [
+                (m.group(1), m.start()) for m in _VENDOR_RE.finditer(self._map)
+            ]
+            # The device class section ends the last vendor block
+            classes = self._map.find(b'\nC ')
+            end_of_vendors = classes + 1 if classes != -1 else len(self._map)
+            self._vendors = {}
+            for i, (vendor, start) in enumerate(starts):
+                end = starts[i + 1][1] if i + 1 < len(starts) else end_of_vendors
+                self._vendors[vendor] = (start, end)
+        return self._vendors
+
+    def _line_text(self, offset: int, skip: int) -> str:
+        end = self._map.find(b'\n', offset)
+        if end == -1:
+            end = len(self._map)
+        return self._map[offset + skip:end].decode('utf-8', errors='replace').strip()
+
+    def vendor_name(self, vendor_id: str) -> Optional[str]:
+        block = self._index().get(vendor_id.lower().encode())
+        if block is None:
+            return None
+        return self._line_text(block[0], 4)
+
+    def device_name(self, vendor_id: str, device_id: str) -> Optional[str]:
+        vendor = vendor_id.lower().encode()
+        block = self._index().get(vendor)
+        if block is None:
+            return None
+        devices = self._devices.get(vendor)
+        if devices is None:
+            devices = {
+                m.group(1): m.start()
+                for m in _DEVICE_RE.finditer(self._map, block[0], block[1])
+            }
+            self._devices[vendor] = devices
+        offset = devices.get(device_id.lower().encode())
+        if offset is None:
+            return None
+        return self._line_text(offset, 5)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._vendors = None
+        self._devices.clear()
+
+
+def find_pci_ids() -> Optional[Path]:
+    """Locate the pci.ids file to use, bundled copy first"""
+    for path in (BUNDLED_PCI_IDS,) + SYSTEM_PCI_IDS:
+        if path.is_file():
+            return path
+    return None
+
+
+_database: Optional[PCIIdsDatabase] = None
+_searched = False
+
+
+def get_database() -> Optional[PCIIdsDatabase]:
+    """Return the shared database, or None when no pci.ids is available"""
+    global _database, _searched
+    if not _searched:
+        _searched = True
+        path = find_pci_ids()
+        if path is not None:
+            _database = PCIIdsDatabase(path)
+    return _database
+
+
+def lookup_device_name(vendor_id: str, device_id: str) -> Optional[str]:
+    """Name of a PCI device, e.g. ("10de", "2204") -> "GA102 [GeForce RTX 3090]" """
+    database = get_database()
+    if database is None:
+        return None
+    try:
+        return database.device_name(vendor_id, device_id)
+    except (OSError, ValueError):
+        return None
+
+
+def _benchmark(path: Path, lookups: int = 100_000):
+    """Time the cold index build and warm device lookups"""
+    import random
+    import time
+
+    database = PCIIdsDatabase(path)
+    start = time.perf_counter()
+    vendors = database._index()
+    cold = time.perf_counter() - start
+
+    pairs = []
+    for vendor in list(vendors)[:200]:
+        start_offset, end_offset = vendors[vendor]
+        for m in _DEVICE_RE.finditer(database._map, start_offset, end_offset):
+            pairs.append((vendor.decode(), m.group(1).decode()))
+    if not pairs:
+        print(f"No devices found in {path}")
+        return
+    queries = [random.choice(pairs) for _ in range(lookups)]
+
+    start = time.perf_counter()
+    for vendor, device in queries:
+        database.device_name(vendor, device)
+    warm = time.perf_counter() - start
+    print(f"{path}: indexed {len(vendors)} vendors in {cold * 1000:.1f} ms (cold), "
+          f"{lookups} lookups in {warm:.3f}s ({lookups / warm:,.0f} lookups/s warm)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PCI ID database lookups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    lookup = subparsers.add_parser("lookup", help="Resolve vendor:device ids")
+    lookup.add_argument("ids", nargs="+", help="e.g. 10de:2204")
+
+    bench = subparsers.add_parser("bench", help="Benchmark index build and lookups")
+    bench.add_argument("--file", type=Path, default=None)
+    bench.add_argument("--lookups", type=int, default=100_000)
+
+    args = parser.parse_args()
+    if args.command == "lookup":
+        for pci_id in args.ids:
+            vendor, _, device = pci_id.partition(":")
+            print(f"{pci_id}: {lookup_device_name(vendor, device)}")
+    else:
+        path = args.file or find_pci_ids()
+        if path is None:
+            parser.error("No pci.ids found; pass --file")
+        _benchmark(path, args.lookups)
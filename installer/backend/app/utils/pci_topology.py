@@ -0,0 +1,190 @@
+"""
+PCI topology and IOMMU group model
+
+Builds, in one pass over the PCI devices of a hardware probe report, indexes
+from address to device and from IOMMU group to its members, and answers GPU
+passthrough questions from them.
+
+A GPU can be passed through to a VM only if its IOMMU group contains nothing
+but the GPU itself and NVIDIA audio functions (the HDMI/DP audio controller
+that sits on the same card and always shares its group).
+
+The sysfs trees under app/probes/fixtures model typical multi-GPU boards,
+each with the passthrough report it must produce:
+
+    python -m app.utils.pci_topology check [--fixtures DIR]
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "probes" / "fixtures"
+
+NVIDIA_VENDOR = "10de"
+GPU_CLASSES = ("0300", "0302", "0380")  # VGA, 3D and other display controllers
+AUDIO_CLASS = "0403"
+VFIO_DRIVER = "vfio-pci"
+
+
+@dataclass
+class PCIDevice:
+    """One PCI function as reported by the hardware probe"""
+    address: str
+    pci_class: str
+    vendor: str
+    device: str
+    driver: Optional[str] = None
+    iommu_group: Optional[str] = None
+    name: Optional[str] = None
+
+    @classmethod
+    def from_report(cls, entry: Dict[str, Any]) -> "PCIDevice":
+        return cls(
+            address=entry["address"],
+            pci_class=entry.get("class", ""),
+            vendor=entry.get("vendor", ""),
+            device=entry.get("device", ""),
+            driver=entry.get("driver"),
+            iommu_group=entry.get("iommu_group"),
+            name=entry.get("name")
+        )
+
+    @property
+    def short_address(self) -> str:
+        # lspci style, without the PCI domain: 0000:01:00.0 -> 01:00.0
+        return self.address[5:] if self.address.startswith("0000:") else self.address
+
+    @property
+    def is_nvidia_gpu(self) -> bool:
+        return self.vendor == NVIDIA_VENDOR and self.pci_class[:4] in GPU_CLASSES
+
+    @property
+    def is_nvidia_audio(self) -> bool:
+        return self.vendor == NVIDIA_VENDOR and self.pci_class.startswith(AUDIO_CLASS)
+
+    @property
+    def vfio_bound(self) -> bool:
+        return self.driver == VFIO_DRIVER
+
+
+@dataclass
+class GPUEligibility:
+    """Passthrough eligibility of one GPU"""
+    device: PCIDevice
+    status: str  # isolated, shared or no_group
+    blocking: List[PCIDevice] = field(default_factory=list)
+
+    @property
+    def eligible(self) -> bool:
+        return self.status == "isolated"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pci_address": self.device.short_address,
+            "iommu_group": self.device.iommu_group,
+            "passthrough_eligible": self.eligible,
+            "status": self.status,
+            "driver": self.device.driver,
+            "blocking_devices": [d.short_address for d in self.blocking]
+        }
+
+
+class PCITopology:
+    """Indexed view of the PCI devices and IOMMU groups of one host"""
+
+    def __init__(self, devices: Iterable[PCIDevice], iommu_enabled: bool = True):
+        self.iommu_enabled = iommu_enabled
+        self.devices: Dict[str, PCIDevice] = {}
+        self.groups: Dict[str, List[PCIDevice]] = {}
+        self.by_driver: Dict[Optional[str], List[PCIDevice]] = {}
+        self.nvidia_gpus: List[PCIDevice] = []
+        # Group members that stand in the way of passing the group through
+        self._blocking: Dict[str, List[PCIDevice]] = {}
+
+        for device in devices:
+            self.devices[device.address] = device
+            self.by_driver.setdefault(device.driver, []).append(device)
+            if device.is_nvidia_gpu:
+                self.nvidia_gpus.append(device)
+            if device.iommu_group is not None:
+                self.groups.setdefault(device.iommu_group, []).append(device)
+                if not device.is_nvidia_audio:
+                    self._blocking.setdefault(device.iommu_group, []).append(device)
+
+    @classmethod
+    def from_report(cls, report: Dict[str, Any]) -> "PCITopology":
+        """Build the topology from a hardware probe report"""
+        iommu = report.get("iommu") or {}
+        return cls(
+            (PCIDevice.from_report(entry) for entry in report.get("pci_devices") or []),
+            iommu_enabled=bool(iommu.get("present") and iommu.get("group_count"))
+        )
+
+    def gpu_eligibility(self, gpu: PCIDevice) -> GPUEligibility:
+        """Passthrough eligibility of a GPU, from the precomputed group index"""
+        if not self.iommu_enabled or gpu.iommu_group is None:
+            return GPUEligibility(device=gpu, status="no_group")
+        # A GPU is never an audio function, so it is always one of its group's blockers
+        group_blocking = self._blocking.get(gpu.iommu_group, [])
+        status = "shared" if len(group_blocking) > 1 else "isolated"
+        return GPUEligibility(
+            device=gpu,
+            status=status,
+            blocking=[d for d in group_blocking if d is not gpu] if status == "shared" else []
+        )
+
+    def passthrough_report(self) -> Dict[str, Any]:
+        """
+        Eligibility of every NVIDIA GPU plus group and driver summaries
+
+        Without IOMMU no GPU can be passed through, and none are listed.
+        """
+        gpus = [self.gpu_eligibility(gpu) for gpu in self.nvidia_gpus] if self.iommu_enabled else []
+        return {
+            "iommu_enabled": self.iommu_enabled,
+            "iommu_group_count": len(self.groups),
+            "gpus": [g.to_dict() for g in gpus],
+            "eligible_count": sum(1 for g in gpus if g.eligible),
+            "vfio_bound": [d.short_address for d in self.by_driver.get(VFIO_DRIVER, [])]
+        }
+
+
+def _check(fixtures: Path) -> bool:
+    """Probe every fixture tree and compare its report with expected.json"""
+    from ..probes.hardware_probe import collect
+
+    passed = True
+    boards = sorted(p for p in fixtures.iterdir() if (p / "expected.json").is_file())
+    for board in boards:
+        expected = json.loads((board / "expected.json").read_text())
+        report = PCITopology.from_report(collect(str(board))).passthrough_report()
+        # "hardware" holds the HardwareInfo fields checked by app.core.hardware
+        mismatches = [
+            key for key in expected
+            if key not in ("description", "hardware") and report.get(key) != expected[key]
+        ]
+        if mismatches:
+            passed = False
+            print(f"FAIL {board.name}: " + "; ".join(
+                f"{key} is {report.get(key)!r}, expected {expected[key]!r}" for key in mismatches
+            ))
+        else:
+            print(f"ok   {board.name}: {expected['description']}")
+    print(f"{len(boards)} fixtures checked")
+    return passed and bool(boards)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="PCI topology and GPU passthrough eligibility")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check = subparsers.add_parser("check", help="Check the passthrough report of every sysfs fixture")
+    check.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+
+    args = parser.parse_args()
+    sys.exit(0 if _check(args.fixtures) else 1)
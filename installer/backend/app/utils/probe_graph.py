@@ -0,0 +1,114 @@
+"""
+Dependency graph of asynchronous probes
+
+Each probe names the probes whose results it needs. Probes run as soon as
+their dependencies have finished, so independent probes run concurrently,
+and every probe has its own timeout: a probe that times out or fails yields
+its default value instead of holding up the rest of the graph.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Probe:
+    """One node of a probe graph"""
+    name: str
+    # Called with the values of the dependencies, keyed by probe name
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    default: Any = None
+    # Decides from the dependency values whether to run at all
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of one probe"""
+    name: str
+    value: Any
+    duration: float = 0.0
+    skipped: bool = False
+    timed_out: bool = False
+    error: Optional[str] = None
+
+
+class ProbeGraph:
+    """A validated set of probes that can be run together"""
+
+    def __init__(self, probes: List[Probe]):
+        self.probes: Dict[str, Probe] = {}
+        for probe in probes:
+            if probe.name in self.probes:
+                raise ValueError(f"Duplicate probe: {probe.name}")
+            self.probes[probe.name] = probe
+        for probe in probes:
+            for dependency in probe.depends_on:
+                if dependency not in self.probes:
+                    raise ValueError(f"Probe {probe.name} depends on unknown probe {dependency}")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Probe dependency cycle through {name}")
+            visiting.add(name)
+            for dependency in self.probes[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.probes:
+            visit(name)
+
+    async def _run_probe(self, probe: Probe, tasks: Dict[str, "asyncio.Task[ProbeResult]"]) -> ProbeResult:
+        inputs = {}
+        for dependency in probe.depends_on:
+            inputs[dependency] = (await tasks[dependency]).value
+
+        if probe.when is not None and not probe.when(inputs):
+            return ProbeResult(name=probe.name, value=probe.default, skipped=True)
+
+        start = time.monotonic()
+        try:
+            value = await asyncio.wait_for(probe.run(inputs), timeout=probe.timeout)
+            return ProbeResult(name=probe.name, value=value, duration=time.monotonic() - start)
+        except asyncio.TimeoutError:
+            logger.warning(f"Probe {probe.name} timed out after {probe.timeout}s")
+            return ProbeResult(
+                name=probe.name, value=probe.default, duration=time.monotonic() - start,
+                timed_out=True, error=f"Timed out after {probe.timeout}s"
+            )
+        except Exception as e:
+            logger.warning(f"Probe {probe.name} failed: {e}")
+            return ProbeResult(
+                name=probe.name, value=probe.default, duration=time.monotonic() - start,
+                error=str(e)
+            )
+
+    async def stream(self) -> AsyncIterator[ProbeResult]:
+        """Run every probe and yield the results in completion order"""
+        tasks: Dict[str, asyncio.Task] = {}
+        for probe in self.probes.values():
+            tasks[probe.name] = asyncio.ensure_future(self._run_probe(probe, tasks))
+        try:
+            for next_done in asyncio.as_completed(list(tasks.values())):
+                yield await next_done
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    async def run(self) -> Dict[str, ProbeResult]:
+        """Run every probe and return all results keyed by probe name"""
+        return {result.name: result async for result in self.stream()}
@@ -0,0 +1,229 @@
+"""
+In-process hostname resolution for discovered hosts
+
+Runs unicast reverse DNS, an mDNS PTR query and a NetBIOS node status query
+over asyncio datagram sockets instead of spawning avahi-resolve, nmblookup
+and dig. A whole scan is resolved as one batch: each method uses a single
+socket for all hosts, and the three methods race per host.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import random
+import struct
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from . import dns
+
+logger = logging.getLogger(__name__)
+
+MDNS_GROUP = '224.0.0.251'
+MDNS_PORT = 5353
+NETBIOS_PORT = 137
+
+# NetBIOS node status query for the wildcard name "*"
+_NBSTAT_NAME = b'\x20' + bytes(
+    c for byte in b'*' + b'\x00' * 15 for c in (0x41 + (byte >> 4), 0x41 + (byte & 0x0F))
+) + b'\x00'
+_NBSTAT_TYPE = 0x0021
+
+
+def get_system_nameserver() -> str:
+    """Return the first nameserver configured in /etc/resolv.conf"""
+    try:
+        with open('/etc/resolv.conf', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    return parts[1]
+    except Exception:
+        pass
+    return '127.0.0.53'
+
+
+class _QueryProtocol(asyncio.DatagramProtocol):
+    """Datagram endpoint that routes replies to pending futures by key"""
+
+    def __init__(self, match: Callable[[bytes, Tuple], Optional[Tuple[Any, Optional[str]]]]):
+        self.match = match
+        self.pending: Dict[Any, asyncio.Future] = {}
+
+    def datagram_received(self, data, addr):
+        try:
+            matched = self.match(data, addr)
+        except Exception:
+            return
+        if not matched:
+            return
+        key, hostname = matched
+        future = self.pending.get(key)
+        if future is not None and not future.done():
+            future.set_result(hostname)
+
+    def error_received(self, exc):
+        logger.debug(f"Resolver socket error: {exc}")
+
+
+def _match_ptr(data: bytes, addr) -> Optional[Tuple[str, Optional[str]]]:
+    """Key PTR answers by the reverse name they answer"""
+    message = dns.parse_message(data)
+    if not message["is_response"]:
+        return None
+    for record in message["records"]:
+        if record["type"] == dns.TYPE_PTR:
+            return record["name"].lower(), record["data"]
+    # Answer without PTR data: let the query for that name fail fast
+    if message["questions"]:
+        return message["questions"][0]["name"].lower(), None
+    return None
+
+
+def _match_nbstat(data: bytes, addr) -> Optional[Tuple[str, Optional[str]]]:
+    """Key NetBIOS node status answers by the responding address"""
+    # Header (12) + name (34) + type, class, ttl, rdlength (10) + name count (1)
+    offset = 12 + len(_NBSTAT_NAME)
+    if len(data) < offset + 11:
+        return None
+    rtype = struct.unpack('!H', data[offset:offset + 2])[0]
+    if rtype != _NBSTAT_TYPE:
+        return None
+    offset += 10
+    count = data[offset]
+    offset += 1
+    for _ in range(count):
+        entry = data[offset:offset + 18]
+        if len(entry) < 18:
+            break
+        name = entry[:15].decode('ascii', errors='ignore').strip()
+        suffix = entry[15]
+        flags = struct.unpack('!H', entry[16:18])[0]
+        is_group = bool(flags & 0x8000)
+        if suffix == 0x00 and not is_group and name:
+            return addr[0], name
+        offset += 18
+    return addr[0], None
+
+
+def _clean_dns_hostname(name: Optional[str], ip: str) -> Optional[str]:
+    """Only accept FQDN results and return the host part"""
+    if not name:
+        return None
+    name = name.rstrip('.')
+    if name == ip or '.' not in name:
+        return None
+    return name.split('.')[0]
+
+
+def _clean_mdns_hostname(name: Optional[str], ip: str) -> Optional[str]:
+    if not name:
+        return None
+    name = name.rstrip('.')
+    if name.endswith('.local'):
+        name = name[:-len('.local')]
+    return name if name and name != ip else None
+
+
+async def _open_endpoint(match, **kwargs) -> Optional[Tuple[asyncio.DatagramTransport, _QueryProtocol]]:
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.create_datagram_endpoint(lambda: _QueryProtocol(match), **kwargs)
+    except Exception as e:
+        logger.debug(f"Could not open resolver socket {kwargs}: {e}")
+        return None
+
+
+async def resolve_hostnames(
+    ips: List[str],
+    timeout: float = 2.0,
+    nameserver: Optional[str] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Resolve hostnames for many addresses at once
+
+    For every address the reverse DNS, mDNS and NetBIOS queries are sent
+    together and the first usable answer wins. Addresses without any answer
+    map to None after the timeout.
+    """
+    if not ips:
+        return {}
+
+    loop = asyncio.get_running_loop()
+    nameserver = nameserver or get_system_nameserver()
+
+    dns_endpoint = await _open_endpoint(
+        _match_ptr, remote_addr=(nameserver, 53)
+    )
+    mdns_endpoint = await _open_endpoint(
+        _match_ptr, local_addr=('0.0.0.0', 0)
+    )
+    netbios_endpoint = await _open_endpoint(
+        _match_nbstat, local_addr=('0.0.0.0', 0), allow_broadcast=True
+    )
+    endpoints = [e for e in (dns_endpoint, mdns_endpoint, netbios_endpoint) if e]
+
+    # Per-host futures, each with the function that cleans its answer
+    host_futures: Dict[str, List[Tuple[asyncio.Future, Callable]]] = {ip: [] for ip in ips}
+    txid = random.randint(0, 0xFFFF)
+
+    try:
+        for ip in ips:
+            reverse_name = dns.reverse_pointer(ip)
+            is_ipv4 = ipaddress.ip_address(ip).version == 4
+            txid = (txid + 1) & 0xFFFF
+
+            if dns_endpoint:
+                transport, protocol = dns_endpoint
+                future = loop.create_future()
+                protocol.pending[reverse_name] = future
+                transport.sendto(dns.build_query(txid, reverse_name, dns.TYPE_PTR))
+                host_futures[ip].append((future, _clean_dns_hostname))
+
+            if mdns_endpoint:
+                # Legacy unicast query: sent from an ephemeral port, so
+                # responders answer directly to us
+                transport, protocol = mdns_endpoint
+                future = loop.create_future()
+                protocol.pending[reverse_name] = future
+                transport.sendto(
+                    dns.build_query(txid, reverse_name, dns.TYPE_PTR, recursion=False),
+                    (MDNS_GROUP, MDNS_PORT)
+                )
+                host_futures[ip].append((future, _clean_mdns_hostname))
+
+            if netbios_endpoint and is_ipv4:
+                transport, protocol = netbios_endpoint
+                future = loop.create_future()
+                protocol.pending[ip] = future
+                query = struct.pack('!HHHHHH', txid, 0x0000, 1, 0, 0, 0)
+                query += _NBSTAT_NAME + struct.pack('!HH', _NBSTAT_TYPE, dns.CLASS_IN)
+                transport.sendto(query, (ip, NETBIOS_PORT))
+                host_futures[ip].append((future, lambda name, ip: name if name and name != ip else None))
+
+        async def first_answer(ip: str) -> Optional[str]:
+            pending = {future: clean for future, clean in host_futures[ip]}
+            deadline = loop.time() + timeout
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait(
+                    list(pending), timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for future in done:
+                    clean = pending.pop(future)
+                    hostname = clean(future.result(), ip)
+                    if hostname:
+                        return hostname
+            return None
+
+        answers = await asyncio.gather(*[first_answer(ip) for ip in ips])
+        return dict(zip(ips, answers))
+    finally:
+        for transport, protocol in endpoints:
+            for future in protocol.pending.values():
+                if not future.done():
+                    future.cancel()
+            transport.close()
@@ -0,0 +1,265 @@
+"""
+SSH banner fingerprinting for OS and release classification
+
+Maps the OpenSSH version and distribution package revision that Debian-based
+systems put in their SSH banner (e.g. "SSH-2.0-OpenSSH_9.6p1
+Ubuntu-3ubuntu13.5") to a distribution release, using the versioned table in
+app/data/ssh_fingerprints.json. The table is compiled once at import into
+dictionary indexes, so classifying a banner is a handful of lookups.
+
+Run as a module to maintain the data file offline:
+
+    python -m app.utils.ssh_fingerprint refresh --distro Ubuntu --release 24.04 \\
+        --codename noble --label "Ubuntu 24.04 LTS" --vendor Ubuntu Packages
+    python -m app.utils.ssh_fingerprint bench
+"""
+
+import json
+import re
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+DATA_FILE = Path(__file__).resolve().parent.parent / "data" / "ssh_fingerprints.json"
+SCHEMA_VERSION = 1
+
+# Confidence of each kind of match, from exact package revision down to a
+# bare upstream version shared by several releases
+CONFIDENCE_EXACT = 0.99
+CONFIDENCE_PACKAGE = 0.9
+CONFIDENCE_VERSION = 0.75
+CONFIDENCE_VENDOR = 0.6
+CONFIDENCE_UPSTREAM = 0.3
+
+# "SSH-2.0-OpenSSH_9.6p1 Ubuntu-3ubuntu13.5" -> ("9.6p1", "Ubuntu", "3ubuntu13.5")
+_BANNER_RE = re.compile(r'^SSH-[\d.]+-OpenSSH_(\S+?)(?:\s+(\w+)-(\S+))?(?:\s.*)?$')
+
+
+@dataclass
+class BannerFingerprint:
+    """Classification of one SSH banner"""
+    distro: Optional[str] = None
+    release: Optional[str] = None
+    label: Optional[str] = None
+    confidence: float = 0.0
+    match: str = "none"  # exact, package, version, vendor, upstream or none
+    openssh_version: Optional[str] = None
+    package_revision: Optional[str] = None
+    candidates: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["candidates"] = list(self.candidates)
+        return result
+
+
+class FingerprintIndex:
+    """Lookup indexes compiled from the fingerprint data file"""
+
+    def __init__(self, data: Dict[str, Any]):
+        if data.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported fingerprint schema version: {data.get('schema_version')}")
+        self.data_version = data.get("data_version")
+
+        # (openssh, vendor, revision) -> release
+        self.exact: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        # (openssh, vendor) -> [(revision prefix, release)]
+        self.by_version: Dict[Tuple[str, str], List[Tuple[str, Dict[str, Any]]]] = {}
+        # vendor -> distro name
+        self.vendors: Dict[str, str] = {}
+        # openssh -> releases shipping it
+        self.upstream: Dict[str, List[Dict[str, Any]]] = {}
+
+        for release in data.get("releases", []):
+            openssh = release["openssh"]
+            vendor = release["vendor"]
+            for revision in release.get("revisions", []):
+                self.exact[(openssh, vendor, revision)] = release
+            self.by_version.setdefault((openssh, vendor), []).append(
+                (release.get("revision_prefix", ""), release)
+            )
+            self.vendors[vendor] = release["distro"]
+            self.upstream.setdefault(openssh, []).append(release)
+
+        # Longest prefix first so the most specific release wins
+        for entries in self.by_version.values():
+            entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def classify(self, banner: Optional[str]) -> BannerFingerprint:
+        """Classify an SSH banner string"""
+        if not banner:
+            return BannerFingerprint()
+        match = _BANNER_RE.match(banner.strip())
+        if not match:
+            return BannerFingerprint()
+
+        openssh, vendor, revision = match.groups()
+        result = BannerFingerprint(openssh_version=openssh, package_revision=revision)
+
+        if vendor:
+            release = self.exact.get((openssh, vendor, revision))
+            if release:
+                return self._with_release(result, release, "exact", CONFIDENCE_EXACT)
+
+            entries = self.by_version.get((openssh, vendor))
+            if entries:
+                for prefix, release in entries:
+                    if prefix and revision.startswith(prefix):
+                        return self._with_release(result, release, "package", CONFIDENCE_PACKAGE)
+                if len(entries) == 1:
+                    return self._with_release(result, entries[0][1], "version", CONFIDENCE_VERSION)
+
+            distro = self.vendors.get(vendor, vendor)
+            result.distro = distro
+            result.label = f"{distro} (version unknown)"
+            result.match = "vendor"
+            result.confidence = CONFIDENCE_VENDOR if vendor in self.vendors else CONFIDENCE_UPSTREAM
+            return result
+
+        # No distribution comment: only the upstream version narrows it down
+        releases = self.upstream.get(openssh, [])
+        if releases:
+            result.candidates = tuple(r["label"] for r in releases)
+            if len(releases) == 1:
+                return self._with_release(result, releases[0], "upstream", CONFIDENCE_UPSTREAM)
+            result.match = "upstream"
+            result.confidence = CONFIDENCE_UPSTREAM / len(releases)
+        return result
+
+    @staticmethod
+    def _with_release(result: BannerFingerprint, release: Dict[str, Any], match: str, confidence: float) -> BannerFingerprint:
+        result.distro = release["distro"]
+        result.release = release["release"]
+        result.label = release["label"]
+        result.match = match
+        result.confidence = confidence
+        return result
+
+
+def load_index(data_file: Path = DATA_FILE) -> FingerprintIndex:
+    with open(data_file, 'r') as f:
+        return FingerprintIndex(json.load(f))
+
+
+_index = load_index()
+
+
+def classify_banner(banner: Optional[str]) -> BannerFingerprint:
+    """Classify an SSH banner against the compiled fingerprint index"""
+    return _index.classify(banner)
+
+
+def parse_packages_file(path: Path, package: str = "openssh-server") -> List[Tuple[str, str]]:
+    """
+    Extract (upstream version, package revision) pairs from an apt
+    Packages or Sources file, e.g. "1:9.6p1-3ubuntu13.5" -> ("9.6p1", "3ubuntu13.5")
+    """
+    versions = []
+    current = None
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            if line.startswith('Package: '):
+                current = line.split(':', 1)[1].strip()
+            elif line.startswith('Version: ') and current in (package, 'openssh'):
+                version = line.split(':', 1)[1].strip()
+                version = version.split(':', 1)[1] if ':' in version else version
+                if '-' in version:
+                    upstream, revision = version.rsplit('-', 1)
+                    if (upstream, revision) not in versions:
+                        versions.append((upstream, revision))
+    return versions
+
+
+def refresh_data_file(
+    package_files: List[Path],
+    distro: str,
+    release: str,
+    codename: str,
+    label: str,
+    vendor: str,
+    data_file: Path = DATA_FILE
+) -> Dict[str, Any]:
+    """Merge the openssh-server versions found in apt index files into the data file"""
+    from datetime import date
+
+    with open(data_file, 'r') as f:
+        data = json.load(f)
+
+    entry = next(
+        (r for r in data["releases"] if r["distro"] == distro and r["release"] == release),
+        None
+    )
+    for package_file in package_files:
+        for upstream, revision in parse_packages_file(package_file):
+            if entry is None:
+                entry = {
+                    "distro": distro, "release": release, "codename": codename,
+                    "label": label, "openssh": upstream, "vendor": vendor,
+                    "revision_prefix": "", "revisions": []
+                }
+                data["releases"].append(entry)
+            if upstream != entry["openssh"]:
+                continue
+            if revision not in entry["revisions"]:
+                entry["revisions"].append(revision)
+
+    data["data_version"] = date.today().isoformat()
+    tmp_file = data_file.with_suffix('.json.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    tmp_file.replace(data_file)
+    return data
+
+
+def _benchmark(count: int = 100_000):
+    """Classify a mix of known, vendor-only and unknown banners"""
+    import random
+    import time
+
+    samples = []
+    for release in _index.upstream.values():
+        for r in release:
+            for revision in r["revisions"]:
+                samples.append(f"SSH-2.0-OpenSSH_{r['openssh']} {r['vendor']}-{revision}")
+            samples.append(f"SSH-2.0-OpenSSH_{r['openssh']}")
+    samples += ["SSH-2.0-OpenSSH_9.6p1 Ubuntu-99ubuntu1", "SSH-2.0-dropbear_2022.83", "SSH-2.0-OpenSSH_8.0"]
+    banners = [random.choice(samples) for _ in range(count)]
+
+    start = time.perf_counter()
+    for banner in banners:
+        classify_banner(banner)
+    elapsed = time.perf_counter() - start
+    print(f"Classified {count} banners in {elapsed:.3f}s ({count / elapsed:,.0f} banners/s, "
+          f"data version {_index.data_version})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SSH banner fingerprint data maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh = subparsers.add_parser("refresh", help="Merge openssh versions from apt Packages/Sources files")
+    refresh.add_argument("--distro", required=True)
+    refresh.add_argument("--release", required=True)
+    refresh.add_argument("--codename", default="")
+    refresh.add_argument("--label", required=True)
+    refresh.add_argument("--vendor", required=True, help="Token in the banner comment, e.g. Ubuntu or Debian")
+    refresh.add_argument("files", nargs="+", type=Path)
+
+    bench = subparsers.add_parser("bench", help="Benchmark banner classification")
+    bench.add_argument("--count", type=int, default=100_000)
+
+    classify = subparsers.add_parser("classify", help="Classify banners given on the command line")
+    classify.add_argument("banners", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "refresh":
+        data = refresh_data_file(args.files, args.distro, args.release, args.codename, args.label, args.vendor)
+        print(f"Updated {DATA_FILE} (data version {data['data_version']})")
+    elif args.command == "bench":
+        _benchmark(args.count)
+    else:
+        for banner in args.banners:
+            print(json.dumps(classify_banner(banner).to_dict()))
@@ -10,6 +10,7 @@ import os
 import sys
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List
 
@@ -26,6 +27,8 @@ from app.api.playbook_stream import router as playbook_stream_router
 from app.api.zerotier import router as zerotier_router
 from app.api.tokens import router as tokens_router
 from app.api.github import router as github_router
+from app.api.hardware import router as hardware_router
+from app.api.inventory import router as inventory_router
 
 # Configure logging
 logging.basicConfig(
@@ -36,12 +39,39 @@ logger = logging.getLogger(__name__)
 
 # Import shared state
 from app.shared import app_state, broadcast_status
+from app.services.mdns_browser import mdns_browser
+from app.services.local_addresses import local_address_service
+from app.services.ssh_pool import ssh_pool
+from app.services.k8s_informer import k8s_informer
+from app.services.state_watcher import state_watcher
+from app.services.deployment_state import deployment_state_store
+from app.services.http_client import http_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services"""
+    await http_client.start()
+    await local_address_service.start()
+    await mdns_browser.start()
+    await k8s_informer.start()
+    await state_watcher.start()
+    yield
+    await state_watcher.stop()
+    await k8s_informer.stop()
+    await mdns_browser.stop()
+    await local_address_service.stop()
+    await ssh_pool.close_all()
+    await deployment_state_store.close()
+    await http_client.stop()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="thinkube Installer Backend",
     description="Backend API for thinkube installer",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -61,6 +91,8 @@ app.include_router(playbook_stream_router)
 app.include_router(zerotier_router)
 app.include_router(tokens_router)
 app.include_router(github_router)
+app.include_router(hardware_router)
+app.include_router(inventory_router)
 
 
 @app.get("/")
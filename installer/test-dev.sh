@@ -56,9 +56,11 @@ if [ "$CLEAN_STATE" = true ]; then
         rm -rf "$HOME/.config/thinkube-installer"
     fi
     
-    # Clean backend deployment state file
-    if [ -f "$HOME/.thinkube-installer/deployment-state.json" ]; then
-        echo "  - Removing backend deployment state file..."
+    # Clean backend deployment state file and its journal (the journal
+    # would otherwise be replayed on the next start)
+    if [ -f "$HOME/.thinkube-installer/deployment-state.json" ] || [ -f "$HOME/.thinkube-installer/deployment-state.journal" ]; then
+        echo "  - Removing backend deployment state files..."
+        rm -f "$HOME/.thinkube-installer/deployment-state.journal"
         rm -f "$HOME/.thinkube-installer/deployment-state.json"
     fi
     